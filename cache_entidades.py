@@ -0,0 +1,107 @@
+# cache_entidades.py
+
+import threading
+import time
+from collections import OrderedDict
+
+# Caché de lectura de las entidades de referencia (ligas y equipos) que se consultan una y
+# otra vez para formatear mensajes: get_liga_by_id, get_liga_id, get_equipo_by_id y
+# get_equipo_by_name. Es una LRU acotada: cada lectura que acierta no hace ninguna consulta;
+# la que falla consulta la DB y guarda el resultado (también los "no existe").
+#
+# Tipos de entrada:
+#   'liga'          (liga_id) - fila de get_liga_by_id
+#   'liga_nombre'   (nombre)  - id de get_liga_id
+#   'equipo'        (equipo_id) - fila de get_equipo_by_id
+#   'equipo_nombre' (nombre)  - fila de get_equipo_by_name
+#
+# Las escrituras de database.py que tocan esas filas (altas de ligas y equipos, zonas,
+# niveles, traspasos) llaman a invalidar() después del commit. Como en cache_render, las
+# entradas se guardan por ámbito (el mundo activo que registra database.py).
+#
+# Quien consulta la DB tras un fallo toma un sello() antes de leer y lo pasa a guardar(): si
+# hubo alguna invalidación entretanto, la fila leída puede ser la vieja y no se guarda.
+# Los "no existe" vencen a los NO_EXISTE_SEGUNDOS: la liga o el equipo puede aparecer por una
+# importación hecha desde otro proceso (local_data.py), que no invalida esta caché.
+
+MAX_ENTRADAS = 4096
+NO_EXISTE_SEGUNDOS = 60
+
+# Marca de "no está en la caché" (None es un valor válido: la entidad no existe)
+FALTA = object()
+
+_cache = OrderedDict() # (ámbito, tipo, clave) -> (valor, vence o None)
+_generacion = 0 # Sube con cada invalidación
+_lock = threading.Lock()
+estadisticas = {'aciertos': 0, 'fallos': 0, 'invalidaciones': 0}
+_ambito = lambda: None
+
+def registrar_ambito(funcion):
+    """Registra la función que identifica el ámbito activo (ej. database.mundo_actual)."""
+    global _ambito
+    _ambito = funcion
+
+def obtener(tipo, clave):
+    """Valor guardado para (tipo, clave), o FALTA."""
+    llave = (_ambito(), tipo, clave)
+    with _lock:
+        entrada = _cache.get(llave)
+        if entrada is not None and entrada[1] is not None and entrada[1] <= time.monotonic():
+            del _cache[llave] # "No existe" vencido: se vuelve a consultar
+            entrada = None
+        if entrada is None:
+            estadisticas['fallos'] += 1
+            return FALTA
+        _cache.move_to_end(llave)
+        estadisticas['aciertos'] += 1
+    return entrada[0]
+
+def sello():
+    """Marca tomada antes de consultar la DB tras un fallo; se pasa a guardar()."""
+    with _lock:
+        return _generacion
+
+def guardar(tipo, clave, valor, sello_lectura):
+    """Guarda el valor leído, salvo que haya habido una invalidación desde `sello_lectura`. Retorna el valor."""
+    with _lock:
+        if _generacion != sello_lectura:
+            return valor
+        llave = (_ambito(), tipo, clave)
+        _cache[llave] = (valor, time.monotonic() + NO_EXISTE_SEGUNDOS if valor is None else None)
+        _cache.move_to_end(llave)
+        if len(_cache) > MAX_ENTRADAS:
+            _cache.popitem(last=False)
+    return valor
+
+def invalidar(tipo, *claves):
+    """Descarta las entradas del tipo con esas claves en el ámbito activo (sin claves: todas las del tipo)."""
+    global _generacion
+    ambito = _ambito()
+    with _lock:
+        _generacion += 1
+        if claves:
+            llaves = [(ambito, tipo, clave) for clave in claves]
+        else:
+            llaves = [llave for llave in _cache if llave[0] == ambito and llave[1] == tipo]
+        for llave in llaves:
+            _cache.pop(llave, None)
+        estadisticas['invalidaciones'] += 1
+
+def vaciar_ambito(ambito):
+    """Descarta todas las entradas de un ámbito (ej. un mundo que se vuelve a crear)."""
+    global _generacion
+    with _lock:
+        _generacion += 1
+        for llave in [llave for llave in _cache if llave[0] == ambito]:
+            del _cache[llave]
+
+def vaciar():
+    with _lock:
+        _cache.clear()
+
+def resumen():
+    """Línea con aciertos, fallos y tamaño, para !metricas."""
+    consultas = estadisticas['aciertos'] + estadisticas['fallos']
+    tasa = estadisticas['aciertos'] / consultas * 100 if consultas else 0
+    return (f"Caché de ligas/equipos: {estadisticas['aciertos']} aciertos, {estadisticas['fallos']} fallos "
+            f"({tasa:.1f}%), {len(_cache)}/{MAX_ENTRADAS} entradas, {estadisticas['invalidaciones']} invalidaciones")
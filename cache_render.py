@@ -0,0 +1,110 @@
+# cache_render.py
+
+import threading
+
+# Caché en memoria de las vistas ya formateadas (tabla, plantilla, calendario...).
+# Cada entrada se guarda con las dependencias de datos de las que salió, p. ej.
+# [('clasificacion', liga_id)], y con la versión que tenía cada una en ese momento.
+# Las funciones de escritura de database.py suben la versión de lo que modifican
+# (resultados, traspasos, regeneración del fixture) después del commit; una entrada vale
+# mientras sus versiones sigan siendo las actuales, así que un acierto no hace ninguna consulta.
+#
+# Dominios de versión:
+#   'clasificacion' (liga_id) - tabla de posiciones
+#   'partidos'      (liga_id) - resultados de partidos de la liga y sus goles por jugador
+#   'fixture'       (liga_id) - jornadas / partidos generados o borrados
+#   'plantilla'     (equipo_id) - altas, bajas y traspasos de jugadores
+#   'equipos'       (None) - ligas y equipos dados de alta
+#
+# Versiones y vistas se guardan por ámbito (el mundo/base de datos activo, que registra
+# database.py), así dos carreras con los mismos ids de liga o equipo no comparten entradas.
+#
+# Las lecturas corren en otros hilos (database_async) y pueden cruzarse con una escritura, así
+# que quien renderiza toma un sello() ANTES de leer y lo pasa a guardar(): la versión es el
+# número de invalidación (creciente) en que cambió cada dependencia, y si alguna cambió después
+# del sello el texto puede venir de datos viejos y no se guarda.
+
+# Máximo de vistas guardadas; al superarlo se descarta la más antigua
+MAX_ENTRADAS = 512
+
+_versiones = {} # (ámbito, dominio, entidad) -> número de la última invalidación
+_cache = {} # (ámbito, vista, clave) -> (dependencias, versiones, texto)
+_vaciados = {} # ámbito -> número de invalidación en que se vació (ver vaciar_ambito)
+_secuencia = 0 # Número de la última invalidación (de cualquier ámbito)
+_lock = threading.Lock()
+estadisticas = {'aciertos': 0, 'fallos': 0}
+_ambito = lambda: None
+
+def registrar_ambito(funcion):
+    """Registra la función que identifica el ámbito activo (ej. database.mundo_actual)."""
+    global _ambito
+    _ambito = funcion
+
+def version(dominio, entidad=None):
+    with _lock:
+        return _versiones.get((_ambito(), dominio, entidad), 0)
+
+def sello():
+    """Marca tomada antes de leer los datos de una vista; se pasa a guardar()."""
+    with _lock:
+        return _secuencia
+
+def invalidar(dominio, *entidades):
+    """Sube la versión de las entidades del dominio (sin entidades: la entrada global del dominio)."""
+    global _secuencia
+    ambito = _ambito()
+    with _lock:
+        _secuencia += 1
+        for entidad in entidades or (None,):
+            _versiones[(ambito, dominio, entidad)] = _secuencia
+
+def _versiones_actuales(ambito, dependencias):
+    return tuple(_versiones.get((ambito, dominio, entidad), 0) for dominio, entidad in dependencias)
+
+def obtener(vista, clave):
+    """Retorna el texto guardado para (vista, clave) si sigue vigente, o None."""
+    ambito = _ambito()
+    with _lock:
+        entrada = _cache.get((ambito, vista, clave))
+        if entrada and _versiones_actuales(ambito, entrada[0]) == entrada[1]:
+            estadisticas['aciertos'] += 1
+            return entrada[2]
+        estadisticas['fallos'] += 1
+        return None
+
+def guardar(vista, clave, texto, dependencias, sello_lectura):
+    """
+    Guarda el texto renderizado junto a la versión de sus dependencias [(dominio, entidad), ...].
+    `sello_lectura` es el sello() tomado antes de leer los datos: si alguna dependencia se
+    invalidó después, el texto no se guarda (se retorna igual, para enviarlo).
+    """
+    dependencias = tuple(dependencias)
+    ambito = _ambito()
+    llave = (ambito, vista, clave)
+    with _lock:
+        versiones = _versiones_actuales(ambito, dependencias)
+        if _vaciados.get(ambito, 0) > sello_lectura or any(v > sello_lectura for v in versiones):
+            return texto
+        _cache.pop(llave, None)
+        _cache[llave] = (dependencias, versiones, texto)
+        if len(_cache) > MAX_ENTRADAS:
+            del _cache[next(iter(_cache))]
+    return texto
+
+def vaciar():
+    with _lock:
+        _cache.clear()
+
+def vaciar_ambito(ambito):
+    """
+    Descarta las vistas y versiones de un ámbito (ej. un mundo que se vuelve a crear). Una
+    lectura del mundo anterior que termine después tampoco se guarda.
+    """
+    global _secuencia
+    with _lock:
+        for llave in [llave for llave in _cache if llave[0] == ambito]:
+            del _cache[llave]
+        for llave in [llave for llave in _versiones if llave[0] == ambito]:
+            del _versiones[llave]
+        _secuencia += 1
+        _vaciados[ambito] = _secuencia
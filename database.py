@@ -1,15 +1,77 @@
 # database.py
 
 import sqlite3
+import contextvars
 import datetime
+import json
+import os
+import threading
+from collections import OrderedDict
+import cache_entidades
+import cache_render
 
 DATABASE_NAME = 'carrera_dream_patch.db'
+# Los partidos y jornadas de temporadas archivadas van a un archivo aparte (<base>_archivo.db)
+# que solo se adjunta (ATTACH) cuando hace falta
+ALIAS_ARCHIVO = 'archivo'
+# Cada carrera juega en su propio mundo: una copia de DATABASE_NAME (la plantilla con ligas,
+# equipos y jugadores) guardada en esta carpeta, junto a la plantilla
+CARPETA_MUNDOS = 'mundos'
+# Tablas con el estado de juego; se vacían al clonar la plantilla para un mundo nuevo
+TABLAS_ESTADO_JUEGO = ('carreras', 'ofertas_jugador', 'clasificaciones', 'jornadas', 'partidos', 'palmares',
+                       'ascensos_descensos', 'historial_clasificaciones', 'temporadas_archivadas',
+                       'eventos_partido', 'estadisticas_jugadores')
+# Máximo de usuarios cuyo mundo se recuerda; al superarlo se olvida el usado hace más tiempo
+MAX_RUTAS_MUNDOS = 1024
+
+# Ruta de la base del mundo activo en este contexto (tarea asyncio / hilo), o None para la plantilla
+_mundo_actual = contextvars.ContextVar('mundo_actual', default=None)
+_rutas_mundos = OrderedDict() # usuario_id -> ruta del mundo (o None si juega en la plantilla), LRU
+_lock_mundos = threading.Lock()
+_carreras_en_plantilla = set() # usuarios sin mundo con una carrera anterior a los mundos, en la plantilla
+_mundos_inicializados = set()
+
+def mundo_actual():
+    return _mundo_actual.get()
+
+def ruta_db_actual():
+    return _mundo_actual.get() or DATABASE_NAME
+
+class _Conexion(sqlite3.Connection):
+    """
+    Conexión que guarda las invalidaciones de caché de sus escrituras y las aplica recién
+    después del commit (o del rollback): si se aplicaran antes, un lector en otro hilo podría
+    leer la fila vieja, todavía sin confirmar, y volver a guardarla en la caché como vigente.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.al_confirmar = [] # [(funcion, args)]
+
+    def _aplicar_pendientes(self):
+        pendientes, self.al_confirmar = self.al_confirmar, []
+        for funcion, args in pendientes:
+            funcion(*args)
+
+    def commit(self):
+        super().commit()
+        self._aplicar_pendientes()
+
+    def rollback(self):
+        super().rollback()
+        self._aplicar_pendientes() # Invalidar de más nunca deja datos viejos en la caché
 
 def connect_db():
-    conn = sqlite3.connect(DATABASE_NAME)
+    conn = sqlite3.connect(ruta_db_actual(), factory=_Conexion)
     conn.row_factory = sqlite3.Row
     return conn
 
+def _al_confirmar(conn, funcion, *args):
+    """Deja funcion(*args) (una invalidación de caché) para después del próximo commit de conn."""
+    conn.al_confirmar.append((funcion, args))
+
+cache_render.registrar_ambito(mundo_actual)
+cache_entidades.registrar_ambito(mundo_actual)
+
 def init_db():
     """
     Inicializa la base de datos, creando todas las tablas necesarias si no existen.
@@ -22,9 +84,11 @@ def init_db():
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             nombre TEXT NOT NULL UNIQUE,
             pais TEXT,
-            num_equipos INTEGER
+            num_equipos INTEGER,
+            perfil_valoracion TEXT -- JSON con los tramos de valoración por edad, piso y techo de la liga
         )
     ''')
+    _add_columna_si_falta(cursor, 'ligas', 'perfil_valoracion', 'TEXT')
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS equipos (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -120,12 +184,17 @@ def init_db():
             resultado_visitante INTEGER DEFAULT NULL,
             simulado INTEGER DEFAULT 0,
             zona TEXT, -- ¡NUEVA COLUMNA AÑADIDA AQUÍ para partidos!
-            tipo_partido TEXT DEFAULT 'liga', -- 'liga', 'final_ascenso', 'reducido_cuartos', 'reducido_semis', 'reducido_final'
+            tipo_partido TEXT DEFAULT 'liga', -- 'liga', 'final_ascenso', 'reducido_octavos', 'reducido_cuartos', 'reducido_semis', 'reducido_final'
             FOREIGN KEY (jornada_id) REFERENCES jornadas(id),
             FOREIGN KEY (equipo_local_id) REFERENCES equipos(id),
             FOREIGN KEY (equipo_visitante_id) REFERENCES equipos(id)
         )
     ''')
+    # Partidos de una jornada y de un equipo (calendario, partido pendiente) sin recorrer la tabla entera
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_partidos_jornada ON partidos (jornada_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_partidos_local ON partidos (equipo_local_id, jornada_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_partidos_visitante ON partidos (equipo_visitante_id, jornada_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jugadores_equipo ON jugadores (equipo_id)")
     
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS palmares (
@@ -156,20 +225,133 @@ def init_db():
         )
     ''')
 
+    # Registro de importaciones de los *_players.txt (para la reimportación incremental)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS importaciones_archivos (
+            ruta_archivo TEXT PRIMARY KEY,
+            liga_id INTEGER NOT NULL,
+            hash_contenido TEXT NOT NULL,
+            fecha_importacion TEXT,
+            FOREIGN KEY (liga_id) REFERENCES ligas(id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS importaciones_bloques (
+            liga_id INTEGER NOT NULL,
+            equipo_nombre TEXT NOT NULL,
+            hash_contenido TEXT NOT NULL,
+            lineas TEXT NOT NULL, -- Las líneas normalizadas del bloque del equipo en la última importación
+            PRIMARY KEY (liga_id, equipo_nombre),
+            FOREIGN KEY (liga_id) REFERENCES ligas(id)
+        )
+    ''')
+
+    # Checkpoints del scraper multi-liga: un registro por (liga, URL de equipo)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS scrape_checkpoints (
+            liga TEXT NOT NULL,
+            url_equipo TEXT NOT NULL,
+            equipo_nombre TEXT NOT NULL,
+            estado TEXT NOT NULL DEFAULT 'pendiente', -- 'pendiente', 'ok' o 'error'
+            intentos INTEGER NOT NULL DEFAULT 0,
+            ultimo_error TEXT,
+            fecha_actualizacion TEXT,
+            PRIMARY KEY (liga, url_equipo)
+        )
+    ''')
+
+    # Resumen de las temporadas ya archivadas: la tabla final queda aquí, los partidos en el archivo
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS historial_clasificaciones (
+            liga_id INTEGER NOT NULL,
+            temporada INTEGER NOT NULL,
+            equipo_id INTEGER NOT NULL,
+            equipo_nombre TEXT NOT NULL, -- Nombre al cierre de la temporada
+            zona TEXT,
+            pos INTEGER NOT NULL, -- Posición final (dentro de su zona si la liga tiene zonas)
+            pj INTEGER, pg INTEGER, pe INTEGER, pp INTEGER,
+            gf INTEGER, gc INTEGER, dg INTEGER, pts INTEGER,
+            PRIMARY KEY (liga_id, temporada, equipo_id),
+            FOREIGN KEY (liga_id) REFERENCES ligas(id)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS temporadas_archivadas (
+            liga_id INTEGER NOT NULL,
+            temporada INTEGER NOT NULL,
+            jornadas INTEGER NOT NULL,
+            partidos_jugados INTEGER NOT NULL,
+            goles INTEGER NOT NULL,
+            campeon_equipo_id INTEGER, -- Primer título de la temporada en palmares (si lo hay)
+            fecha_archivo TEXT,
+            PRIMARY KEY (liga_id, temporada),
+            FOREIGN KEY (liga_id) REFERENCES ligas(id)
+        )
+    ''')
+
+    # Goles y asistencias de cada partido (solo se agregan filas) y su acumulado por temporada
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS eventos_partido (
+            partido_id INTEGER NOT NULL,
+            minuto INTEGER NOT NULL,
+            tipo INTEGER NOT NULL, -- 1 = gol, 2 = asistencia (eventos_partido.GOL / ASISTENCIA)
+            jugador_id INTEGER NOT NULL,
+            equipo_id INTEGER NOT NULL,
+            FOREIGN KEY (partido_id) REFERENCES partidos(id)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_eventos_partido ON eventos_partido (partido_id)")
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS estadisticas_jugadores (
+            liga_id INTEGER NOT NULL,
+            temporada INTEGER NOT NULL,
+            jugador_id INTEGER NOT NULL,
+            equipo_id INTEGER NOT NULL, -- Último equipo con el que sumó
+            goles INTEGER NOT NULL DEFAULT 0,
+            asistencias INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (liga_id, temporada, jugador_id),
+            FOREIGN KEY (liga_id) REFERENCES ligas(id)
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_estadisticas_goles ON estadisticas_jugadores (liga_id, temporada, goles DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_estadisticas_asistencias ON estadisticas_jugadores (liga_id, temporada, asistencias DESC)")
+
+    if mundo_actual() is None:
+        # Los pasos de conversación viven solo en la plantilla (ver más abajo y estado_conversacion.py)
+        _crear_tabla_estados_conversacion(cursor)
+
     conn.commit()
     conn.close()
 
+def _add_columna_si_falta(cursor, tabla, columna, definicion):
+    """Migración mínima: añade la columna a una tabla ya existente si todavía no la tiene."""
+    cursor.execute(f"PRAGMA table_info({tabla})")
+    if columna not in [fila[1] for fila in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}")
+
 def _get_conn(conn):
     """Auxiliary function to get or create a connection and track if it was created."""
     if conn is None:
         return connect_db(), True # (connection, was_created_here)
     return conn, False
 
+def _usa_cache_entidades(conn):
+    """
+    Una conexión con escrituras sin confirmar no lee de cache_entidades ni la llena: tiene que
+    ver sus propios cambios, que la caché recién descarta después del commit.
+    """
+    return conn is None or not conn.al_confirmar
+
 def _close_conn_if_created(conn, was_created_here):
     """Auxiliary function to close connection only if it was created here."""
     if was_created_here:
         conn.close()
 
+def _liga_de_jornada(cursor, jornada_id):
+    cursor.execute("SELECT liga_id FROM jornadas WHERE id = ?", (jornada_id,))
+    fila = cursor.fetchone()
+    return fila['liga_id'] if fila else None
+
 # Funciones de palmares
 # MODIFICADA: Añadido tipo_titulo
 def add_campeon(liga_id, temporada, equipo_campeon_id, tipo_titulo='Campeón de Liga', conn=None): #
@@ -288,6 +470,9 @@ def add_liga(nombre, pais, num_equipos, conn=None):
     try:
         cursor.execute("INSERT OR IGNORE INTO ligas (nombre, pais, num_equipos) VALUES (?, ?, ?)",
                        (nombre, pais, num_equipos))
+        _al_confirmar(conn_actual, cache_render.invalidar, 'equipos')
+        _al_confirmar(conn_actual, cache_entidades.invalidar, 'liga_nombre', nombre)
+        _al_confirmar(conn_actual, cache_entidades.invalidar, 'liga')
         if close_conn: conn_actual.commit()
         return cursor.lastrowid
     except sqlite3.Error as e:
@@ -305,12 +490,18 @@ def get_all_ligas_info(conn=None):
     return [dict(liga) for liga in ligas]
 
 def get_liga_id(nombre_liga, conn=None):
+    usa_cache = _usa_cache_entidades(conn)
+    liga_id = cache_entidades.obtener('liga_nombre', nombre_liga) if usa_cache else cache_entidades.FALTA
+    if liga_id is not cache_entidades.FALTA:
+        return liga_id
+    sello = cache_entidades.sello()
     conn_actual, close_conn = _get_conn(conn)
     cursor = conn_actual.cursor()
     cursor.execute("SELECT id FROM ligas WHERE nombre = ?", (nombre_liga,))
     liga_id = cursor.fetchone()
     _close_conn_if_created(conn_actual, close_conn)
-    return liga_id['id'] if liga_id else None
+    liga_id = liga_id['id'] if liga_id else None
+    return cache_entidades.guardar('liga_nombre', nombre_liga, liga_id, sello) if usa_cache else liga_id
 
 def get_liga_by_name(nombre_liga, conn=None):
     conn_actual, close_conn = _get_conn(conn)
@@ -321,12 +512,42 @@ def get_liga_by_name(nombre_liga, conn=None):
     return dict(liga) if liga else None
 
 def get_liga_by_id(id_liga, conn=None):
+    usa_cache = _usa_cache_entidades(conn)
+    liga = cache_entidades.obtener('liga', id_liga) if usa_cache else cache_entidades.FALTA
+    if liga is cache_entidades.FALTA:
+        sello = cache_entidades.sello()
+        conn_actual, close_conn = _get_conn(conn)
+        cursor = conn_actual.cursor()
+        cursor.execute("SELECT * FROM ligas WHERE id = ?", (id_liga,))
+        liga = cursor.fetchone()
+        _close_conn_if_created(conn_actual, close_conn)
+        liga = dict(liga) if liga else None
+        if usa_cache:
+            cache_entidades.guardar('liga', id_liga, liga, sello)
+    return dict(liga) if liga else None # Copia: quien la recibe puede modificarla
+
+def get_perfil_valoracion_liga(liga_id, conn=None):
+    """Devuelve el perfil de valoración (dict) guardado para la liga, o None si no tiene."""
     conn_actual, close_conn = _get_conn(conn)
     cursor = conn_actual.cursor()
-    cursor.execute("SELECT * FROM ligas WHERE id = ?", (id_liga,))
-    liga = cursor.fetchone()
+    cursor.execute("SELECT perfil_valoracion FROM ligas WHERE id = ?", (liga_id,))
+    fila = cursor.fetchone()
     _close_conn_if_created(conn_actual, close_conn)
-    return dict(liga) if liga else None
+    return json.loads(fila['perfil_valoracion']) if fila and fila['perfil_valoracion'] else None
+
+def update_perfil_valoracion_liga(liga_id, perfil, conn=None):
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    try:
+        cursor.execute("UPDATE ligas SET perfil_valoracion = ? WHERE id = ?", (json.dumps(perfil), liga_id))
+        _al_confirmar(conn_actual, cache_entidades.invalidar, 'liga', liga_id)
+        if close_conn: conn_actual.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Error al actualizar perfil de valoración de la liga {liga_id}: {e}")
+        return False
+    finally:
+        _close_conn_if_created(conn_actual, close_conn)
 
 # Funciones de equipos
 def add_equipo(nombre, liga_id, nivel_general=70, zona=None, conn=None):
@@ -336,6 +557,9 @@ def add_equipo(nombre, liga_id, nivel_general=70, zona=None, conn=None):
         # Actualiza la inserción para incluir 'zona'
         cursor.execute("INSERT OR IGNORE INTO equipos (nombre, liga_id, nivel_general, zona) VALUES (?, ?, ?, ?)",
                        (nombre, liga_id, nivel_general, zona))
+        _al_confirmar(conn_actual, cache_render.invalidar, 'equipos')
+        _al_confirmar(conn_actual, cache_entidades.invalidar, 'equipo_nombre', nombre)
+        _al_confirmar(conn_actual, cache_entidades.invalidar, 'equipo', cursor.lastrowid)
         if close_conn: conn_actual.commit()
         return cursor.lastrowid
     except sqlite3.Error as e:
@@ -349,6 +573,8 @@ def update_equipo_zona(equipo_id, zona, conn=None):
     cursor = conn_actual.cursor()
     try:
         cursor.execute("UPDATE equipos SET zona = ? WHERE id = ?", (zona, equipo_id))
+        _al_confirmar(conn_actual, cache_entidades.invalidar, 'equipo', equipo_id)
+        _al_confirmar(conn_actual, cache_entidades.invalidar, 'equipo_nombre') # Por id no se sabe el nombre; los cambios de zona son pocos
         if close_conn: conn_actual.commit()
         return True
     except sqlite3.Error as e:
@@ -358,11 +584,18 @@ def update_equipo_zona(equipo_id, zona, conn=None):
         _close_conn_if_created(conn_actual, close_conn)
 
 def get_equipo_by_name(nombre_equipo, conn=None):
-    conn_actual, close_conn = _get_conn(conn)
-    cursor = conn_actual.cursor()
-    cursor.execute("SELECT * FROM equipos WHERE nombre = ?", (nombre_equipo,))
-    equipo = cursor.fetchone()
-    _close_conn_if_created(conn_actual, close_conn)
+    usa_cache = _usa_cache_entidades(conn)
+    equipo = cache_entidades.obtener('equipo_nombre', nombre_equipo) if usa_cache else cache_entidades.FALTA
+    if equipo is cache_entidades.FALTA:
+        sello = cache_entidades.sello()
+        conn_actual, close_conn = _get_conn(conn)
+        cursor = conn_actual.cursor()
+        cursor.execute("SELECT * FROM equipos WHERE nombre = ?", (nombre_equipo,))
+        equipo = cursor.fetchone()
+        _close_conn_if_created(conn_actual, close_conn)
+        equipo = dict(equipo) if equipo else None
+        if usa_cache:
+            cache_entidades.guardar('equipo_nombre', nombre_equipo, equipo, sello)
     return dict(equipo) if equipo else None
 
 def get_equipo_id(nombre_equipo, liga_id, conn=None):
@@ -383,6 +616,11 @@ def get_equipos_de_liga(liga_id, conn=None):
     return [dict(e) for e in equipos]
 
 def get_equipo_by_id(equipo_id, conn=None):
+    usa_cache = _usa_cache_entidades(conn)
+    equipo = cache_entidades.obtener('equipo', equipo_id) if usa_cache else cache_entidades.FALTA
+    if equipo is not cache_entidades.FALTA:
+        return dict(equipo) if equipo else None
+    sello = cache_entidades.sello()
     conn_actual, close_conn = _get_conn(conn)
     cursor = conn_actual.cursor()
     cursor.execute("""
@@ -400,6 +638,9 @@ def get_equipo_by_id(equipo_id, conn=None):
     """, (equipo_id,))
     equipo = cursor.fetchone()
     _close_conn_if_created(conn_actual, close_conn)
+    equipo = dict(equipo) if equipo else None
+    if usa_cache:
+        cache_entidades.guardar('equipo', equipo_id, equipo, sello)
     return dict(equipo) if equipo else None
 
 def get_equipos_by_liga(liga_id, conn=None):
@@ -411,6 +652,53 @@ def get_equipos_by_liga(liga_id, conn=None):
     _close_conn_if_created(conn_actual, close_conn)
     return [dict(e) for e in equipos]
 
+def get_mapa_equipos_liga(liga_id, conn=None):
+    """Devuelve un dict {nombre_equipo: id} con todos los equipos de la liga (para cargas masivas)."""
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    cursor.execute("SELECT id, nombre FROM equipos WHERE liga_id = ?", (liga_id,))
+    mapa = {row['nombre']: row['id'] for row in cursor.fetchall()}
+    _close_conn_if_created(conn_actual, close_conn)
+    return mapa
+
+def add_equipo_si_no_existe(nombre, liga_id, nivel_general=70, zona=None, conn=None):
+    """
+    Inserta un equipo y devuelve su id, o None si el nombre ya existe (en cualquier liga).
+    A diferencia de add_equipo, no depende de lastrowid tras un INSERT OR IGNORE,
+    por lo que es seguro reutilizando una misma conexión.
+    """
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    try:
+        cursor.execute("INSERT OR IGNORE INTO equipos (nombre, liga_id, nivel_general, zona) VALUES (?, ?, ?, ?)",
+                       (nombre, liga_id, nivel_general, zona))
+        if cursor.rowcount == 0:
+            return None
+        _al_confirmar(conn_actual, cache_render.invalidar, 'equipos')
+        _al_confirmar(conn_actual, cache_entidades.invalidar, 'equipo_nombre', nombre)
+        _al_confirmar(conn_actual, cache_entidades.invalidar, 'equipo', cursor.lastrowid)
+        if close_conn: conn_actual.commit()
+        return cursor.lastrowid
+    except sqlite3.Error as e:
+        print(f"Error al añadir equipo: {e}")
+        return None
+    finally:
+        _close_conn_if_created(conn_actual, close_conn)
+
+def update_liga_num_equipos(liga_id, num_equipos, conn=None):
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    try:
+        cursor.execute("UPDATE ligas SET num_equipos = ? WHERE id = ?", (num_equipos, liga_id))
+        _al_confirmar(conn_actual, cache_entidades.invalidar, 'liga', liga_id)
+        if close_conn: conn_actual.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Error al actualizar número de equipos de la liga {liga_id}: {e}")
+        return False
+    finally:
+        _close_conn_if_created(conn_actual, close_conn)
+
 
 # Funciones de jugadores
 def add_jugador(nombre, posicion, valoracion, fecha_nacimiento, edad, nacionalidad, equipo_id, conn=None):
@@ -421,6 +709,7 @@ def add_jugador(nombre, posicion, valoracion, fecha_nacimiento, edad, nacionalid
             "INSERT INTO jugadores (nombre, posicion, valoracion, fecha_nacimiento, edad, nacionalidad, equipo_id, es_fichado) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
             (nombre, posicion, valoracion, fecha_nacimiento, edad, nacionalidad, equipo_id, 1)
         )
+        _al_confirmar(conn_actual, cache_render.invalidar, 'plantilla', equipo_id)
         if close_conn: conn_actual.commit()
         return cursor.lastrowid
     except sqlite3.Error as e:
@@ -429,6 +718,144 @@ def add_jugador(nombre, posicion, valoracion, fecha_nacimiento, edad, nacionalid
     finally:
         _close_conn_if_created(conn_actual, close_conn)
 
+def add_jugadores_bulk(filas, conn=None):
+    """
+    Inserta muchos jugadores con un solo executemany.
+    Cada fila es (nombre, posicion, valoracion, fecha_nacimiento, edad, nacionalidad, equipo_id).
+    Retorna la cantidad de filas insertadas. Con una conexión ajena, un error se propaga.
+    """
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    try:
+        cursor.executemany(
+            "INSERT INTO jugadores (nombre, posicion, valoracion, fecha_nacimiento, edad, nacionalidad, equipo_id, es_fichado) VALUES (?, ?, ?, ?, ?, ?, ?, 1)",
+            filas
+        )
+        _al_confirmar(conn_actual, cache_render.invalidar, 'plantilla', *{fila[-1] for fila in filas})
+        if close_conn: conn_actual.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        if not close_conn:
+            raise # La transacción es de quien llama: que haga rollback de todo lo que cargó
+        print(f"Error al añadir jugadores en bloque: {e}")
+        return 0
+    finally:
+        _close_conn_if_created(conn_actual, close_conn)
+
+def update_jugadores_bulk(filas, conn=None):
+    """
+    Actualiza muchos jugadores con un solo executemany.
+    Cada fila es (posicion, edad, nacionalidad, fecha_nacimiento, nuevo_equipo_id, nombre, equipo_id_actual);
+    con fecha_nacimiento None se conserva la que ya tenía el jugador.
+    """
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    try:
+        cursor.executemany("""
+            UPDATE jugadores
+            SET posicion = ?, edad = ?, nacionalidad = ?, fecha_nacimiento = COALESCE(?, fecha_nacimiento), equipo_id = ?
+            WHERE nombre = ? AND equipo_id = ?
+        """, filas)
+        _al_confirmar(conn_actual, cache_render.invalidar, 'plantilla', *{equipo for fila in filas for equipo in (fila[4], fila[6])})
+        if close_conn: conn_actual.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        print(f"Error al actualizar jugadores en bloque: {e}")
+        return 0
+    finally:
+        _close_conn_if_created(conn_actual, close_conn)
+
+def delete_jugadores_bulk(claves, conn=None):
+    """Elimina muchos jugadores identificados por (nombre, equipo_id) con un solo executemany."""
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    try:
+        cursor.executemany("DELETE FROM jugadores WHERE nombre = ? AND equipo_id = ?", claves)
+        _al_confirmar(conn_actual, cache_render.invalidar, 'plantilla', *{equipo_id for _, equipo_id in claves})
+        if close_conn: conn_actual.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        print(f"Error al eliminar jugadores en bloque: {e}")
+        return 0
+    finally:
+        _close_conn_if_created(conn_actual, close_conn)
+
+def get_claves_jugadores_liga(liga_id, conn=None):
+    """Devuelve el set de (nombre, equipo_id) de los jugadores de una liga, para deduplicar cargas."""
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    cursor.execute("""
+        SELECT j.nombre, j.equipo_id
+        FROM jugadores j
+        JOIN equipos e ON j.equipo_id = e.id
+        WHERE e.liga_id = ?
+    """, (liga_id,))
+    claves = {(row['nombre'], row['equipo_id']) for row in cursor.fetchall()}
+    _close_conn_if_created(conn_actual, close_conn)
+    return claves
+
+def get_jugadores_importados_liga(liga_id, conn=None):
+    """Jugadores de la liga con los campos que trae un archivo de importación, ordenados por equipo."""
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    cursor.execute("""
+        SELECT j.nombre, j.posicion, j.edad, j.nacionalidad, j.fecha_nacimiento, e.nombre AS equipo
+        FROM jugadores j
+        JOIN equipos e ON j.equipo_id = e.id
+        WHERE e.liga_id = ?
+        ORDER BY e.nombre, j.id
+    """, (liga_id,))
+    jugadores = [dict(row) for row in cursor.fetchall()]
+    _close_conn_if_created(conn_actual, close_conn)
+    return jugadores
+
+def get_jugadores_progresion(conn=None):
+    """Todos los jugadores con equipo, con la liga de su equipo, para la progresión de fin de temporada."""
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    cursor.execute("""
+        SELECT j.id, j.nombre, j.posicion, j.valoracion, j.fecha_nacimiento, j.edad, j.nacionalidad,
+               j.equipo_id, e.liga_id
+        FROM jugadores j
+        JOIN equipos e ON j.equipo_id = e.id
+    """)
+    jugadores = cursor.fetchall()
+    _close_conn_if_created(conn_actual, close_conn)
+    return [dict(j) for j in jugadores]
+
+def guardar_progresion_temporada(actualizados, retirados, juveniles, niveles, conn=None):
+    """
+    Escribe la progresión de fin de temporada en una transacción:
+    actualizados = [(edad, valoracion, jugador_id)], retirados = [jugador_id] (se borran y sus
+    ofertas pendientes quedan 'retirada'), juveniles = filas de add_jugadores_bulk y
+    niveles = [(nivel_general, equipo_id)].
+    Retorna True si se guardó todo.
+    """
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    try:
+        cursor.executemany("UPDATE jugadores SET edad = ?, valoracion = ? WHERE id = ?", actualizados)
+        cursor.executemany("UPDATE ofertas_jugador SET estado = 'retirada' WHERE jugador_id = ? AND estado = 'pendiente'",
+                           [(jugador_id,) for jugador_id in retirados])
+        cursor.executemany("DELETE FROM jugadores WHERE id = ?", [(jugador_id,) for jugador_id in retirados])
+        cursor.executemany(
+            "INSERT INTO jugadores (nombre, posicion, valoracion, fecha_nacimiento, edad, nacionalidad, equipo_id, es_fichado) VALUES (?, ?, ?, ?, ?, ?, ?, 1)",
+            juveniles
+        )
+        cursor.executemany("UPDATE equipos SET nivel_general = ? WHERE id = ?", niveles)
+        # Cambian todas las plantillas y los niveles de los equipos
+        _al_confirmar(conn_actual, cache_render.invalidar, 'plantilla', *{equipo_id for _, equipo_id in niveles})
+        _al_confirmar(conn_actual, cache_render.invalidar, 'equipos')
+        _al_confirmar(conn_actual, cache_entidades.invalidar, 'equipo')
+        _al_confirmar(conn_actual, cache_entidades.invalidar, 'equipo_nombre')
+        if close_conn: conn_actual.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Error al guardar la progresión de la temporada: {e}")
+        return False
+    finally:
+        _close_conn_if_created(conn_actual, close_conn)
+
 def get_jugador_by_name_and_team(nombre, equipo_id, conn=None):
     conn_actual, close_conn = _get_conn(conn)
     cursor = conn_actual.cursor()
@@ -445,6 +872,31 @@ def get_jugadores_por_equipo(equipo_id, conn=None):
     _close_conn_if_created(conn_actual, close_conn)
     return [dict(jugador) for jugador in jugadores]
 
+def get_valoraciones_plantillas(liga_id=None, equipo_ids=None, conn=None):
+    """
+    Posición y valoración de cada jugador, con el nivel_general de su equipo, para calcular
+    las fuerzas del modelo de partido y los pesos de los goleadores. Filtra por liga o por lista de equipos; los equipos sin
+    jugadores salen igual, con posicion/valoracion en None.
+    """
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    sql = """
+        SELECT e.id AS equipo_id, e.nivel_general, j.id AS jugador_id, j.posicion, j.valoracion
+        FROM equipos e
+        LEFT JOIN jugadores j ON j.equipo_id = e.id
+    """
+    if equipo_ids is not None:
+        equipo_ids = list(equipo_ids)
+        sql += f" WHERE e.id IN ({', '.join('?' * len(equipo_ids))})"
+        params = equipo_ids
+    else:
+        sql += " WHERE e.liga_id = ?"
+        params = [liga_id]
+    cursor.execute(sql, params)
+    filas = cursor.fetchall()
+    _close_conn_if_created(conn_actual, close_conn)
+    return [dict(f) for f in filas]
+
 def get_jugador_by_id(jugador_id, conn=None):
     conn_actual, close_conn = _get_conn(conn)
     cursor = conn_actual.cursor()
@@ -472,11 +924,42 @@ def get_top_jugadores_liga(liga_id, limit=10, conn=None):
     _close_conn_if_created(conn_actual, close_conn)
     return [dict(jugador) for jugador in jugadores]
 
+def get_goleadores_liga(liga_id, temporada, limit=10, por='goles', conn=None):
+    """
+    Máximos goleadores (o asistidores, por='asistencias') de una temporada, leyendo por índice
+    estadisticas_jugadores. Los jugadores ya retirados salen con nombre None.
+    """
+    orden = 'asistencias' if por == 'asistencias' else 'goles'
+    secundario = 'goles' if orden == 'asistencias' else 'asistencias'
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    cursor.execute(f"""
+        SELECT
+            s.jugador_id,
+            j.nombre,
+            j.posicion,
+            e.nombre AS equipo_nombre,
+            s.goles,
+            s.asistencias
+        FROM estadisticas_jugadores s
+        LEFT JOIN jugadores j ON j.id = s.jugador_id
+        LEFT JOIN equipos e ON e.id = s.equipo_id
+        WHERE s.liga_id = ? AND s.temporada = ? AND s.{orden} > 0
+        ORDER BY s.{orden} DESC, s.{secundario} DESC
+        LIMIT ?
+    """, (liga_id, temporada, limit))
+    jugadores = cursor.fetchall()
+    _close_conn_if_created(conn_actual, close_conn)
+    return [dict(jugador) for jugador in jugadores]
+
 def update_jugador_equipo(jugador_id, nuevo_equipo_id, conn=None):
     conn_actual, close_conn = _get_conn(conn)
     cursor = conn_actual.cursor()
     try:
+        cursor.execute("SELECT equipo_id FROM jugadores WHERE id = ?", (jugador_id,))
+        anterior = cursor.fetchone()
         cursor.execute("UPDATE jugadores SET equipo_id = ? WHERE id = ?", (nuevo_equipo_id, jugador_id))
+        _al_confirmar(conn_actual, cache_render.invalidar, 'plantilla', nuevo_equipo_id, *([anterior['equipo_id']] if anterior else []))
         if close_conn: conn_actual.commit()
         return True
     except sqlite3.Error as e:
@@ -669,7 +1152,8 @@ def update_clasificacion(liga_id, equipo_id, temporada, pj, pg, pe, pp, gf, gc,
                 dg = excluded.dg,
                 pts = excluded.pts
         ''', (liga_id, equipo_id, temporada, zona_nombre, pj, pg, pe, pp, gf, gc, dg, pts))
-        
+        _al_confirmar(conn_actual, cache_render.invalidar, 'clasificacion', liga_id)
+
         if close_conn: conn_actual.commit()
         return True
     except sqlite3.Error as e:
@@ -712,6 +1196,21 @@ def get_equipo_clasificacion_stats(liga_id, equipo_id, temporada, conn=None):
     _close_conn_if_created(conn_actual, close_conn)
     return dict(stats) if stats else None
 
+def get_clasificacion_equipos(liga_id, temporada, equipo_ids, conn=None):
+    """{equipo_id: fila de clasificaciones} de los equipos dados en una consulta (los que no tienen fila no salen)."""
+    equipo_ids = list(equipo_ids)
+    if not equipo_ids:
+        return {}
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    cursor.execute(f'''
+        SELECT * FROM clasificaciones
+        WHERE liga_id = ? AND temporada = ? AND equipo_id IN ({', '.join('?' * len(equipo_ids))})
+    ''', [liga_id, temporada] + equipo_ids)
+    stats = cursor.fetchall()
+    _close_conn_if_created(conn_actual, close_conn)
+    return {fila['equipo_id']: dict(fila) for fila in stats}
+
 def reset_clasificacion_liga(liga_id, temporada, conn=None):
     conn_actual, close_conn = _get_conn(conn)
     cursor = conn_actual.cursor()
@@ -730,7 +1229,8 @@ def reset_clasificacion_liga(liga_id, temporada, conn=None):
                     zona = excluded.zona, -- Asegura que la zona se reinicie a NULL
                     pj = 0, pg = 0, pe = 0, pp = 0, gf = 0, gc = 0, dg = 0, pts = 0
             ''', (liga_id, equipo['id'], temporada, None)) # Pasar None explícitamente para la zona
-        
+        _al_confirmar(conn_actual, cache_render.invalidar, 'clasificacion', liga_id)
+
         if close_conn: conn_actual.commit()
         return True
     except sqlite3.Error as e:
@@ -748,6 +1248,7 @@ def add_jornada(liga_id, temporada, numero_jornada, conn=None):
             INSERT OR IGNORE INTO jornadas (liga_id, temporada, numero_jornada)
             VALUES (?, ?, ?)
         ''', (liga_id, temporada, numero_jornada))
+        _al_confirmar(conn_actual, cache_render.invalidar, 'fixture', liga_id)
         if close_conn: conn_actual.commit()
         return cursor.lastrowid
     except sqlite3.Error as e:
@@ -761,6 +1262,7 @@ def update_jornada_fecha(jornada_id, fecha_simulacion_str, conn=None):
     cursor = conn_actual.cursor()
     try:
         cursor.execute("UPDATE jornadas SET fecha_simulacion = ? WHERE id = ?", (fecha_simulacion_str, jornada_id))
+        _al_confirmar(conn_actual, cache_render.invalidar, 'fixture', _liga_de_jornada(cursor, jornada_id))
         if close_conn: conn_actual.commit()
         return True
     except sqlite3.Error as e:
@@ -789,14 +1291,86 @@ def add_partido(jornada_id, equipo_local_id, equipo_visitante_id, conn=None, zon
             INSERT OR IGNORE INTO partidos (jornada_id, equipo_local_id, equipo_visitante_id, simulado, zona, tipo_partido)
             VALUES (?, ?, ?, 0, ?, ?)
         ''', (jornada_id, equipo_local_id, equipo_visitante_id, zona, tipo_partido))
+        partido_id = cursor.lastrowid
+        _al_confirmar(conn_actual, cache_render.invalidar, 'fixture', _liga_de_jornada(cursor, jornada_id))
         if close_conn: conn_actual.commit()
-        return cursor.lastrowid
+        return partido_id
     except sqlite3.Error as e:
         print(f"Error al añadir partido: {e}")
         return None
     finally:
         _close_conn_if_created(conn_actual, close_conn)
 
+def add_fixture(liga_id, temporada, jornadas, conn=None):
+    """
+    Guarda de una vez las jornadas de la temporada y sus partidos por jugar (tipo 'liga').
+    jornadas: lista de (numero_jornada, fecha_simulacion, partidos) con partidos = [(local_id, visitante_id, zona), ...].
+    Las jornadas de la temporada tienen que estar borradas antes (delete_jornadas_y_partidos_liga_temporada).
+    Retorna la cantidad de partidos guardados, o None si hubo error.
+    """
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    try:
+        cursor.executemany('''
+            INSERT INTO jornadas (liga_id, temporada, numero_jornada, fecha_simulacion)
+            VALUES (?, ?, ?, ?)
+        ''', [(liga_id, temporada, numero, fecha) for numero, fecha, _ in jornadas])
+        cursor.execute("SELECT id, numero_jornada FROM jornadas WHERE liga_id = ? AND temporada = ?", (liga_id, temporada))
+        jornada_por_numero = {fila['numero_jornada']: fila['id'] for fila in cursor.fetchall()}
+        filas = [(jornada_por_numero[numero], local, visitante, zona)
+                 for numero, _, partidos in jornadas
+                 for local, visitante, zona in partidos]
+        cursor.executemany('''
+            INSERT INTO partidos (jornada_id, equipo_local_id, equipo_visitante_id, simulado, zona, tipo_partido)
+            VALUES (?, ?, ?, 0, ?, 'liga')
+        ''', filas)
+        _al_confirmar(conn_actual, cache_render.invalidar, 'fixture', liga_id)
+        if close_conn: conn_actual.commit()
+        return len(filas)
+    except sqlite3.Error as e:
+        print(f"Error al guardar el fixture de la liga {liga_id}: {e}")
+        return None
+    finally:
+        _close_conn_if_created(conn_actual, close_conn)
+
+def add_rondas_eliminatoria(liga_id, temporada, rondas, conn=None):
+    """
+    Guarda de una vez los partidos ya jugados de una fase eliminatoria.
+    Cada ronda ocupa una jornada nueva a continuación de la última de la temporada, para que
+    los cruces aparezcan en el calendario y se archiven con la temporada.
+    rondas: lista de (fecha_simulacion, partidos) con partidos = [(local_id, visitante_id, goles_local, goles_visitante, tipo_partido, zona), ...].
+    Retorna la cantidad de partidos guardados (0 si hubo error).
+    """
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    try:
+        cursor.execute("SELECT COALESCE(MAX(numero_jornada), 0) AS ultima FROM jornadas WHERE liga_id = ? AND temporada = ?",
+                       (liga_id, temporada))
+        primera = cursor.fetchone()['ultima'] + 1
+        cursor.executemany('''
+            INSERT INTO jornadas (liga_id, temporada, numero_jornada, fecha_simulacion)
+            VALUES (?, ?, ?, ?)
+        ''', [(liga_id, temporada, primera + i, fecha) for i, (fecha, _) in enumerate(rondas)])
+        cursor.execute("SELECT id, numero_jornada FROM jornadas WHERE liga_id = ? AND temporada = ? AND numero_jornada >= ?",
+                       (liga_id, temporada, primera))
+        jornada_por_numero = {fila['numero_jornada']: fila['id'] for fila in cursor.fetchall()}
+        filas = [(jornada_por_numero[primera + i], local, visitante, gl, gv, zona, tipo)
+                 for i, (_, partidos) in enumerate(rondas)
+                 for local, visitante, gl, gv, tipo, zona in partidos]
+        cursor.executemany('''
+            INSERT INTO partidos (jornada_id, equipo_local_id, equipo_visitante_id, resultado_local, resultado_visitante, simulado, zona, tipo_partido)
+            VALUES (?, ?, ?, ?, ?, 1, ?, ?)
+        ''', filas)
+        _al_confirmar(conn_actual, cache_render.invalidar, 'fixture', liga_id)
+        _al_confirmar(conn_actual, cache_render.invalidar, 'partidos', liga_id)
+        if close_conn: conn_actual.commit()
+        return len(filas)
+    except sqlite3.Error as e:
+        print(f"Error al guardar la fase eliminatoria de la liga {liga_id}: {e}")
+        return 0
+    finally:
+        _close_conn_if_created(conn_actual, close_conn)
+
 def update_partido_resultado(partido_id, resultado_local, resultado_visitante, conn=None):
     conn_actual, close_conn = _get_conn(conn)
     cursor = conn_actual.cursor()
@@ -806,6 +1380,10 @@ def update_partido_resultado(partido_id, resultado_local, resultado_visitante, c
             SET resultado_local = ?, resultado_visitante = ?, simulado = 1
             WHERE id = ?
         ''', (resultado_local, resultado_visitante, partido_id))
+        cursor.execute("SELECT j.liga_id FROM partidos p JOIN jornadas j ON j.id = p.jornada_id WHERE p.id = ?", (partido_id,))
+        partido = cursor.fetchone()
+        if partido:
+            _al_confirmar(conn_actual, cache_render.invalidar, 'partidos', partido['liga_id'])
         if close_conn: conn_actual.commit()
         return True
     except sqlite3.Error as e:
@@ -814,6 +1392,97 @@ def update_partido_resultado(partido_id, resultado_local, resultado_visitante, c
     finally:
         _close_conn_if_created(conn_actual, close_conn)
 
+def _insertar_eventos(cursor, eventos_por_partido):
+    """
+    Agrega los eventos [(partido_id, [(minuto, tipo, jugador_id, equipo_id)])] a eventos_partido y
+    suma los goles/asistencias a estadisticas_jugadores de la liga y temporada de cada partido.
+    """
+    filas, totales = [], {}
+    for partido_id, eventos in eventos_por_partido:
+        for minuto, tipo, jugador_id, equipo_id in eventos:
+            filas.append((partido_id, minuto, tipo, jugador_id, equipo_id))
+            goles, asistencias, _ = totales.get((partido_id, jugador_id), (0, 0, equipo_id))
+            totales[(partido_id, jugador_id)] = (goles + (tipo == 1), asistencias + (tipo == 2), equipo_id)
+    if not filas:
+        return
+    cursor.executemany("INSERT INTO eventos_partido (partido_id, minuto, tipo, jugador_id, equipo_id) VALUES (?, ?, ?, ?, ?)", filas)
+    cursor.executemany('''
+        INSERT INTO estadisticas_jugadores (liga_id, temporada, jugador_id, equipo_id, goles, asistencias)
+        SELECT j.liga_id, j.temporada, ?, ?, ?, ?
+        FROM partidos p JOIN jornadas j ON j.id = p.jornada_id
+        WHERE p.id = ?
+        ON CONFLICT (liga_id, temporada, jugador_id) DO UPDATE SET
+            equipo_id = excluded.equipo_id,
+            goles = goles + excluded.goles,
+            asistencias = asistencias + excluded.asistencias
+    ''', [(jugador_id, equipo_id, goles, asistencias, partido_id)
+          for (partido_id, jugador_id), (goles, asistencias, equipo_id) in totales.items()])
+
+def add_eventos_partido(partido_id, eventos, conn=None):
+    """
+    Guarda los eventos de un partido (eventos_partido.eventos_resultado: [(minuto, tipo, jugador_id, equipo_id)])
+    y los suma a estadisticas_jugadores de la liga y temporada del partido, en la misma transacción.
+    Retorna True si se guardaron.
+    """
+    if not eventos:
+        return True
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    try:
+        _insertar_eventos(cursor, [(partido_id, eventos)])
+        cursor.execute("SELECT j.liga_id FROM partidos p JOIN jornadas j ON j.id = p.jornada_id WHERE p.id = ?", (partido_id,))
+        partido = cursor.fetchone()
+        if partido:
+            _al_confirmar(conn_actual, cache_render.invalidar, 'partidos', partido['liga_id'])
+        if close_conn: conn_actual.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Error al guardar los eventos del partido {partido_id}: {e}")
+        return False
+    finally:
+        _close_conn_if_created(conn_actual, close_conn)
+
+def guardar_resultados_partidos(liga_id, temporada, resultados, clasificaciones, eventos=(), conn=None):
+    """
+    Escribe de una vez los resultados de varios partidos de una liga, en una transacción:
+    resultados = [(goles_local, goles_visitante, partido_id)],
+    clasificaciones = [(equipo_id, zona, pj, pg, pe, pp, gf, gc, dg, pts)] con los totales ya sumados,
+    eventos = [(partido_id, eventos)] como en add_eventos_partido.
+    Retorna True si se guardó todo.
+    """
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    try:
+        cursor.executemany('''
+            UPDATE partidos
+            SET resultado_local = ?, resultado_visitante = ?, simulado = 1
+            WHERE id = ?
+        ''', resultados)
+        cursor.executemany('''
+            INSERT INTO clasificaciones (liga_id, temporada, equipo_id, zona, pj, pg, pe, pp, gf, gc, dg, pts)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(liga_id, equipo_id, temporada) DO UPDATE SET
+                zona = excluded.zona,
+                pj = excluded.pj,
+                pg = excluded.pg,
+                pe = excluded.pe,
+                pp = excluded.pp,
+                gf = excluded.gf,
+                gc = excluded.gc,
+                dg = excluded.dg,
+                pts = excluded.pts
+        ''', [(liga_id, temporada) + tuple(fila) for fila in clasificaciones])
+        _insertar_eventos(cursor, eventos)
+        _al_confirmar(conn_actual, cache_render.invalidar, 'partidos', liga_id)
+        _al_confirmar(conn_actual, cache_render.invalidar, 'clasificacion', liga_id)
+        if close_conn: conn_actual.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Error al guardar los resultados de la liga {liga_id}: {e}")
+        return False
+    finally:
+        _close_conn_if_created(conn_actual, close_conn)
+
 def get_partidos_por_jornada(jornada_id, conn=None):
     conn_actual, close_conn = _get_conn(conn)
     cursor = conn_actual.cursor()
@@ -844,7 +1513,12 @@ def get_jornadas_por_liga_y_temporada(liga_id, temporada, conn=None):
     _close_conn_if_created(conn_actual, close_conn)
     return [dict(j) for j in jornadas]
 
-def get_all_partidos_carrera(user_id, conn=None):
+def get_all_partidos_carrera(user_id, temporada=None, conn=None):
+    """
+    Calendario del equipo del usuario en la liga de su carrera, con la fecha de cada jornada.
+    temporada=None usa la temporada actual de la carrera. Una sola consulta: las jornadas salen
+    del índice UNIQUE(liga_id, temporada, numero_jornada) y sus partidos de idx_partidos_jornada.
+    """
     conn_actual, close_conn = _get_conn(conn)
     cursor = conn_actual.cursor()
     cursor.execute("""
@@ -852,6 +1526,8 @@ def get_all_partidos_carrera(user_id, conn=None):
             p.id,
             p.jornada_id,
             j.numero_jornada,
+            p.equipo_local_id,
+            p.equipo_visitante_id,
             el.nombre AS equipo_local_nombre,
             ev.nombre AS equipo_visitante_nombre,
             p.resultado_local,
@@ -861,14 +1537,14 @@ def get_all_partidos_carrera(user_id, conn=None):
             p.zona, -- Seleccionar la zona
             p.tipo_partido, -- Seleccionar tipo de partido
             c.equipo_id AS id_equipo_usuario
-        FROM partidos p
-        JOIN jornadas j ON p.jornada_id = j.id
+        FROM carreras c
+        JOIN jornadas j ON j.liga_id = c.liga_id AND j.temporada = COALESCE(?, c.temporada)
+        JOIN partidos p ON p.jornada_id = j.id
         JOIN equipos el ON p.equipo_local_id = el.id
         JOIN equipos ev ON p.equipo_visitante_id = ev.id
-        JOIN carreras c ON (c.equipo_id = p.equipo_local_id OR c.equipo_id = p.equipo_visitante_id)
-        WHERE c.usuario_id = ?
+        WHERE c.usuario_id = ? AND c.equipo_id IN (p.equipo_local_id, p.equipo_visitante_id)
         ORDER BY j.numero_jornada ASC, p.id ASC
-    """, (user_id,))
+    """, (temporada, user_id))
     partidos = cursor.fetchall()
     _close_conn_if_created(conn_actual, close_conn)
     return [dict(p) for p in partidos]
@@ -893,6 +1569,24 @@ def get_all_partidos_simulados_en_temporada(liga_id, temporada, conn=None):
     _close_conn_if_created(conn_actual, close_conn)
     return [dict(p) for p in partidos]
 
+def get_partidos_pendientes_liga(liga_id, temporada, conn=None):
+    """
+    Partidos de fase regular (tipo 'liga') que faltan jugar en la temporada, en orden de jornada
+    (para las proyecciones y la simulación de las ligas de IA).
+    """
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    cursor.execute('''
+        SELECT p.id, p.equipo_local_id, p.equipo_visitante_id, p.zona
+        FROM jornadas j
+        JOIN partidos p ON p.jornada_id = j.id
+        WHERE j.liga_id = ? AND j.temporada = ? AND p.simulado = 0 AND p.tipo_partido = 'liga'
+        ORDER BY j.numero_jornada, p.id
+    ''', (liga_id, temporada))
+    partidos = cursor.fetchall()
+    _close_conn_if_created(conn_actual, close_conn)
+    return [dict(p) for p in partidos]
+
 def get_proximo_partido_tu_equipo(user_id, tu_equipo_id, dia_actual, conn=None):
     conn_actual, close_conn = _get_conn(conn)
     cursor = conn_actual.cursor()
@@ -1034,8 +1728,15 @@ def delete_jornadas_y_partidos_liga_temporada(liga_id, temporada, conn=None):
         if jornada_ids_rows:
             jornada_ids_tuple = tuple([j['id'] for j in jornada_ids_rows])
             
-            cursor.execute(f"DELETE FROM partidos WHERE jornada_id IN ({','.join(['?' for _ in jornada_ids_tuple])})", jornada_ids_tuple)
+            marcadores = ','.join(['?' for _ in jornada_ids_tuple])
+            cursor.execute(f"DELETE FROM eventos_partido WHERE partido_id IN (SELECT id FROM partidos WHERE jornada_id IN ({marcadores}))", jornada_ids_tuple)
+            cursor.execute(f"DELETE FROM partidos WHERE jornada_id IN ({marcadores})", jornada_ids_tuple)
             cursor.execute("DELETE FROM jornadas WHERE liga_id = ? AND temporada = ?", (liga_id, temporada))
+            cursor.execute("DELETE FROM estadisticas_jugadores WHERE liga_id = ? AND temporada = ?", (liga_id, temporada))
+            # También se fueron los resultados y los goles de la temporada (!goleadores depende de 'partidos')
+            _al_confirmar(conn_actual, cache_render.invalidar, 'fixture', liga_id)
+            _al_confirmar(conn_actual, cache_render.invalidar, 'partidos', liga_id)
+            _al_confirmar(conn_actual, cache_render.invalidar, 'clasificacion', liga_id)
         
         if close_conn: conn_actual.commit()
         return True
@@ -1043,4 +1744,611 @@ def delete_jornadas_y_partidos_liga_temporada(liga_id, temporada, conn=None):
         print(f"Error al eliminar jornadas y partidos antiguos: {e}")
         return False
     finally:
-        _close_conn_if_created(conn_actual, close_conn)
\ No newline at end of file
+        _close_conn_if_created(conn_actual, close_conn)
+# Funciones del registro de importaciones (reimportación incremental de los *_players.txt)
+def get_hash_importacion_archivo(ruta_archivo, conn=None):
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    cursor.execute("SELECT hash_contenido FROM importaciones_archivos WHERE ruta_archivo = ?", (ruta_archivo,))
+    fila = cursor.fetchone()
+    _close_conn_if_created(conn_actual, close_conn)
+    return fila['hash_contenido'] if fila else None
+
+def set_hash_importacion_archivo(ruta_archivo, liga_id, hash_contenido, conn=None):
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    try:
+        cursor.execute('''
+            INSERT INTO importaciones_archivos (ruta_archivo, liga_id, hash_contenido, fecha_importacion)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(ruta_archivo) DO UPDATE SET
+                liga_id = excluded.liga_id,
+                hash_contenido = excluded.hash_contenido,
+                fecha_importacion = excluded.fecha_importacion
+        ''', (ruta_archivo, liga_id, hash_contenido, datetime.datetime.now().isoformat(timespec='seconds')))
+        if close_conn: conn_actual.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Error al registrar importación de '{ruta_archivo}': {e}")
+        return False
+    finally:
+        _close_conn_if_created(conn_actual, close_conn)
+
+def get_bloques_importacion_liga(liga_id, conn=None):
+    """Devuelve {equipo_nombre: {'hash': ..., 'lineas': ...}} de la última importación de la liga."""
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    cursor.execute("SELECT equipo_nombre, hash_contenido, lineas FROM importaciones_bloques WHERE liga_id = ?", (liga_id,))
+    bloques = {row['equipo_nombre']: {'hash': row['hash_contenido'], 'lineas': row['lineas']} for row in cursor.fetchall()}
+    _close_conn_if_created(conn_actual, close_conn)
+    return bloques
+
+def replace_bloques_importacion_liga(liga_id, bloques, conn=None):
+    """Reemplaza los bloques guardados de la liga. bloques: lista de (equipo_nombre, hash, lineas)."""
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    try:
+        cursor.execute("DELETE FROM importaciones_bloques WHERE liga_id = ?", (liga_id,))
+        cursor.executemany(
+            "INSERT INTO importaciones_bloques (liga_id, equipo_nombre, hash_contenido, lineas) VALUES (?, ?, ?, ?)",
+            [(liga_id, equipo, hash_bloque, lineas) for equipo, hash_bloque, lineas in bloques]
+        )
+        if close_conn: conn_actual.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Error al guardar bloques de importación de la liga {liga_id}: {e}")
+        return False
+    finally:
+        _close_conn_if_created(conn_actual, close_conn)
+
+# --- Checkpoints del scraper multi-liga ---
+
+def registrar_equipos_scrape(liga, equipos, conn=None):
+    """Da de alta como 'pendiente' los equipos (url_equipo, nombre) de la liga que aún no tienen checkpoint."""
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    try:
+        cursor.executemany(
+            "INSERT OR IGNORE INTO scrape_checkpoints (liga, url_equipo, equipo_nombre, fecha_actualizacion) VALUES (?, ?, ?, ?)",
+            [(liga, url, nombre, datetime.datetime.now().isoformat(timespec='seconds')) for url, nombre in equipos]
+        )
+        if close_conn: conn_actual.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Error al registrar los equipos a scrapear de '{liga}': {e}")
+        return False
+    finally:
+        _close_conn_if_created(conn_actual, close_conn)
+
+def get_checkpoints_scrape(liga, conn=None):
+    """Devuelve los checkpoints de la liga como lista de dicts (url_equipo, equipo_nombre, estado, intentos, ultimo_error...)."""
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    cursor.execute("SELECT * FROM scrape_checkpoints WHERE liga = ? ORDER BY equipo_nombre", (liga,))
+    checkpoints = [dict(row) for row in cursor.fetchall()]
+    _close_conn_if_created(conn_actual, close_conn)
+    return checkpoints
+
+def update_checkpoint_scrape(liga, url_equipo, estado, error=None, conn=None):
+    """Registra un intento sobre el equipo: nuevo estado, intentos + 1 y el último error (None si fue bien)."""
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    try:
+        cursor.execute(
+            """UPDATE scrape_checkpoints SET estado = ?, intentos = intentos + 1, ultimo_error = ?, fecha_actualizacion = ?
+               WHERE liga = ? AND url_equipo = ?""",
+            (estado, error, datetime.datetime.now().isoformat(timespec='seconds'), liga, url_equipo)
+        )
+        if close_conn: conn_actual.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Error al actualizar el checkpoint de {url_equipo} ({liga}): {e}")
+        return False
+    finally:
+        _close_conn_if_created(conn_actual, close_conn)
+
+def reset_checkpoints_scrape(liga, conn=None):
+    """Borra los checkpoints de la liga para volver a scrapearla desde cero."""
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    try:
+        cursor.execute("DELETE FROM scrape_checkpoints WHERE liga = ?", (liga,))
+        if close_conn: conn_actual.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Error al reiniciar los checkpoints de '{liga}': {e}")
+        return False
+    finally:
+        _close_conn_if_created(conn_actual, close_conn)
+
+
+# Funciones de archivo de temporadas
+def ruta_archivo(ruta_db=None):
+    """Ruta del archivo de temporadas archivadas, junto a la base indicada (por defecto la del mundo activo)."""
+    base, extension = os.path.splitext(ruta_db or ruta_db_actual())
+    return f"{base}_archivo{extension or '.db'}"
+
+def _adjuntar_archivo(conn, ruta=None):
+    """
+    Adjunta el archivo de temporadas (por defecto el del mundo activo) a la conexión, si no lo
+    estaba, y crea sus tablas.
+    ATTACH no se puede hacer dentro de una transacción abierta.
+    """
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA database_list")
+    if ALIAS_ARCHIVO not in [fila[1] for fila in cursor.fetchall()]:
+        cursor.execute(f"ATTACH DATABASE ? AS {ALIAS_ARCHIVO}", (ruta or ruta_archivo(),))
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {ALIAS_ARCHIVO}.jornadas (
+            id INTEGER PRIMARY KEY,
+            liga_id INTEGER NOT NULL,
+            temporada INTEGER NOT NULL,
+            numero_jornada INTEGER NOT NULL,
+            fecha_simulacion TEXT
+        )
+    ''')
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {ALIAS_ARCHIVO}.idx_jornadas_liga_temporada ON jornadas (liga_id, temporada)")
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {ALIAS_ARCHIVO}.partidos (
+            id INTEGER PRIMARY KEY,
+            jornada_id INTEGER,
+            equipo_local_id INTEGER NOT NULL,
+            equipo_visitante_id INTEGER NOT NULL,
+            resultado_local INTEGER,
+            resultado_visitante INTEGER,
+            simulado INTEGER,
+            zona TEXT,
+            tipo_partido TEXT
+        )
+    ''')
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {ALIAS_ARCHIVO}.idx_partidos_jornada ON partidos (jornada_id)")
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {ALIAS_ARCHIVO}.eventos_partido (
+            partido_id INTEGER NOT NULL,
+            minuto INTEGER NOT NULL,
+            tipo INTEGER NOT NULL,
+            jugador_id INTEGER NOT NULL,
+            equipo_id INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS {ALIAS_ARCHIVO}.idx_eventos_partido ON eventos_partido (partido_id)")
+
+def get_temporadas_archivables(conn=None):
+    """
+    (liga_id, temporada) con datos en las tablas de la temporada en curso que ya terminaron para
+    todas las carreras (temporada menor que la de la carrera más atrasada). Sin carreras no hay ninguna.
+    """
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    cursor.execute('''
+        SELECT liga_id, temporada FROM jornadas WHERE temporada < (SELECT MIN(temporada) FROM carreras)
+        UNION
+        SELECT liga_id, temporada FROM clasificaciones WHERE temporada < (SELECT MIN(temporada) FROM carreras)
+        ORDER BY temporada, liga_id
+    ''')
+    temporadas = cursor.fetchall()
+    _close_conn_if_created(conn_actual, close_conn)
+    return [(t['liga_id'], t['temporada']) for t in temporadas]
+
+def archivar_temporada(liga_id, temporada, conn=None):
+    """
+    Compacta una temporada terminada de una liga:
+    - la clasificación final (con posición y nombre del equipo) pasa a historial_clasificaciones,
+    - un resumen (jornadas, partidos, goles, campeón) a temporadas_archivadas,
+    - las jornadas, partidos y eventos de partido se copian al archivo adjunto y se borran, junto con
+      la clasificación, de las tablas de la temporada en curso (estadisticas_jugadores queda como resumen).
+    Todo en una transacción. Retorna True si se archivó.
+    """
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    try:
+        _adjuntar_archivo(conn_actual)
+        cursor.execute('''
+            INSERT OR REPLACE INTO historial_clasificaciones
+                (liga_id, temporada, equipo_id, equipo_nombre, zona, pos, pj, pg, pe, pp, gf, gc, dg, pts)
+            SELECT c.liga_id, c.temporada, c.equipo_id, e.nombre, c.zona,
+                   ROW_NUMBER() OVER (PARTITION BY c.zona ORDER BY c.pts DESC, c.dg DESC, c.gf DESC, e.nombre ASC),
+                   c.pj, c.pg, c.pe, c.pp, c.gf, c.gc, c.dg, c.pts
+            FROM clasificaciones c
+            JOIN equipos e ON c.equipo_id = e.id
+            WHERE c.liga_id = ? AND c.temporada = ?
+        ''', (liga_id, temporada))
+        cursor.execute('''
+            INSERT OR REPLACE INTO temporadas_archivadas
+                (liga_id, temporada, jornadas, partidos_jugados, goles, campeon_equipo_id, fecha_archivo)
+            SELECT ?, ?,
+                   (SELECT COUNT(*) FROM jornadas WHERE liga_id = ? AND temporada = ?),
+                   COUNT(p.id),
+                   COALESCE(SUM(p.resultado_local + p.resultado_visitante), 0),
+                   (SELECT equipo_campeon_id FROM palmares WHERE liga_id = ? AND temporada = ? ORDER BY id LIMIT 1),
+                   ?
+            FROM jornadas j
+            JOIN partidos p ON p.jornada_id = j.id AND p.simulado = 1
+            WHERE j.liga_id = ? AND j.temporada = ?
+        ''', (liga_id, temporada, liga_id, temporada, liga_id, temporada,
+              datetime.datetime.now().isoformat(timespec='seconds'), liga_id, temporada))
+
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO {ALIAS_ARCHIVO}.jornadas (id, liga_id, temporada, numero_jornada, fecha_simulacion)
+            SELECT id, liga_id, temporada, numero_jornada, fecha_simulacion
+            FROM main.jornadas WHERE liga_id = ? AND temporada = ?
+        ''', (liga_id, temporada))
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO {ALIAS_ARCHIVO}.partidos
+                (id, jornada_id, equipo_local_id, equipo_visitante_id, resultado_local, resultado_visitante, simulado, zona, tipo_partido)
+            SELECT p.id, p.jornada_id, p.equipo_local_id, p.equipo_visitante_id, p.resultado_local, p.resultado_visitante,
+                   p.simulado, p.zona, p.tipo_partido
+            FROM main.partidos p
+            JOIN main.jornadas j ON p.jornada_id = j.id
+            WHERE j.liga_id = ? AND j.temporada = ?
+        ''', (liga_id, temporada))
+        cursor.execute(f'''
+            INSERT INTO {ALIAS_ARCHIVO}.eventos_partido (partido_id, minuto, tipo, jugador_id, equipo_id)
+            SELECT ev.partido_id, ev.minuto, ev.tipo, ev.jugador_id, ev.equipo_id
+            FROM main.eventos_partido ev
+            JOIN main.partidos p ON p.id = ev.partido_id
+            JOIN main.jornadas j ON p.jornada_id = j.id
+            WHERE j.liga_id = ? AND j.temporada = ?
+        ''', (liga_id, temporada))
+
+        cursor.execute('''
+            DELETE FROM main.eventos_partido
+            WHERE partido_id IN (SELECT p.id FROM main.partidos p JOIN main.jornadas j ON p.jornada_id = j.id
+                                 WHERE j.liga_id = ? AND j.temporada = ?)
+        ''', (liga_id, temporada))
+        cursor.execute('''
+            DELETE FROM main.partidos
+            WHERE jornada_id IN (SELECT id FROM main.jornadas WHERE liga_id = ? AND temporada = ?)
+        ''', (liga_id, temporada))
+        cursor.execute("DELETE FROM main.jornadas WHERE liga_id = ? AND temporada = ?", (liga_id, temporada))
+        cursor.execute("DELETE FROM main.clasificaciones WHERE liga_id = ? AND temporada = ?", (liga_id, temporada))
+        _al_confirmar(conn_actual, cache_render.invalidar, 'fixture', liga_id)
+        _al_confirmar(conn_actual, cache_render.invalidar, 'clasificacion', liga_id)
+        if close_conn: conn_actual.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Error al archivar la temporada {temporada} de la liga {liga_id}: {e}")
+        return False
+    finally:
+        _close_conn_if_created(conn_actual, close_conn)
+
+def archivar_temporadas_terminadas():
+    """Archiva todas las temporadas que ya terminaron para todas las carreras. Retorna la lista de (liga_id, temporada) archivadas."""
+    archivadas = []
+    for liga_id, temporada in get_temporadas_archivables():
+        if archivar_temporada(liga_id, temporada):
+            archivadas.append((liga_id, temporada))
+    return archivadas
+
+def get_temporadas_archivadas(liga_id, conn=None):
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    cursor.execute('''
+        SELECT t.*, e.nombre AS campeon_nombre
+        FROM temporadas_archivadas t
+        LEFT JOIN equipos e ON t.campeon_equipo_id = e.id
+        WHERE t.liga_id = ?
+        ORDER BY t.temporada ASC
+    ''', (liga_id,))
+    temporadas = cursor.fetchall()
+    _close_conn_if_created(conn_actual, close_conn)
+    return [dict(t) for t in temporadas]
+
+def get_clasificacion_historica(liga_id, temporada, zona_nombre=None, conn=None):
+    """Clasificación final de una temporada archivada, con las mismas columnas que get_clasificacion_liga."""
+    conn_actual, close_conn = _get_conn(conn)
+    cursor = conn_actual.cursor()
+    sql = '''
+        SELECT * FROM historial_clasificaciones
+        WHERE liga_id = ? AND temporada = ?
+    '''
+    params = [liga_id, temporada]
+    if zona_nombre:
+        sql += ' AND zona = ?'
+        params.append(zona_nombre)
+    sql += ' ORDER BY zona ASC, pos ASC'
+    cursor.execute(sql, tuple(params))
+    clasificacion = cursor.fetchall()
+    _close_conn_if_created(conn_actual, close_conn)
+    return [dict(c) for c in clasificacion]
+
+def get_partidos_archivados_equipo(equipo_id, liga_id, temporada):
+    """
+    Partidos de un equipo en una temporada archivada, con las mismas columnas que get_all_partidos_carrera.
+    Abre su propia conexión para adjuntar el archivo.
+    """
+    if not os.path.exists(ruta_archivo()):
+        return []
+    conn_actual = connect_db()
+    try:
+        _adjuntar_archivo(conn_actual)
+        cursor = conn_actual.cursor()
+        cursor.execute(f"""
+            SELECT
+                p.id,
+                p.jornada_id,
+                j.numero_jornada,
+                p.equipo_local_id,
+                p.equipo_visitante_id,
+                el.nombre AS equipo_local_nombre,
+                ev.nombre AS equipo_visitante_nombre,
+                p.resultado_local,
+                p.resultado_visitante,
+                j.fecha_simulacion AS fecha_partido,
+                p.simulado AS jugado,
+                p.zona,
+                p.tipo_partido,
+                ? AS id_equipo_usuario
+            FROM {ALIAS_ARCHIVO}.jornadas j
+            JOIN {ALIAS_ARCHIVO}.partidos p ON p.jornada_id = j.id
+            JOIN equipos el ON p.equipo_local_id = el.id
+            JOIN equipos ev ON p.equipo_visitante_id = ev.id
+            WHERE j.liga_id = ? AND j.temporada = ? AND ? IN (p.equipo_local_id, p.equipo_visitante_id)
+            ORDER BY j.numero_jornada ASC, p.id ASC
+        """, (equipo_id, liga_id, temporada, equipo_id))
+        return [dict(p) for p in cursor.fetchall()]
+    except sqlite3.Error as e:
+        print(f"Error al leer partidos archivados de la temporada {temporada}: {e}")
+        return []
+    finally:
+        conn_actual.close()
+
+
+# Funciones de mundos (una base de datos por carrera)
+def _connect_plantilla():
+    conn = sqlite3.connect(DATABASE_NAME)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def _crear_tabla_mundos(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS mundos (
+            usuario_id INTEGER PRIMARY KEY,
+            ruta TEXT NOT NULL,
+            fecha_creacion TEXT
+        )
+    ''')
+
+def _recordar_mundo(usuario_id, ruta):
+    with _lock_mundos:
+        _rutas_mundos[usuario_id] = ruta
+        _rutas_mundos.move_to_end(usuario_id)
+        if len(_rutas_mundos) > MAX_RUTAS_MUNDOS:
+            _rutas_mundos.popitem(last=False)
+
+def _mundo_recordado(usuario_id):
+    """(True, ruta) si el mundo del usuario ya se buscó, (False, None) si no."""
+    with _lock_mundos:
+        if usuario_id not in _rutas_mundos:
+            return False, None
+        _rutas_mundos.move_to_end(usuario_id)
+        return True, _rutas_mundos[usuario_id]
+
+def get_mundo_usuario(usuario_id):
+    """Ruta del mundo del usuario según el registro de la plantilla, o None si no tiene (juega en la plantilla)."""
+    recordado, ruta = _mundo_recordado(usuario_id)
+    if recordado:
+        return ruta
+    conn = _connect_plantilla()
+    try:
+        cursor = conn.cursor()
+        _crear_tabla_mundos(cursor)
+        cursor.execute("SELECT ruta FROM mundos WHERE usuario_id = ?", (usuario_id,))
+        fila = cursor.fetchone()
+        if not fila:
+            cursor.execute("SELECT 1 FROM carreras WHERE usuario_id = ?", (usuario_id,))
+            if cursor.fetchone():
+                _carreras_en_plantilla.add(usuario_id)
+        ruta = fila['ruta'] if fila else None
+        _recordar_mundo(usuario_id, ruta)
+        return ruta
+    except sqlite3.Error as e:
+        print(f"Error al buscar el mundo del usuario {usuario_id}: {e}")
+        return None
+    finally:
+        conn.close()
+
+def tiene_carrera_en_plantilla(usuario_id):
+    """True si el usuario tiene una carrera anterior a los mundos que todavía juega en la plantilla."""
+    get_mundo_usuario(usuario_id)
+    return usuario_id in _carreras_en_plantilla
+
+def preparar_mundo(usuario_id):
+    """
+    Busca el mundo del usuario y, la primera vez en este proceso, le aplica las migraciones de
+    esquema pendientes (init_db), sin dejarlo activo. Retorna la ruta o None (plantilla).
+    """
+    ruta = get_mundo_usuario(usuario_id)
+    if ruta and ruta not in _mundos_inicializados:
+        token = _mundo_actual.set(ruta)
+        try:
+            init_db()
+        finally:
+            _mundo_actual.reset(token)
+        _mundos_inicializados.add(ruta)
+    return ruta
+
+def mundo_preparado(usuario_id):
+    """True si usar_mundo(usuario_id) ya no necesita consultar ni escribir ninguna base."""
+    recordado, ruta = _mundo_recordado(usuario_id)
+    return (recordado and usuario_id not in _carreras_en_plantilla
+            and (ruta is None or ruta in _mundos_inicializados))
+
+def usar_mundo(usuario_id):
+    """
+    Activa el mundo del usuario para el contexto actual: todas las funciones de este módulo
+    usan su base hasta que termine la tarea (o hilo) que lo activó. Un usuario sin mundo usa la
+    plantilla (una carrera anterior a los mundos se pasa antes con migrar_carrera_a_mundo).
+    Si el mundo no está preparado (preparar_mundo) consulta la plantilla; desde el bot se usa
+    database_async.usar_mundo. Retorna la ruta activa.
+    """
+    _mundo_actual.set(preparar_mundo(usuario_id))
+    return ruta_db_actual()
+
+def crear_mundo(usuario_id, conservar_estado=False):
+    """
+    Crea el mundo de un usuario clonando la plantilla con la API de backup de SQLite (copia
+    consistente aunque la plantilla esté en uso) y vacía en la copia las tablas de estado de juego.
+    Con conservar_estado=True (migración de una carrera que jugaba en la plantilla) el estado de
+    juego se copia tal cual y solo se quitan las carreras de los demás usuarios; del archivo de
+    temporadas de la plantilla se copian las que esa carrera ya jugó.
+    Si el usuario ya tenía un mundo, se reemplaza junto con su archivo. Retorna la ruta o None si falló.
+    """
+    carpeta = os.path.join(os.path.dirname(DATABASE_NAME), CARPETA_MUNDOS)
+    ruta = os.path.join(carpeta, f"mundo_{usuario_id}.db")
+    os.makedirs(carpeta, exist_ok=True)
+    # El archivo del mundo anterior también se descarta: si no, el nuevo adjuntaría temporadas
+    # que no son suyas, con ids que pueden chocar con los que la copia vuelva a generar
+    for anterior in (ruta, ruta_archivo(ruta)):
+        if os.path.exists(anterior):
+            os.remove(anterior)
+    plantilla = _connect_plantilla()
+    copia = sqlite3.connect(ruta)
+    try:
+        plantilla.backup(copia)
+        cursor = copia.cursor()
+        cursor.execute("DROP TABLE IF EXISTS mundos")
+        cursor.execute("DROP TABLE IF EXISTS estados_conversacion") # Son de todos los usuarios y viven en la plantilla
+        if conservar_estado:
+            cursor.execute("DELETE FROM carreras WHERE usuario_id != ?", (usuario_id,))
+        else:
+            for tabla in TABLAS_ESTADO_JUEGO:
+                cursor.execute(f"DELETE FROM {tabla}")
+        copia.commit()
+        if conservar_estado:
+            _copiar_archivo_carrera(copia, usuario_id, ruta_archivo(DATABASE_NAME), ruta_archivo(ruta))
+
+        cursor = plantilla.cursor()
+        _crear_tabla_mundos(cursor)
+        cursor.execute("INSERT OR REPLACE INTO mundos (usuario_id, ruta, fecha_creacion) VALUES (?, ?, ?)",
+                       (usuario_id, ruta, datetime.datetime.now().isoformat(timespec='seconds')))
+        plantilla.commit()
+        _recordar_mundo(usuario_id, ruta)
+        _carreras_en_plantilla.discard(usuario_id)
+        _mundos_inicializados.discard(ruta)
+        # Si el mundo se reemplazó, lo leído y renderizado del anterior ya no vale
+        cache_entidades.vaciar_ambito(ruta)
+        cache_render.vaciar_ambito(ruta)
+        return ruta
+    except sqlite3.Error as e:
+        print(f"Error al crear el mundo del usuario {usuario_id}: {e}")
+        return None
+    finally:
+        copia.close()
+        plantilla.close()
+
+
+def _copiar_archivo_carrera(copia, usuario_id, origen, destino):
+    """
+    Copia del archivo de temporadas de la plantilla (`origen`) al del mundo (`destino`) las
+    jornadas, partidos y eventos de las temporadas anteriores a la actual de la carrera del usuario.
+    """
+    if not os.path.exists(origen):
+        return
+    cursor = copia.cursor()
+    _adjuntar_archivo(copia, destino)
+    cursor.execute("ATTACH DATABASE ? AS origen", (origen,))
+    try:
+        cursor.execute(f'''
+            INSERT INTO {ALIAS_ARCHIVO}.jornadas
+            SELECT * FROM origen.jornadas
+            WHERE temporada < (SELECT temporada FROM main.carreras WHERE usuario_id = ?)
+        ''', (usuario_id,))
+        cursor.execute(f'''
+            INSERT INTO {ALIAS_ARCHIVO}.partidos
+            SELECT * FROM origen.partidos WHERE jornada_id IN (SELECT id FROM {ALIAS_ARCHIVO}.jornadas)
+        ''')
+        cursor.execute(f'''
+            INSERT INTO {ALIAS_ARCHIVO}.eventos_partido
+            SELECT * FROM origen.eventos_partido WHERE partido_id IN (SELECT id FROM {ALIAS_ARCHIVO}.partidos)
+        ''')
+        copia.commit()
+    finally:
+        cursor.execute("DETACH DATABASE origen")
+        cursor.execute(f"DETACH DATABASE {ALIAS_ARCHIVO}")
+
+
+def migrar_carrera_a_mundo(usuario_id):
+    """
+    Pasa a un mundo propio la carrera de un usuario que todavía jugaba en la plantilla, para que
+    deje de modificar las plantillas, traspasos y progresiones que heredan los mundos nuevos.
+    No hace nada si el usuario ya tiene mundo. Retorna la ruta del mundo o None si falló.
+    """
+    ruta = get_mundo_usuario(usuario_id)
+    if ruta:
+        return ruta
+    ruta = crear_mundo(usuario_id, conservar_estado=True)
+    if ruta:
+        print(f"Carrera del usuario {usuario_id} migrada de la plantilla a su mundo: {ruta}")
+    return ruta
+
+
+# Estado de conversación (pasos de !iniciar_carrera, confirmaciones): vive en la plantilla
+# porque es de cada usuario y existe antes de que tenga mundo. La tabla la crea init_db.
+# Ver estado_conversacion.py
+def _crear_tabla_estados_conversacion(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS estados_conversacion (
+            usuario_id INTEGER PRIMARY KEY,
+            estado TEXT NOT NULL, -- JSON compacto
+            vence REAL NOT NULL   -- time.time() a partir del cual el estado ya no vale
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_estados_conversacion_vence ON estados_conversacion (vence)")
+
+def get_estado_conversacion(usuario_id, ahora):
+    """(estado, vence) del usuario si no venció, o None."""
+    conn = _connect_plantilla()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT estado, vence FROM estados_conversacion WHERE usuario_id = ? AND vence > ?", (usuario_id, ahora))
+        fila = cursor.fetchone()
+        return (json.loads(fila['estado']), fila['vence']) if fila else None
+    except (sqlite3.Error, ValueError) as e:
+        print(f"Error al leer el estado de conversación del usuario {usuario_id}: {e}")
+        return None
+    finally:
+        conn.close()
+
+def set_estado_conversacion(usuario_id, estado, vence):
+    conn = _connect_plantilla()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT INTO estados_conversacion (usuario_id, estado, vence) VALUES (?, ?, ?)
+            ON CONFLICT(usuario_id) DO UPDATE SET estado = excluded.estado, vence = excluded.vence
+        ''', (usuario_id, json.dumps(estado, separators=(',', ':'), ensure_ascii=False), vence))
+        conn.commit()
+        return True
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        print(f"Error al guardar el estado de conversación del usuario {usuario_id}: {e}")
+        return False
+    finally:
+        conn.close()
+
+def delete_estado_conversacion(usuario_id):
+    conn = _connect_plantilla()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM estados_conversacion WHERE usuario_id = ?", (usuario_id,))
+        conn.commit()
+        return True
+    except sqlite3.Error as e:
+        print(f"Error al borrar el estado de conversación del usuario {usuario_id}: {e}")
+        return False
+    finally:
+        conn.close()
+
+def delete_estados_conversacion_vencidos(ahora):
+    """Borra los estados vencidos (por el índice de vencimiento). Retorna cuántos borró."""
+    conn = _connect_plantilla()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM estados_conversacion WHERE vence <= ?", (ahora,))
+        conn.commit()
+        return cursor.rowcount
+    except sqlite3.Error as e:
+        print(f"Error al borrar estados de conversación vencidos: {e}")
+        return 0
+    finally:
+        conn.close()
@@ -0,0 +1,79 @@
+# database_async.py
+
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+
+import database
+
+# Acceso a la DB desde el bot sin bloquear el loop de asyncio. Las funciones de database.py
+# (y las de game_logic que escriben mucho, como avanzar_dia) siguen siendo síncronas; acá se
+# corren en hilos aparte y el handler solo espera el resultado:
+# - leer(): un pool de hilos de lectura; cada llamada abre su propia conexión, así que las
+#   lecturas de comandos distintos se superponen (SQLite admite varios lectores a la vez).
+# - escribir(): un único hilo de escritura, así las escrituras se hacen de a una, en orden de
+#   llegada, y no compiten por el lock de la base.
+# Cada llamada corre en una copia del contexto de quien la hace: el mundo activo
+# (database.usar_mundo, un ContextVar) sigue siendo el del usuario dentro del hilo.
+#
+# Más abajo están las versiones awaitables de las lecturas que más usan los comandos, con el
+# mismo nombre y argumentos que en database.py: await database_async.get_carrera_by_user(user_id).
+
+HILOS_LECTURA = 4
+
+_lectores = concurrent.futures.ThreadPoolExecutor(max_workers=HILOS_LECTURA, thread_name_prefix='db-lectura')
+_escritor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-escritura')
+
+async def _correr(ejecutor, funcion, *args, **kwargs):
+    contexto = contextvars.copy_context()
+    llamada = functools.partial(contexto.run, funcion, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(ejecutor, llamada)
+
+async def leer(funcion, *args, **kwargs):
+    """Corre una función de solo lectura en el pool de lectura, con el mundo activo de quien llama."""
+    return await _correr(_lectores, funcion, *args, **kwargs)
+
+async def escribir(funcion, *args, **kwargs):
+    """Corre una función que escribe en el hilo de escritura (de a una), con el mundo activo de quien llama."""
+    return await _correr(_escritor, funcion, *args, **kwargs)
+
+async def usar_mundo(usuario_id):
+    """
+    Versión awaitable de database.usar_mundo: la búsqueda del mundo en la plantilla, la migración
+    de una carrera anterior a los mundos y las migraciones de esquema corren en los hilos de la DB
+    (solo la primera vez); el mundo queda activo en la tarea de quien llama.
+    """
+    if not database.mundo_preparado(usuario_id):
+        if await leer(database.tiene_carrera_en_plantilla, usuario_id):
+            await escribir(database.migrar_carrera_a_mundo, usuario_id)
+        if not database.mundo_preparado(usuario_id):
+            await escribir(database.preparar_mundo, usuario_id)
+    return database.usar_mundo(usuario_id)
+
+def _lectura(funcion):
+    @functools.wraps(funcion)
+    async def awaitable(*args, **kwargs):
+        return await leer(funcion, *args, **kwargs)
+    return awaitable
+
+get_carrera_by_user = _lectura(database.get_carrera_by_user)
+get_equipo_by_id = _lectura(database.get_equipo_by_id)
+get_equipo_by_name = _lectura(database.get_equipo_by_name)
+get_liga_id = _lectura(database.get_liga_id)
+get_liga_by_id = _lectura(database.get_liga_by_id)
+get_equipos_by_liga = _lectura(database.get_equipos_by_liga)
+get_clasificacion_liga = _lectura(database.get_clasificacion_liga)
+get_partido_pendiente = _lectura(database.get_partido_pendiente)
+get_proximo_partido_tu_equipo = _lectura(database.get_proximo_partido_tu_equipo)
+get_all_partidos_carrera = _lectura(database.get_all_partidos_carrera)
+get_partidos_archivados_equipo = _lectura(database.get_partidos_archivados_equipo)
+get_jugadores_por_equipo = _lectura(database.get_jugadores_por_equipo)
+get_palmares_liga = _lectura(database.get_palmares_liga)
+get_campeonatos_equipo = _lectura(database.get_campeonatos_equipo)
+get_goleadores_liga = _lectura(database.get_goleadores_liga)
+get_ofertas_por_equipo = _lectura(database.get_ofertas_por_equipo)
+get_equipo_id = _lectura(database.get_equipo_id)
+get_all_ligas_info = _lectura(database.get_all_ligas_info)
+get_jornada_by_numero = _lectura(database.get_jornada_by_numero)
+get_jugador_by_name_and_team = _lectura(database.get_jugador_by_name_and_team)
@@ -0,0 +1,180 @@
+# eliminatorias.py
+
+import database
+import modelos_partido
+
+# Definición de un torneo eliminatorio como datos. Cada ronda toma sus equipos de una de dos formas:
+# - 'cruces': pares fijos de posiciones finales, ((zona, puesto), (zona, puesto)); zona None = tabla general.
+# - 'participantes': ganadores/perdedores de rondas anteriores, [('ganadores', clave_ronda), ('perdedores', clave_ronda)].
+#   Se ordenan por la tabla (pts, dg, gf) y se cruzan mejor contra peor; con número impar los
+#   mejores clasificados pasan sin jugar. 'resembrar': False mantiene el orden en que llegaron (1° vs 2°, 3° vs 4°...).
+# 'premio' (opcional) se aplica al ganador de la ronda: ascenso (liga destino, tipo), título en palmarés y mensaje.
+# 'proyeccion' (opcional) agrega columnas a !proyeccion: nombre -> rondas cuya participación se cuenta.
+# Un formato de copa nuevo es otra definición, sin código nuevo.
+REDUCIDO_PRIMERA_NACIONAL = {
+    'nombre': "Final por el Primer Ascenso y Reducido",
+    'dia': 200, # Día de la temporada en que termina la fase regular
+    'anuncio': [
+        "\n⚽ ¡La fase regular de la Primera Nacional ha terminado! ⚽",
+        "Calculando la tabla final y preparando la Final por el Primer Ascenso y el Reducido...",
+    ],
+    'rondas': [
+        {'clave': 'final_ascenso', 'nombre': "🏆 ¡FINAL POR EL PRIMER ASCENSO! 🏆", 'tipo_partido': 'final_ascenso',
+         'cruces': [(('Zona A', 1), ('Zona B', 1))],
+         'premio': {'ascenso': ('Primera División', 'ascenso_directo'),
+                    'titulo': "Campeón Primera Nacional - Ascenso Directo",
+                    'mensaje': "¡FELICITACIONES! **{ganador}** ha logrado el **PRIMER ASCENSO** a Primera División. 🥳"}},
+        {'clave': 'reducido_octavos', 'nombre': "Primera Ronda del Reducido (Octavos de Final)", 'tipo_partido': 'reducido_octavos',
+         'avanza_a': "Cuartos de Final",
+         'cruces': [(('Zona A', 2), ('Zona B', 8)), (('Zona B', 2), ('Zona A', 8)),
+                    (('Zona A', 3), ('Zona B', 7)), (('Zona B', 3), ('Zona A', 7)),
+                    (('Zona A', 4), ('Zona B', 6)), (('Zona B', 4), ('Zona A', 6)),
+                    (('Zona A', 5), ('Zona B', 5))]},
+        # El perdedor de la final por el primer ascenso entra al Reducido en cuartos
+        {'clave': 'reducido_cuartos', 'nombre': "Cuartos de Final del Reducido", 'tipo_partido': 'reducido_cuartos',
+         'avanza_a': "Semifinales",
+         'participantes': [('ganadores', 'reducido_octavos'), ('perdedores', 'final_ascenso')]},
+        {'clave': 'reducido_semis', 'nombre': "Semifinales del Reducido", 'tipo_partido': 'reducido_semis',
+         'avanza_a': "la Final del Reducido",
+         'participantes': [('ganadores', 'reducido_cuartos')]},
+        {'clave': 'reducido_final', 'nombre': "¡GRAN FINAL DEL REDUCIDO!", 'tipo_partido': 'reducido_final',
+         'participantes': [('ganadores', 'reducido_semis')], 'resembrar': False,
+         'premio': {'ascenso': ('Primera División', 'ascenso_reducido'),
+                    'titulo': "Ganador Reducido - Ascenso",
+                    'mensaje': "¡INCREÍBLE! **{ganador}** ha ganado el Reducido y logra el **SEGUNDO ASCENSO** a Primera División. 🥳"}},
+    ],
+    # Columnas extra de !proyeccion: probabilidad de jugar alguna de esas rondas
+    'proyeccion': {'reducido': ['reducido_octavos', 'reducido_cuartos']},
+}
+
+# Torneos eliminatorios por nombre de liga
+TORNEOS_POR_LIGA = {
+    "Primera Nacional": REDUCIDO_PRIMERA_NACIONAL,
+}
+
+def _orden_tabla(stats):
+    return (stats['pts'], stats['dg'], stats['gf'])
+
+def _cruces_ronda(ronda, posiciones, orden, ganadores, perdedores):
+    """
+    Arma los cruces de una ronda. orden(equipo_id) da la clave para resembrar (mayor = mejor).
+    Retorna (cruces [(e1, e2), ...], libres [equipo_id, ...]), o (None, motivo) si no se puede jugar.
+    """
+    if 'cruces' in ronda:
+        cruces = []
+        for siembra_1, siembra_2 in ronda['cruces']:
+            equipos = []
+            for zona, puesto in (siembra_1, siembra_2):
+                tabla = posiciones.get(zona, [])
+                if puesto > len(tabla):
+                    return None, f"falta el {puesto}° de {zona or 'la tabla'} ({len(tabla)} equipos)"
+                equipos.append(tabla[puesto - 1])
+            cruces.append(tuple(equipos))
+        return cruces, []
+
+    participantes = []
+    for origen, clave in ronda['participantes']:
+        participantes.extend((ganadores if origen == 'ganadores' else perdedores).get(clave, []))
+    if len(participantes) < 2:
+        return None, f"hay {len(participantes)} equipos clasificados"
+    if ronda.get('resembrar', True):
+        participantes.sort(key=orden, reverse=True)
+        # Con número impar, los mejores clasificados pasan sin jugar
+        libres = participantes[:len(participantes) % 2]
+        restantes = participantes[len(libres):]
+        mitad = len(restantes) // 2
+        return [(restantes[i], restantes[-1 - i]) for i in range(mitad)], libres
+    libres = participantes[len(participantes) - len(participantes) % 2:]
+    return [(participantes[i], participantes[i + 1]) for i in range(0, len(participantes) - 1, 2)], libres
+
+def resolver_llave(definicion, posiciones, orden, simular, fuerzas):
+    """
+    Juega en memoria todas las rondas del torneo, sin tocar la DB.
+    posiciones: {zona: [equipo_id por puesto]} (zona None = tabla general); orden: clave para resembrar;
+    simular(e1, e2, fuerzas) -> (resultado, error).
+    Retorna (rondas, ganadores, perdedores): una entrada por ronda con 'ronda', 'error', 'libres' y
+    'partidos' [(e1, e2, resultado)], y los dicts clave_ronda -> [equipo_id].
+    """
+    ganadores, perdedores = {}, {}
+    rondas = []
+    for ronda in definicion['rondas']:
+        clave = ronda['clave']
+        ganadores[clave], perdedores[clave] = [], []
+        cruces, libres = _cruces_ronda(ronda, posiciones, orden, ganadores, perdedores)
+        jugada = {'ronda': ronda, 'error': None, 'libres': [], 'partidos': [], 'errores_partido': []}
+        rondas.append(jugada)
+        if cruces is None:
+            jugada['error'] = libres
+            continue
+        jugada['libres'] = libres
+        ganadores[clave].extend(libres)
+        for e1, e2 in cruces:
+            resultado, error = simular(e1, e2, fuerzas)
+            if error:
+                jugada['errores_partido'].append((e1, e2, error))
+                continue
+            ganador, perdedor = (e1, e2) if resultado['goles_e1'] > resultado['goles_e2'] else (e2, e1)
+            ganadores[clave].append(ganador)
+            perdedores[clave].append(perdedor)
+            jugada['partidos'].append((e1, e2, resultado))
+    return rondas, ganadores, perdedores
+
+def jugar_torneo(definicion, liga_id, temporada, fecha_str, simular):
+    """
+    Juega todas las rondas de un torneo eliminatorio y guarda sus partidos de una vez.
+    simular(e1, e2, fuerzas) -> (resultado, error) es el simulador de partidos sin empate
+    (game_logic.simular_partido_eliminatorio); las fuerzas de los equipos salen de una sola consulta.
+    Retorna la lista de mensajes para el usuario.
+    """
+    mensajes = list(definicion.get('anuncio', []))
+    conn = database.connect_db()
+    try:
+        clasificacion = database.get_clasificacion_liga(liga_id, temporada, conn=conn)
+        equipos = {e['id']: e for e in database.get_equipos_by_liga(liga_id, conn)}
+        fuerzas = modelos_partido.fuerzas_liga(liga_id, conn)
+        stats = {c['equipo_id']: c for c in clasificacion}
+        posiciones = {None: [c['equipo_id'] for c in clasificacion]}
+        for c in clasificacion:
+            posiciones.setdefault(c['zona'], []).append(c['equipo_id'])
+
+        rondas, ganadores, _ = resolver_llave(definicion, posiciones, lambda e: _orden_tabla(stats[e]), simular, fuerzas)
+        rondas_jugadas = []
+        for jugada in rondas:
+            ronda = jugada['ronda']
+            if jugada['error']:
+                mensajes.append(f"Advertencia: No se puede jugar {ronda['nombre']}: {jugada['error']}.")
+                continue
+
+            mensajes.append(f"\n--- {ronda['nombre']} ---")
+            for equipo_id in jugada['libres']:
+                mensajes.append(f"**{equipos[equipo_id]['nombre']}** pasa de ronda sin jugar (mejor clasificado).")
+            for e1, e2, error in jugada['errores_partido']:
+                mensajes.append(f"Error simulando {equipos[e1]['nombre']} vs {equipos[e2]['nombre']}: {error}")
+
+            partidos = []
+            for i, (e1, e2, resultado) in enumerate(jugada['partidos']):
+                ganador = e1 if resultado['goles_e1'] > resultado['goles_e2'] else e2
+                partidos.append((e1, e2, resultado['goles_e1'], resultado['goles_e2'], ronda['tipo_partido'], None))
+                encabezado = f"Partido {i + 1}: " if len(jugada['partidos']) > 1 else ""
+                mensajes.append(f"{encabezado}**{equipos[e1]['nombre']} {resultado['goles_e1']} - {resultado['goles_e2']} {equipos[e2]['nombre']}**")
+                if ronda.get('avanza_a'):
+                    mensajes.append(f"  **{equipos[ganador]['nombre']}** avanza a {ronda['avanza_a']}.")
+
+            premio = ronda.get('premio')
+            if premio and len(jugada['partidos']) == 1:
+                ganador = ganadores[ronda['clave']][0]
+                if premio.get('ascenso'):
+                    liga_destino, tipo = premio['ascenso']
+                    database.add_ascenso_descenso(ganador, liga_id, liga_destino, temporada, tipo, conn)
+                if premio.get('titulo'):
+                    database.add_campeon(liga_id, temporada, ganador, tipo_titulo=premio['titulo'], conn=conn)
+                mensajes.append(premio['mensaje'].format(ganador=equipos[ganador]['nombre']))
+            if partidos:
+                rondas_jugadas.append((fecha_str, partidos))
+
+        if rondas_jugadas:
+            database.add_rondas_eliminatoria(liga_id, temporada, rondas_jugadas, conn)
+        conn.commit()
+    finally:
+        conn.close()
+    return mensajes
@@ -0,0 +1,95 @@
+# enrutador.py
+
+import re
+import time
+import traceback
+
+# Argumentos entre comillas dobles, simples o palabras sueltas: !tabla "Primera Nacional" "Zona A"
+PATRON_ARGUMENTOS = re.compile(r'"([^"]*)"|\'([^\']*)\'|(\S+)')
+
+def parsear_argumentos(texto):
+    """Separa los argumentos de un comando respetando las comillas. Retorna una lista de strings."""
+    if not texto:
+        return []
+    return [m[0] or m[1] or m[2] for m in PATRON_ARGUMENTOS.findall(texto.strip())]
+
+class EnrutadorComandos:
+    """
+    Registro de comandos: nombre ('!tabla') -> coroutine handler(message, args).
+    El despacho es una búsqueda en un dict por la primera palabra del mensaje, así que no
+    depende de cuántos comandos haya. Los pasos de conversación (estado del usuario, ej.
+    'confirm_fichar') se registran aparte: los prioritarios se atienden antes que cualquier
+    comando y el resto solo si el mensaje no era un comando.
+    Por comando se guardan métricas: llamadas, errores, tiempo total y máximo (ms).
+    """
+    def __init__(self):
+        self.comandos = {}
+        self.pasos = {} # step -> (handler, prioritario)
+        self.metricas = {}
+
+    def comando(self, *nombres):
+        """Decorador: registra el handler bajo uno o más nombres de comando."""
+        def registrar(handler):
+            for nombre in nombres:
+                self.comandos[nombre] = handler
+            return handler
+        return registrar
+
+    def paso(self, step, prioritario=False):
+        """Decorador: registra el handler(message, estado) de un paso de conversación."""
+        def registrar(handler):
+            self.pasos[step] = (handler, prioritario)
+            return handler
+        return registrar
+
+    async def _ejecutar(self, nombre, handler, message, *args):
+        metricas = self.metricas.setdefault(nombre, {'llamadas': 0, 'errores': 0, 'ms_total': 0.0, 'ms_max': 0.0})
+        inicio = time.perf_counter()
+        try:
+            await handler(message, *args)
+        except Exception as e:
+            metricas['errores'] += 1
+            print(f"Error en el comando {nombre}: {e}")
+            traceback.print_exc()
+            await message.channel.send("Ocurrió un error al procesar el comando. Por favor, contacta al administrador.")
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            metricas['llamadas'] += 1
+            metricas['ms_total'] += ms
+            metricas['ms_max'] = max(metricas['ms_max'], ms)
+
+    def atiende(self, message, estado=None):
+        """True si despachar() tendría un handler para el mensaje (un comando o el paso del usuario)."""
+        if estado and estado['step'] in self.pasos:
+            return True
+        partes = message.content.split(maxsplit=1)
+        return bool(partes) and partes[0] in self.comandos
+
+    async def despachar(self, message, estado=None):
+        """
+        Atiende un mensaje. `estado` es el dict de conversación del usuario (con 'step') o None.
+        Retorna True si algún handler lo procesó.
+        """
+        paso = self.pasos.get(estado['step']) if estado else None
+        if paso and paso[1]:
+            await self._ejecutar(f"paso:{estado['step']}", paso[0], message, estado)
+            return True
+
+        partes = message.content.split(maxsplit=1)
+        handler = self.comandos.get(partes[0]) if partes else None
+        if handler:
+            await self._ejecutar(partes[0], handler, message, parsear_argumentos(partes[1] if len(partes) > 1 else ''))
+            return True
+
+        if paso:
+            await self._ejecutar(f"paso:{estado['step']}", paso[0], message, estado)
+            return True
+        return False
+
+    def resumen_metricas(self):
+        """Líneas con llamadas, errores y latencia media/máxima por comando, de más a menos usado."""
+        lineas = []
+        for nombre, m in sorted(self.metricas.items(), key=lambda item: -item[1]['llamadas']):
+            media = m['ms_total'] / m['llamadas'] if m['llamadas'] else 0
+            lineas.append(f"{nombre}: {m['llamadas']} llamadas, {m['errores']} errores, media {media:.1f} ms, máx {m['ms_max']:.1f} ms")
+        return lineas
@@ -0,0 +1,122 @@
+# estado_conversacion.py
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+import database
+import database_async
+
+# Estado de los pasos de conversación de cada usuario (elegir liga y equipo en
+# !iniciar_carrera, confirmar un fichaje o la simulación de un partido): un dict con 'step' y
+# los datos del paso. Antes vivía en un dict en memoria que crecía con cada usuario que dejaba
+# un paso a medias y se perdía al reiniciar el bot.
+#
+# EstadoConversacion se usa casi como ese dict (estado[user_id] = {...}, del estado[user_id]);
+# la lectura es await estado.obtener(user_id), porque puede tener que ir a la DB. Además:
+# - cada estado vence TTL_SEGUNDOS después de la última escritura; uno vencido es como si no existiera.
+# - cada escritura se guarda en la tabla estados_conversacion de la plantilla (JSON compacto +
+#   vencimiento), así un paso a medias sobrevive a un reinicio y lo ve otra réplica del bot.
+#   Las escrituras van al hilo de escritura de database_async sin esperarlas; mientras una está
+#   en camino, la memoria tiene el valor nuevo y una lectura de la DB la espera antes.
+# - las lecturas de la DB van al pool de lectura de database_async, nunca al loop.
+# - en memoria queda solo una LRU acotada de los últimos usuarios leídos. Lo leído de la DB (también
+#   "no tiene estado") se vuelve a consultar a los RELECTURA_SEGUNDOS, así un paso empezado o
+#   terminado en otra réplica se ve enseguida; lo escrito por esta réplica vale hasta su vencimiento.
+# - un barrido periódico (iniciar_barrido) borra los vencidos de la tabla y de la memoria.
+#
+# Los estados son copias: modificar el dict que devuelve obtener() no cambia nada hasta volver a
+# asignarlo (estado[user_id] = ...).
+
+TTL_SEGUNDOS = 30 * 60
+RELECTURA_SEGUNDOS = 5
+MAX_EN_MEMORIA = 1024
+INTERVALO_BARRIDO = 5 * 60
+
+class EstadoConversacion:
+    def __init__(self, ttl=TTL_SEGUNDOS, max_en_memoria=MAX_EN_MEMORIA, relectura=RELECTURA_SEGUNDOS):
+        self.ttl = ttl
+        self.max_en_memoria = max_en_memoria
+        self.relectura = relectura
+        self._memoria = OrderedDict() # usuario_id -> (estado o None, hasta cuándo vale en memoria)
+        self._escrituras = {} # usuario_id -> tarea de la última escritura todavía en camino
+        self._lock = threading.Lock()
+        self._barrido = None
+
+    def _recordar(self, usuario_id, estado, vence):
+        with self._lock:
+            self._memoria[usuario_id] = (estado, vence)
+            self._memoria.move_to_end(usuario_id)
+            if len(self._memoria) > self.max_en_memoria:
+                self._memoria.popitem(last=False)
+
+    def _escribir(self, usuario_id, funcion, *args):
+        """Manda la escritura al hilo de escritura sin esperarla (en orden de llegada)."""
+        tarea = asyncio.ensure_future(database_async.escribir(funcion, *args))
+        self._escrituras[usuario_id] = tarea
+
+        def terminada(t):
+            if self._escrituras.get(usuario_id) is t:
+                del self._escrituras[usuario_id]
+            if not t.cancelled() and t.exception():
+                print(f"Error al guardar el estado de conversación del usuario {usuario_id}: {t.exception()}")
+        tarea.add_done_callback(terminada)
+
+    async def obtener(self, usuario_id, default=None):
+        """Estado vigente del usuario (una copia) o default."""
+        with self._lock:
+            guardado = self._memoria.get(usuario_id)
+            if guardado and guardado[1] > time.time():
+                self._memoria.move_to_end(usuario_id)
+                estado = guardado[0]
+                return dict(estado) if estado is not None else default
+        pendiente = self._escrituras.get(usuario_id)
+        if pendiente is not None:
+            await asyncio.wait([pendiente]) # Que la DB ya tenga la última escritura propia
+        ahora = time.time()
+        fila = await database_async.leer(database.get_estado_conversacion, usuario_id, ahora)
+        if fila:
+            estado, vence = fila
+            self._recordar(usuario_id, estado, min(vence, ahora + self.relectura))
+            return dict(estado)
+        self._recordar(usuario_id, None, ahora + self.relectura)
+        return default
+
+    def __setitem__(self, usuario_id, estado):
+        estado = dict(estado)
+        vence = time.time() + self.ttl
+        self._recordar(usuario_id, estado, vence)
+        self._escribir(usuario_id, database.set_estado_conversacion, usuario_id, estado, vence)
+
+    def __delitem__(self, usuario_id):
+        """Termina el paso del usuario. No falla si ya no tenía estado (ej. venció mientras respondía)."""
+        self._recordar(usuario_id, None, time.time() + self.relectura)
+        self._escribir(usuario_id, database.delete_estado_conversacion, usuario_id)
+
+    def __len__(self):
+        """Estados vigentes en memoria (no cuenta los que solo están en la tabla)."""
+        ahora = time.time()
+        with self._lock:
+            return sum(1 for estado, vence in self._memoria.values() if estado is not None and vence > ahora)
+
+    def barrer(self):
+        """Borra los estados vencidos de la tabla y de la memoria. Retorna cuántos borró de la tabla."""
+        ahora = time.time()
+        with self._lock:
+            for usuario_id in [u for u, (_, vence) in self._memoria.items() if vence <= ahora]:
+                del self._memoria[usuario_id]
+        return database.delete_estados_conversacion_vencidos(ahora)
+
+    async def _barrer_periodicamente(self, intervalo):
+        while True:
+            await asyncio.sleep(intervalo)
+            borrados = await database_async.escribir(self.barrer)
+            if borrados:
+                print(f"Estados de conversación vencidos borrados: {borrados}")
+
+    def iniciar_barrido(self, intervalo=INTERVALO_BARRIDO):
+        """Arranca (una sola vez) el barrido periódico en el loop actual; se llama desde on_ready."""
+        if self._barrido is None or self._barrido.done():
+            self._barrido = asyncio.get_running_loop().create_task(self._barrer_periodicamente(intervalo))
+        return self._barrido
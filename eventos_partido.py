@@ -0,0 +1,115 @@
+# eventos_partido.py
+
+import math
+import random
+from itertools import accumulate
+
+import database
+import modelos_partido
+
+# Eventos de partido: goles y asistencias atribuidos a jugadores. Se sortean junto con el
+# marcador (game_logic.simular_partido con pesos): cada equipo reparte sus goles entre sus
+# jugadores con random.choices, pesando por puesto, valoración y si es titular. Los eventos se guardan en
+# una tabla compacta de solo agregado (eventos_partido) y, en la misma escritura, se suman a
+# estadisticas_jugadores por temporada (database.add_eventos_partido); la tabla de goleadores
+# es una lectura por índice de esa tabla, sin recorrer los eventos.
+
+GOL = 1
+ASISTENCIA = 2
+
+# Peso por puesto para hacer un gol y para dar la asistencia
+PESO_GOL = {
+    'Delantero centro': 10, 'Delantero': 10,
+    'Extremo derecho': 6, 'Extremo izquierdo': 6,
+    'Mediapunta': 5, 'Mediocentro ofensivo': 4,
+    'Interior derecho': 3, 'Interior izquierdo': 3,
+    'Mediocentro': 2, 'Centrocampista': 2, 'Pivote': 1,
+    'Defensa central': 1, 'Defensa': 1, 'Lateral derecho': 0.8, 'Lateral izquierdo': 0.8,
+    'Portero': 0.01,
+}
+PESO_ASISTENCIA = {
+    'Delantero centro': 4, 'Delantero': 4,
+    'Extremo derecho': 7, 'Extremo izquierdo': 7,
+    'Mediapunta': 8, 'Mediocentro ofensivo': 8,
+    'Interior derecho': 5, 'Interior izquierdo': 5,
+    'Mediocentro': 4, 'Centrocampista': 4, 'Pivote': 2,
+    'Defensa central': 1, 'Defensa': 1, 'Lateral derecho': 3, 'Lateral izquierdo': 3,
+    'Portero': 0.1,
+}
+# Puestos desconocidos
+PESO_POR_DEFECTO = 1
+# Cada punto de valoración por encima (o debajo) de VALORACION_REFERENCIA multiplica el peso por e^FACTOR_VALORACION
+VALORACION_REFERENCIA = 70
+FACTOR_VALORACION = 0.08
+# Los titulares de cada línea (modelos_partido.LINEAS) pesan completo; los suplentes, por este factor
+FACTOR_SUPLENTE = 0.2
+PROB_ASISTENCIA = 0.75
+MINUTOS = 90
+
+def _peso(tabla, posicion, valoracion):
+    factor = math.exp(FACTOR_VALORACION * ((valoracion or VALORACION_REFERENCIA) - VALORACION_REFERENCIA))
+    return tabla.get(posicion, PESO_POR_DEFECTO) * factor
+
+def _titulares(jugadores):
+    """ids de los mejores de cada línea, tantos como titulares tiene la línea."""
+    titulares = set()
+    for posiciones, cantidad in modelos_partido.LINEAS.values():
+        linea = sorted((j for j in jugadores if j['posicion'] in posiciones), key=lambda j: j['valoracion'] or 0, reverse=True)
+        titulares.update(j['jugador_id'] for j in linea[:cantidad])
+    return titulares
+
+def pesos_desde_filas(filas):
+    """Pesos como los de pesos_liga a partir de filas de database.get_valoraciones_plantillas ya leídas."""
+    plantillas = {}
+    for fila in filas:
+        jugadores = plantillas.setdefault(fila['equipo_id'], [])
+        if fila['jugador_id'] is not None:
+            jugadores.append(fila)
+    pesos = {}
+    for equipo_id, jugadores in plantillas.items():
+        if not jugadores:
+            continue
+        titulares = _titulares(jugadores)
+        minutos = [1 if j['jugador_id'] in titulares else FACTOR_SUPLENTE for j in jugadores]
+        pesos[equipo_id] = (
+            [j['jugador_id'] for j in jugadores],
+            list(accumulate(m * _peso(PESO_GOL, j['posicion'], j['valoracion']) for m, j in zip(minutos, jugadores))),
+            list(accumulate(m * _peso(PESO_ASISTENCIA, j['posicion'], j['valoracion']) for m, j in zip(minutos, jugadores))),
+        )
+    return pesos
+
+def pesos_liga(liga_id, conn=None):
+    """
+    {equipo_id: (jugador_ids, pesos_gol, pesos_asistencia)} de los equipos de la liga, con los
+    pesos acumulados listos para random.choices (una consulta). Los equipos sin jugadores no salen.
+    """
+    return pesos_desde_filas(database.get_valoraciones_plantillas(liga_id=liga_id, conn=conn))
+
+def pesos_equipos(equipo_ids, conn=None):
+    """Como pesos_liga, para los equipos dados."""
+    return pesos_desde_filas(database.get_valoraciones_plantillas(equipo_ids=equipo_ids, conn=conn))
+
+def repartir(equipo_id, goles, pesos):
+    """
+    Eventos de los `goles` de un equipo: [(minuto, tipo, jugador_id, equipo_id)], con una
+    asistencia (de otro jugador) para la mayoría de los goles. [] si el equipo no tiene pesos.
+    """
+    if not goles or equipo_id not in pesos:
+        return []
+    jugador_ids, pesos_gol, pesos_asistencia = pesos[equipo_id]
+    goleadores = random.choices(jugador_ids, cum_weights=pesos_gol, k=goles)
+    asistidores = random.choices(jugador_ids, cum_weights=pesos_asistencia, k=goles)
+    eventos = []
+    for goleador, asistidor in zip(goleadores, asistidores):
+        minuto = random.randint(1, MINUTOS)
+        eventos.append((minuto, GOL, goleador, equipo_id))
+        if asistidor != goleador and random.random() < PROB_ASISTENCIA:
+            eventos.append((minuto, ASISTENCIA, asistidor, equipo_id))
+    return eventos
+
+def eventos_resultado(resultado, pesos):
+    """Eventos de los dos equipos de un resultado de simular_partido, ordenados por minuto."""
+    eventos = (repartir(resultado['equipo1_id'], resultado['goles_e1'], pesos)
+               + repartir(resultado['equipo2_id'], resultado['goles_e2'], pesos))
+    eventos.sort()
+    return eventos
@@ -3,8 +3,13 @@
 import random
 import sqlite3
 import datetime
+import functools
 import database
+import eliminatorias
+import eventos_partido
 import market_logic
+import modelos_partido
+import progresion
 from market_logic import es_mercado_abierto
 
 # Días en los que se abre el mercado de pases (puedes ajustar estos valores)
@@ -48,70 +53,62 @@ def simular_temporada_liga_ia(liga_id, temporada):
         pass # Por ahora, no hacer nada si no hay jornadas (se salta la simulación)
 
 
-    # Simular cada jornada
-    for jornada in jornadas_programadas:
-        partidos_jornada = database.get_partidos_por_jornada(jornada['id'])
-        for partido in partidos_jornada:
-            if partido['simulado'] == 0: # Solo simular si no ha sido simulado
-                resultado, error = simular_partido(partido['equipo_local_id'], partido['equipo_visitante_id'])
-                if error:
-                    # print(f"DEBUG IA: Error simulando partido IA {partido['equipo_local_nombre']} vs {partido['equipo_visitante_nombre']}: {error}")
-                    continue
-                database.update_partido_resultado(partido['id'], resultado['goles_e1'], resultado['goles_e2'])
-                update_clasificacion(liga_id, temporada, resultado, zona_nombre=partido.get('zona'))
+    # Fuerzas y pesos de goleadores de todos los equipos de la liga en una consulta cada uno
+    fuerzas = modelos_partido.fuerzas_liga(liga_id)
+    pesos = eventos_partido.pesos_liga(liga_id)
+
+    # Todos los partidos pendientes de la temporada se leen en una consulta y se juegan y se
+    # guardan en una sola tanda, con la misma conexión
+    conn = database.connect_db()
+    try:
+        pendientes = database.get_partidos_pendientes_liga(liga_id, temporada, conn)
+        jugar_partidos_liga(liga_id, temporada, pendientes, fuerzas, pesos, conn)
+    finally:
+        conn.close()
     
     # print(f"DEBUG IA: Temporada {temporada} simulada para liga {database.get_liga_by_id(liga_id)['nombre']}.")
     return True
 
-def simular_partido(equipo1_id, equipo2_id):
+def _fuerzas_partido(equipo1_id, equipo2_id, fuerzas=None):
+    """(fuerza1, fuerza2) desde el dict {equipo_id: fuerza} si se pasa, si no desde la DB. None si falta un equipo."""
+    if fuerzas is None:
+        fuerzas = modelos_partido.fuerzas_equipos((equipo1_id, equipo2_id))
+    if equipo1_id not in fuerzas or equipo2_id not in fuerzas:
+        return None
+    return fuerzas[equipo1_id], fuerzas[equipo2_id]
+
+def simular_partido(equipo1_id, equipo2_id, fuerzas=None, pesos=None):
     """
-    Simula un partido entre dos equipos y devuelve el resultado.
-    Puedes refinar la lógica aquí (factores como OVR, localía, etc.).
+    Simula un partido entre dos equipos (equipo1 de local) y devuelve el resultado.
+    El resultado sale del modelo de partido activo (ver modelos_partido: Poisson o el uniforme original).
+    fuerzas: dict opcional {equipo_id: fuerza} (modelos_partido.fuerzas_liga) para no consultar la DB en cada partido.
+    pesos: dict opcional de eventos_partido.pesos_liga/pesos_equipos; si se pasa, el resultado trae
+    también 'eventos' (goles y asistencias por jugador) para database.add_eventos_partido.
     """
-    equipo1 = database.get_equipo_by_id(equipo1_id) # Usar get_equipo_by_id
-    equipo2 = database.get_equipo_by_id(equipo2_id) # Usar get_equipo_by_id
-
-    if not equipo1 or not equipo2:
+    fuerzas_partido = _fuerzas_partido(equipo1_id, equipo2_id, fuerzas)
+    if not fuerzas_partido:
         return None, "Error: Uno o ambos equipos no existen."
 
-    ovr1 = equipo1['nivel_general']
-    ovr2 = equipo2['nivel_general']
-
-    diferencia_ovr = ovr1 - ovr2
-    prob_victoria_1_base = 0.5
-    prob_victoria_1_ajustada = prob_victoria_1_base + (diferencia_ovr / 100 * 0.2)
-    prob_victoria_1_ajustada = max(0.1, min(0.9, prob_victoria_1_ajustada))
+    goles_e1, goles_e2 = modelos_partido.sortear(*fuerzas_partido)
 
-    rand_val = random.random()
+    resultado = {'equipo1_id': equipo1_id, 'goles_e1': goles_e1,
+                 'equipo2_id': equipo2_id, 'goles_e2': goles_e2}
+    if pesos is not None:
+        resultado['eventos'] = eventos_partido.eventos_resultado(resultado, pesos)
+    return resultado, None
 
-    goles_e1 = 0
-    goles_e2 = 0
-
-    if rand_val < prob_victoria_1_ajustada:
-        goles_e1 = random.randint(1, 4)
-        goles_e2 = random.randint(0, max(0, goles_e1 - 1))
-    elif rand_val > (1 - prob_victoria_1_ajustada):
-        goles_e2 = random.randint(1, 4)
-        goles_e1 = random.randint(0, max(0, goles_e2 - 1))
-    else:
-        goles_e1 = random.randint(0, 3)
-        goles_e2 = goles_e1
-
-    return {'equipo1_id': equipo1_id, 'goles_e1': goles_e1,
-            'equipo2_id': equipo2_id, 'goles_e2': goles_e2}, None
-
-def simular_partido_eliminatorio(equipo1_id, equipo2_id):
+def simular_partido_eliminatorio(equipo1_id, equipo2_id, fuerzas=None):
     """
     Simula un partido eliminatorio que debe tener un ganador (sin empates).
     En caso de empate en goles, se decide por OVR o penales simulados.
+    fuerzas: dict opcional {equipo_id: fuerza}, como en simular_partido.
     """
-    equipo1 = database.get_equipo_by_id(equipo1_id)
-    equipo2 = database.get_equipo_by_id(equipo2_id)
-
-    if not equipo1 or not equipo2:
+    fuerzas_partido = _fuerzas_partido(equipo1_id, equipo2_id, fuerzas)
+    if not fuerzas_partido:
         return None, "Error: Uno o ambos equipos no existen para la simulación eliminatoria."
+    fuerzas = {equipo1_id: fuerzas_partido[0], equipo2_id: fuerzas_partido[1]}
 
-    resultado_partido, error = simular_partido(equipo1_id, equipo2_id)
+    resultado_partido, error = simular_partido(equipo1_id, equipo2_id, fuerzas)
     if error:
         return None, error
 
@@ -120,8 +117,7 @@ def simular_partido_eliminatorio(equipo1_id, equipo2_id):
 
     # Si hay empate, aplicar lógica de desempate
     if goles_e1 == goles_e2:
-        ovr1 = equipo1['nivel_general']
-        ovr2 = equipo2['nivel_general']
+        ovr1, ovr2 = (modelos_partido.nivel(f) for f in fuerzas_partido)
 
         if ovr1 > ovr2:
             goles_e1 += 1 # Gana el de mayor OVR
@@ -152,6 +148,83 @@ def simular_partido_eliminatorio(equipo1_id, equipo2_id):
             'equipo2_id': equipo2_id, 'goles_e2': goles_e2}, None
 
 
+# Columnas de la tabla de posiciones que suma cada partido
+COLUMNAS_CLASIFICACION = ('pj', 'pg', 'pe', 'pp', 'gf', 'gc', 'dg', 'pts')
+
+def _stats_vacias():
+    return dict.fromkeys(COLUMNAS_CLASIFICACION, 0)
+
+def _sumar_partido(stats, goles_favor, goles_contra):
+    """Suma un partido jugado a las estadísticas de la tabla de un equipo."""
+    stats['pj'] += 1
+    stats['gf'] += goles_favor
+    stats['gc'] += goles_contra
+    stats['dg'] = stats['gf'] - stats['gc']
+    if goles_favor > goles_contra:
+        stats['pg'] += 1
+        stats['pts'] += 3
+    elif goles_favor < goles_contra:
+        stats['pp'] += 1
+    else:
+        stats['pe'] += 1
+        stats['pts'] += 1
+
+def jugar_partidos_liga(liga_id, temporada, partidos, fuerzas=None, pesos=None, conn=None):
+    """
+    Juega de una tanda partidos de liga pendientes (filas con 'id', 'equipo_local_id',
+    'equipo_visitante_id' y 'zona'): las plantillas y la fila de la tabla de todos los equipos
+    se leen en dos consultas, los partidos se simulan en memoria y resultados, tabla y eventos
+    se escriben en una transacción (database.guardar_resultados_partidos), con una sola conexión.
+    fuerzas/pesos: si ya se tienen (ej. de toda la liga) no se leen las plantillas.
+    conn: conexión a usar (la cierra quien la pasó); el commit de la tanda se hace igual.
+    Retorna (jugados, errores): [(partido, resultado)] y [(partido, error)]. Si no se pudo
+    guardar, jugados vuelve vacío.
+    """
+    partidos = [p for p in partidos if not p.get('simulado')]
+    if not partidos:
+        return [], []
+    equipo_ids = {equipo_id for p in partidos for equipo_id in (p['equipo_local_id'], p['equipo_visitante_id'])}
+
+    conn_propia = conn is None
+    if conn_propia:
+        conn = database.connect_db()
+    try:
+        if fuerzas is None or pesos is None:
+            filas = database.get_valoraciones_plantillas(equipo_ids=equipo_ids, conn=conn)
+            fuerzas = modelos_partido.fuerzas_desde_filas(filas) if fuerzas is None else fuerzas
+            pesos = eventos_partido.pesos_desde_filas(filas) if pesos is None else pesos
+        tabla = database.get_clasificacion_equipos(liga_id, temporada, equipo_ids, conn)
+
+        jugados, errores, zonas = [], [], {}
+        for partido in partidos:
+            local, visitante = partido['equipo_local_id'], partido['equipo_visitante_id']
+            resultado, error = simular_partido(local, visitante, fuerzas, pesos)
+            if error:
+                errores.append((partido, error))
+                continue
+            for equipo_id, goles_favor, goles_contra in ((local, resultado['goles_e1'], resultado['goles_e2']),
+                                                         (visitante, resultado['goles_e2'], resultado['goles_e1'])):
+                _sumar_partido(tabla.setdefault(equipo_id, _stats_vacias()), goles_favor, goles_contra)
+                zonas[equipo_id] = partido.get('zona')
+            jugados.append((partido, resultado))
+        if not jugados:
+            return [], errores
+
+        guardado = database.guardar_resultados_partidos(
+            liga_id, temporada,
+            [(resultado['goles_e1'], resultado['goles_e2'], partido['id']) for partido, resultado in jugados],
+            [(equipo_id, zona) + tuple(tabla[equipo_id][columna] for columna in COLUMNAS_CLASIFICACION)
+             for equipo_id, zona in zonas.items()],
+            [(partido['id'], resultado['eventos']) for partido, resultado in jugados],
+            conn)
+        if not guardado:
+            return [], errores
+        conn.commit()
+        return jugados, errores
+    finally:
+        if conn_propia:
+            conn.close()
+
 def update_clasificacion(liga_id, temporada, resultado, zona_nombre=None): # ¡Añadido zona_nombre=None aquí!
     """
     Actualiza las estadísticas de la tabla de posiciones de la liga, opcionalmente por zona.
@@ -165,34 +238,10 @@ def update_clasificacion(liga_id, temporada, resultado, zona_nombre=None): # ¡A
     stats_local = database.get_equipo_clasificacion_stats(liga_id, equipo_local_id, temporada)
     stats_visitante = database.get_equipo_clasificacion_stats(liga_id, equipo_visitante_id, temporada)
 
-    if not stats_local: stats_local = {'pj':0,'pg':0,'pe':0,'pp':0,'gf':0,'gc':0,'dg':0,'pts':0}
-    else: stats_local = dict(stats_local)
-    if not stats_visitante: stats_visitante = {'pj':0,'pg':0,'pe':0,'pp':0,'gf':0,'gc':0,'dg':0,'pts':0}
-    else: stats_visitante = dict(stats_visitante)
-
-    stats_local['pj'] += 1
-    stats_local['gf'] += goles_local
-    stats_local['gc'] += goles_visitante
-    stats_local['dg'] = stats_local['gf'] - stats_local['gc']
-
-    stats_visitante['pj'] += 1
-    stats_visitante['gf'] += goles_visitante
-    stats_visitante['gc'] += goles_local
-    stats_visitante['dg'] = stats_visitante['gf'] - stats_visitante['gc']
-
-    if goles_local > goles_visitante:
-        stats_local['pg'] += 1
-        stats_local['pts'] += 3
-        stats_visitante['pp'] += 1
-    elif goles_local < goles_visitante:
-        stats_visitante['pg'] += 1
-        stats_visitante['pts'] += 3
-        stats_local['pp'] += 1
-    else:
-        stats_local['pe'] += 1
-        stats_local['pts'] += 1
-        stats_visitante['pe'] += 1
-        stats_visitante['pts'] += 1
+    stats_local = dict(stats_local) if stats_local else _stats_vacias()
+    stats_visitante = dict(stats_visitante) if stats_visitante else _stats_vacias()
+    _sumar_partido(stats_local, goles_local, goles_visitante)
+    _sumar_partido(stats_visitante, goles_visitante, goles_local)
 
     database.update_clasificacion(
         liga_id, equipo_local_id, temporada,
@@ -249,15 +298,12 @@ def avanzar_dia(user_id):
     
     if partidos_ia_hoy:
         mensajes.append("\n**Resultados de la Liga (Simulados por IA):**")
-        for partido in partidos_ia_hoy:
-            if partido['simulado'] == 0: # Solo simular si no ha sido jugado
-                resultado, error = simular_partido(partido['equipo_local_id'], partido['equipo_visitante_id'])
-                if error:
-                    mensajes.append(f"Error simulando partido IA {partido['equipo_local_nombre']} vs {partido['equipo_visitante_nombre']}: {error}")
-                    continue
-                database.update_partido_resultado(partido['id'], resultado['goles_e1'], resultado['goles_e2'])
-                update_clasificacion(liga_id, temporada, resultado, zona_nombre=partido.get('zona'))
-                mensajes.append(f"- {partido['equipo_local_nombre']} {resultado['goles_e1']} - {resultado['goles_e2']} {partido['equipo_visitante_nombre']}")
+        # Todos los partidos del día en una tanda: dos lecturas, simulación en memoria y una escritura
+        jugados, errores = jugar_partidos_liga(liga_id, temporada, partidos_ia_hoy)
+        for partido, error in errores:
+            mensajes.append(f"Error simulando partido IA {partido['equipo_local_nombre']} vs {partido['equipo_visitante_nombre']}: {error}")
+        for partido, resultado in jugados:
+            mensajes.append(f"- {partido['equipo_local_nombre']} {resultado['goles_e1']} - {resultado['goles_e2']} {partido['equipo_visitante_nombre']}")
     
     # 2. Lógica del mercado de pases
     dias_mercado_restantes = database.get_dias_mercado_abierto(user_id) #
@@ -294,255 +340,10 @@ def avanzar_dia(user_id):
                     return
 
 
-    # --- Detección y manejo de la finalización de la fase regular de Primera Nacional ---
-    # Detección: game_logic.avanzar_dia debe identificar que la fase regular ha terminado (ej. tras simular la Jornada 34).
-    # Solo aplica si es Primera Nacional y se ha superado la jornada 34
-    if es_primera_nacional and dia_actual == 200: # Asumiendo que el día 365 es el final de la fase regular
-        mensajes.append("\n⚽ ¡La fase regular de la Primera Nacional ha terminado! ⚽")
-        mensajes.append("Calculando la tabla final y preparando la Final por el Primer Ascenso y el Reducido...")
-
-        # 1. Lógica de Clasificación Final por Zona (ya se actualiza con cada partido)
-        # Ahora, obtener los clasificados
-        clasificacion_zona_a = database.get_clasificacion_liga(liga_id, temporada, zona_nombre="Zona A")
-        clasificacion_zona_b = database.get_clasificacion_liga(liga_id, temporada, zona_nombre="Zona B")
-
-        # Identificación precisa del 1° de cada zona, y de los equipos del 2° al 8° de cada zona
-        primeros_zona_a = clasificacion_zona_a[0] if clasificacion_zona_a else None
-        primeros_zona_b = clasificacion_zona_b[0] if clasificacion_zona_b else None
-
-        if primeros_zona_a and primeros_zona_b:
-            mensajes.append(f"\n🏆 **¡FINAL POR EL PRIMER ASCENSO!** 🏆")
-            mensajes.append(f"Se enfrentan los campeones de cada zona:")
-            mensajes.append(f"- **{primeros_zona_a['equipo_nombre']}** (1° de la Zona A) vs **{primeros_zona_b['equipo_nombre']}** (1° de la Zona B)")
-
-            # Simulación del Partido: Crear una nueva función de simulación de partido eliminatorio
-            # Usamos la nueva función simular_partido_eliminatorio
-            resultado_final_ascenso, error_sim = simular_partido_eliminatorio(
-                primeros_zona_a['equipo_id'],
-                primeros_zona_b['equipo_id']
-            )
-
-            if not error_sim:
-                ganador_final_ascenso_id = None
-                perdedor_final_ascenso_id = None
-                if resultado_final_ascenso['goles_e1'] > resultado_final_ascenso['goles_e2']:
-                    ganador_final_ascenso_id = resultado_final_ascenso['equipo1_id']
-                    perdedor_final_ascenso_id = resultado_final_ascenso['equipo2_id']
-                else:
-                    ganador_final_ascenso_id = resultado_final_ascenso['equipo2_id']
-                    perdedor_final_ascenso_id = resultado_final_ascenso['equipo1_id']
-                
-                ganador_final_ascenso_nombre = database.get_equipo_by_id(ganador_final_ascenso_id)['nombre']
-                perdedor_final_ascenso_nombre = database.get_equipo_by_id(perdedor_final_ascenso_id)['nombre']
-
-                mensajes.append(f"\n¡Resultado de la Final por el Primer Ascenso!")
-                mensajes.append(f"**{database.get_equipo_by_id(resultado_final_ascenso['equipo1_id'])['nombre']} {resultado_final_ascenso['goles_e1']} - {resultado_final_ascenso['goles_e2']} {database.get_equipo_by_id(resultado_final_ascenso['equipo2_id'])['nombre']}**")
-                mensajes.append(f"¡FELICITACIONES! **{ganador_final_ascenso_nombre}** ha logrado el **PRIMER ASCENSO** a Primera División. 🥳")
-                
-                # Registrar al equipo ascendido en una nueva tabla ascensos_descensos o en palmares con un tipo_titulo adecuado.
-                database.add_ascenso_descenso(ganador_final_ascenso_id, liga_id, 'Primera División', temporada, 'ascenso_directo')
-                database.add_campeon(liga_id, temporada, ganador_final_ascenso_id, tipo_titulo="Campeón Primera Nacional - Ascenso Directo") # Marcar como campeón de la categoría también
-
-               # Lógica del Reducido
-                mensajes.append("\n--- ¡COMIENZA EL REDUCIDO POR EL SEGUNDO ASCENSO! ---")
-                
-                # Obtener equipos del 2° al 8° de cada zona
-                clasificacion_zona_a = database.get_clasificacion_liga(liga_id, temporada, zona_nombre="Zona A")
-                clasificacion_zona_b = database.get_clasificacion_liga(liga_id, temporada, zona_nombre="Zona B")
-                
-                # Filtra para obtener solo del 2do al 8vo puesto (índices 1 a 7)
-                equipos_reducido_zona_a = [e for e in clasificacion_zona_a[1:8]] 
-                equipos_reducido_zona_b = [e for e in clasificacion_zona_b[1:8]]
-                
-                print(f"DEBUG REDUCIDO: Equipos para reducido Zona A (2do-8vo): {len(equipos_reducido_zona_a)} equipos. Nombres: {[e['equipo_nombre'] for e in equipos_reducido_zona_a]}")
-                print(f"DEBUG REDUCIDO: Equipos para reducido Zona B (2do-8vo): {len(equipos_reducido_zona_b)} equipos. Nombres: {[e['equipo_nombre'] for e in equipos_reducido_zona_b]}")
-
-                # Asegurarse de que el perdedor de la final por el primer ascenso se incluya
-                perdedor_final_ascenso_details_full = None
-                if perdedor_final_ascenso_id:
-                    perdedor_final_ascenso_details_full = database.get_equipo_clasificacion_stats(liga_id, perdedor_final_ascenso_id, temporada)
-                    if perdedor_final_ascenso_details_full:
-                        perdedor_final_ascenso_details_full['equipo_nombre'] = database.get_equipo_by_id(perdedor_final_ascenso_id)['nombre']
-                        print(f"DEBUG REDUCIDO: Perdedor Final Ascenso: {perdedor_final_ascenso_details_full['equipo_nombre']}")
-                else:
-                    print("DEBUG REDUCIDO: No se encontró perdedor de la final por el primer ascenso.")
-
-                # --- NUEVA PRIMERA RONDA DEL REDUCIDO (Octavos de Final) ---
-                # Esta ronda es entre los 14 equipos (2do al 8vo de cada zona).
-                # Se forman 7 partidos.
-
-                ganadores_primera_ronda = [] # Para almacenar los 7 ganadores
-
-                if len(equipos_reducido_zona_a) >= 7 and len(equipos_reducido_zona_b) >= 7:
-                    mensajes.append("\n--- Primera Ronda del Reducido (Octavos de Final) ---")
-                    
-                    # Cruces específicos (A2 vs B8, B2 vs A8, etc.)
-                    partidos_primera_ronda_reducido = [
-                        {'e1': equipos_reducido_zona_a[0]['equipo_id'], 'e2': equipos_reducido_zona_b[6]['equipo_id']}, # A2 vs B8
-                        {'e1': equipos_reducido_zona_b[0]['equipo_id'], 'e2': equipos_reducido_zona_a[6]['equipo_id']}, # B2 vs A8
-                        {'e1': equipos_reducido_zona_a[1]['equipo_id'], 'e2': equipos_reducido_zona_b[5]['equipo_id']}, # A3 vs B7
-                        {'e1': equipos_reducido_zona_b[1]['equipo_id'], 'e2': equipos_reducido_zona_a[5]['equipo_id']}, # B3 vs A7
-                        {'e1': equipos_reducido_zona_a[2]['equipo_id'], 'e2': equipos_reducido_zona_b[4]['equipo_id']}, # A4 vs B6
-                        {'e1': equipos_reducido_zona_b[2]['equipo_id'], 'e2': equipos_reducido_zona_a[4]['equipo_id']}, # B4 vs A6
-                        {'e1': equipos_reducido_zona_a[3]['equipo_id'], 'e2': equipos_reducido_zona_b[3]['equipo_id']}  # A5 vs B5
-                    ]
-                    
-                    for i, partido_info in enumerate(partidos_primera_ronda_reducido):
-                        equipo_c1_nombre = database.get_equipo_by_id(partido_info['e1'])['nombre']
-                        equipo_c2_nombre = database.get_equipo_by_id(partido_info['e2'])['nombre']
-                        mensajes.append(f"Simulando Partido {i+1}: {equipo_c1_nombre} vs {equipo_c2_nombre}")
-                        
-                        resultado_ronda, error_sim = simular_partido_eliminatorio(partido_info['e1'], partido_info['e2'])
-                        if not error_sim:
-                            ganador_ronda_id = None
-                            if resultado_ronda['goles_e1'] > resultado_ronda['goles_e2']:
-                                ganador_ronda_id = resultado_ronda['equipo1_id']
-                            else:
-                                ganador_ronda_id = resultado_ronda['equipo2_id']
-                            
-                            ganador_stats = database.get_equipo_clasificacion_stats(liga_id, ganador_ronda_id, temporada)
-                            if ganador_stats:
-                                ganador_stats['equipo_nombre'] = database.get_equipo_by_id(ganador_ronda_id)['nombre']
-                                ganadores_primera_ronda.append(ganador_stats)
-                            
-                            mensajes.append(f"  Resultado: {equipo_c1_nombre} {resultado_ronda['goles_e1']} - {resultado_ronda['goles_e2']} {equipo_c2_nombre}")
-                            mensajes.append(f"  **{database.get_equipo_by_id(ganador_ronda_id)['nombre']}** avanza a Cuartos de Final.")
-                    
-                    print(f"DEBUG REDUCIDO: Ganadores Primera Ronda: {len(ganadores_primera_ronda)} equipos. Nombres: {[e['equipo_nombre'] for e in ganadores_primera_ronda]}")
-
-                else:
-                    mensajes.append(f"Advertencia: No hay suficientes equipos para formar la Primera Ronda del Reducido. (Se necesitan 7 equipos del 2° al 8° por zona). Encontrados A:{len(equipos_reducido_zona_a)}, B:{len(equipos_reducido_zona_b)}.")
-                    ganadores_primera_ronda = [] # Asegurar que esté vacía si no se pudieron formar los cruces
-                
-                # --- Cruce de Cuartos de Final (8 equipos) ---
-                # Los 7 ganadores de la primera ronda + el perdedor de la final directa.
-                cuartos_participantes = list(ganadores_primera_ronda) 
-                if perdedor_final_ascenso_details_full: 
-                    cuartos_participantes.append(perdedor_final_ascenso_details_full) 
-
-                print(f"DEBUG REDUCIDO: Participantes Cuartos de Final (después de añadir perdedor): {len(cuartos_participantes)} equipos. Nombres: {[e['equipo_nombre'] for e in cuartos_participantes]}")
-
-                # Ordenar por Puntos, DG, GF para determinar "mejor" y "peor" clasificado
-                cuartos_participantes_ordenados = sorted(
-                    cuartos_participantes,
-                    key=lambda x: (x['pts'], x['dg'], x['gf']),
-                    reverse=True
-                )
-                
-                # Asegurarse de tener 8 equipos para los cuartos
-                ganadores_cuartos_reducido = [] # Para almacenar los 4 ganadores de Cuartos
-                if len(cuartos_participantes_ordenados) == 8:
-                    mensajes.append("\n--- Cuartos de Final del Reducido ---")
-                    partidos_cuartos_reducido_fase = [] # Renombrado para evitar conflicto con la variable de la ronda anterior
-                    
-                    # Generar los 4 cruces de cuartos de final (1° vs 8°, 2° vs 7°, etc.)
-                    for i in range(4): # 4 partidos para 8 equipos
-                        e1 = cuartos_participantes_ordenados[i]
-                        e2 = cuartos_participantes_ordenados[len(cuartos_participantes_ordenados) - 1 - i]
-                        partidos_cuartos_reducido_fase.append({'e1': e1['equipo_id'], 'e2': e2['equipo_id']})
-                    
-                    for i, partido_info in enumerate(partidos_cuartos_reducido_fase):
-                        equipo_c1_nombre = database.get_equipo_by_id(partido_info['e1'])['nombre']
-                        equipo_c2_nombre = database.get_equipo_by_id(partido_info['e2'])['nombre']
-                        mensajes.append(f"Simulando Partido {i+1}: {equipo_c1_nombre} vs {equipo_c2_nombre}")
-
-                        resultado_cuartos_fase, error_sim = simular_partido_eliminatorio(partido_info['e1'], partido_info['e2'])
-                        if not error_sim:
-                            ganador_cuartos_fase_id = None
-                            if resultado_cuartos_fase['goles_e1'] > resultado_cuartos_fase['goles_e2']:
-                                ganador_cuartos_fase_id = resultado_cuartos_fase['equipo1_id']
-                            else:
-                                ganador_cuartos_fase_id = resultado_cuartos_fase['equipo2_id']
-                            
-                            ganador_stats_cuartos = database.get_equipo_clasificacion_stats(liga_id, ganador_cuartos_fase_id, temporada)
-                            if ganador_stats_cuartos:
-                                ganador_stats_cuartos['equipo_nombre'] = database.get_equipo_by_id(ganador_cuartos_fase_id)['nombre']
-                                ganadores_cuartos_reducido.append(ganador_stats_cuartos) # Añadir a los ganadores de CUARTOS
-                            
-                            mensajes.append(f"  Resultado: {equipo_c1_nombre} {resultado_cuartos_fase['goles_e1']} - {resultado_cuartos_fase['goles_e2']} {equipo_c2_nombre}")
-                            mensajes.append(f"  **{database.get_equipo_by_id(ganador_cuartos_fase_id)['nombre']}** avanza a Semifinales.")
-                    
-                    print(f"DEBUG REDUCIDO: Ganadores Cuartos de Final (del reducido): {len(ganadores_cuartos_reducido)} equipos. Nombres: {[e['equipo_nombre'] for e in ganadores_cuartos_reducido]}")
-
-                else:
-                    mensajes.append(f"Advertencia: El número de equipos para Cuartos de Final del Reducido no es 8 exactos ({len(cuartos_participantes_ordenados)} encontrados). No se jugarán los cuartos de final.")
-                    ganadores_cuartos_reducido = [] # Asegurar que esté vacía si no se pudieron formar los cruces
-
-                # --- Cruce de Semifinales del Reducido (4 equipos) ---
-                # Los 4 ganadores de Cuartos de Final.
-                semis_participantes_reducido_fase = list(ganadores_cuartos_reducido) # Renombrado
-                
-                print(f"DEBUG REDUCIDO: Participantes Semifinales del Reducido: {len(semis_participantes_reducido_fase)} equipos. Nombres: {[e['equipo_nombre'] for e in semis_participantes_reducido_fase]}")
-
-                # Ordenar por Puntos, DG, GF (para semifinales)
-                semis_participantes_reducido_fase_ordenados = sorted(
-                    semis_participantes_reducido_fase,
-                    key=lambda x: (x['pts'], x['dg'], x['gf']),
-                    reverse=True
-                )
-                
-                ganadores_semis_reducido = [] # Para almacenar los 2 ganadores de Semis
-                if len(semis_participantes_reducido_fase_ordenados) == 4: # ¡Ahora se esperan 4 equipos!
-                    mensajes.append("\n--- Semifinales del Reducido ---")
-                    partidos_semis_reducido_fase = []
-                    
-                    for i in range(2): # 2 partidos para 4 equipos
-                        e1 = semis_participantes_reducido_fase_ordenados[i]
-                        e2 = semis_participantes_reducido_fase_ordenados[len(semis_participantes_reducido_fase_ordenados) - 1 - i]
-                        partidos_semis_reducido_fase.append({'e1': e1['equipo_id'], 'e2': e2['equipo_id']})
-                    
-                    for i, partido_info in enumerate(partidos_semis_reducido_fase):
-                        equipo_s1_nombre = database.get_equipo_by_id(partido_info['e1'])['nombre']
-                        equipo_s2_nombre = database.get_equipo_by_id(partido_info['e2'])['nombre']
-                        mensajes.append(f"Simulando Semifinal {i+1}: {equipo_s1_nombre} vs {equipo_s2_nombre}")
-
-                        resultado_semis_fase, error_sim = simular_partido_eliminatorio(partido_info['e1'], partido_info['e2'])
-                        if not error_sim:
-                            ganador_semis_fase_id = None
-                            if resultado_semis_fase['goles_e1'] > resultado_semis_fase['goles_e2']:
-                                ganador_semis_fase_id = resultado_semis_fase['equipo1_id']
-                            else:
-                                ganador_semis_fase_id = resultado_semis_fase['equipo2_id']
-                            
-                            ganadores_semis_reducido.append(database.get_equipo_by_id(ganador_semis_fase_id))
-                            
-                            mensajes.append(f"  Resultado: {equipo_s1_nombre} {resultado_semis_fase['goles_e1']} - {resultado_semis_fase['goles_e2']} {equipo_s2_nombre}")
-                            mensajes.append(f"  **{database.get_equipo_by_id(ganador_semis_fase_id)['nombre']}** avanza a la Final del Reducido.")
-                    
-                    print(f"DEBUG REDUCIDO: Ganadores Semifinales (del reducido): {len(ganadores_semis_reducido)} equipos. Nombres: {[e['nombre'] for e in ganadores_semis_reducido]}")
-
-                else:
-                    mensajes.append(f"Advertencia: El número de equipos para Semifinales del Reducido no es 4 exactos ({len(semis_participantes_reducido_fase_ordenados)} encontrados). No se jugarán las semifinales.")
-                    ganadores_semis_reducido = []
-
-                # --- Cruce de Final del Reducido (2 equipos) ---
-                # Los 2 ganadores de Semifinales.
-                if len(ganadores_semis_reducido) == 2: # ¡Ahora esta condición debería ser True!
-                    finalista_1 = ganadores_semis_reducido[0]
-                    finalista_2 = ganadores_semis_reducido[1]
-
-                    mensajes.append("\n--- ¡GRAN FINAL DEL REDUCIDO! ---")
-                    mensajes.append(f"Se enfrentan: **{finalista_1['nombre']}** vs **{finalista_2['nombre']}**")
-
-                    resultado_final_reducido, error_sim = simular_partido_eliminatorio(finalista_1['id'], finalista_2['id'])
-                    
-                    if not error_sim:
-                        ganador_reducido_id = None
-                        if resultado_final_reducido['goles_e1'] > resultado_final_reducido['goles_e2']:
-                            ganador_reducido_id = resultado_final_reducido['equipo1_id']
-                        else:
-                            ganador_reducido_id = resultado_final_reducido['equipo2_id']
-                        
-                        ganador_reducido_nombre = database.get_equipo_by_id(ganador_reducido_id)['nombre']
-
-                        mensajes.append(f"\n¡Resultado de la Final del Reducido!")
-                        mensajes.append(f"**{database.get_equipo_by_id(resultado_final_reducido['equipo1_id'])['nombre']} {resultado_final_reducido['goles_e1']} - {resultado_final_reducido['goles_e2']} {database.get_equipo_by_id(resultado_final_reducido['equipo2_id'])['nombre']}**")
-                        mensajes.append(f"¡INCREÍBLE! **{ganador_reducido_nombre}** ha ganado el Reducido y logra el **SEGUNDO ASCENSO** a Primera División. 🥳")
-
-                        database.add_ascenso_descenso(ganador_reducido_id, liga_id, 'Primera División', temporada, 'ascenso_reducido')
-                        database.add_campeon(liga_id, temporada, ganador_reducido_id, tipo_titulo="Ganador Reducido - Ascenso")
-                else:
-                    mensajes.append(f"Error: No hay suficientes finalistas para jugar la Final del Reducido. Se esperaban 2 ganadores de semifinales, pero se encontraron {len(ganadores_semis_reducido)}.")
+    # --- Fase eliminatoria al terminar la fase regular (ej. Final por el Primer Ascenso y Reducido de la Primera Nacional) ---
+    torneo = eliminatorias.TORNEOS_POR_LIGA.get(liga_details['nombre'])
+    if torneo and dia_actual == torneo['dia']:
+        mensajes.extend(eliminatorias.jugar_torneo(torneo, liga_id, temporada, fecha_str_actual_calendario, simular_partido_eliminatorio))
 
     # 3. Avanzar el día y verificar el fin de temporada
     siguiente_dia = dia_actual + 1
@@ -613,14 +414,26 @@ def avanzar_dia(user_id):
             tabla_str = format_clasificacion_para_mensaje(clasificacion_final_liga_usuario, tu_equipo_id)
             mensajes.append(tabla_str)
         
-        # Top jugadores de tu liga (por OVR, ya que no tenemos otras estadísticas)
-        top_jugadores_liga_usuario = database.get_top_jugadores_liga(liga_id, limit=5)
-        if top_jugadores_liga_usuario:
-            mensajes.append(f"\n**Top 5 Jugadores por OVR en {database.get_liga_by_id(liga_id)['nombre']}:**")
-            for i, jugador in enumerate(top_jugadores_liga_usuario):
-                mensajes.append(f"{i+1}. {jugador['nombre']} ({jugador['equipo_nombre']}) - OVR: {jugador['valoracion']}")
+        # Goleadores y asistidores de tu liga (de estadisticas_jugadores); si no hay eventos, top por OVR
+        nombre_liga_usuario = database.get_liga_by_id(liga_id)['nombre']
+        goleadores_liga_usuario = database.get_goleadores_liga(liga_id, temporada_finalizada, limit=5)
+        asistidores_liga_usuario = database.get_goleadores_liga(liga_id, temporada_finalizada, limit=5, por='asistencias')
+        if goleadores_liga_usuario:
+            mensajes.append(f"\n**Goleadores de {nombre_liga_usuario}:**")
+            for i, jugador in enumerate(goleadores_liga_usuario):
+                mensajes.append(f"{i+1}. {jugador['nombre'] or 'Retirado'} ({jugador['equipo_nombre']}) - {jugador['goles']} goles")
+            if asistidores_liga_usuario:
+                mensajes.append(f"\n**Asistidores de {nombre_liga_usuario}:**")
+                for i, jugador in enumerate(asistidores_liga_usuario):
+                    mensajes.append(f"{i+1}. {jugador['nombre'] or 'Retirado'} ({jugador['equipo_nombre']}) - {jugador['asistencias']} asistencias")
         else:
-            mensajes.append("No se encontraron jugadores para el top de tu liga.")
+            top_jugadores_liga_usuario = database.get_top_jugadores_liga(liga_id, limit=5)
+            if top_jugadores_liga_usuario:
+                mensajes.append(f"\n**Top 5 Jugadores por OVR en {nombre_liga_usuario}:**")
+                for i, jugador in enumerate(top_jugadores_liga_usuario):
+                    mensajes.append(f"{i+1}. {jugador['nombre']} ({jugador['equipo_nombre']}) - OVR: {jugador['valoracion']}")
+            else:
+                mensajes.append("No se encontraron jugadores para el top de tu liga.")
 
         # ** 3.2. Resumen de OTRAS LIGAS (IA) **
         todas_las_ligas_db = database.get_all_ligas_info()
@@ -667,6 +480,15 @@ def avanzar_dia(user_id):
                     else:
                         mensajes.append("No hay datos de clasificación para esta liga.")
 
+        # ** 3.3. Progresión de jugadores: edad, valoración, retiros y juveniles (una sola pasada) **
+        progresion_temporada = progresion.progresar_temporada()
+        if progresion_temporada:
+            mensajes.append(f"\n**Fin de temporada en los planteles:** {len(progresion_temporada['retirados'])} jugadores se retiran y "
+                            f"{len(progresion_temporada['juveniles'])} juveniles suben a primera.")
+            mensajes.extend(progresion.resumen_equipo(progresion_temporada, tu_equipo_id))
+        else:
+            mensajes.append("Advertencia: No se pudo aplicar la progresión de jugadores de fin de temporada.")
+
         mensajes.append(f"\n--- ¡COMIENZA LA TEMPORADA {temporada}! ---")
         mensajes.append("Reiniciando clasificaciones y generando nuevo fixture para la próxima temporada en todas las ligas...")
         for liga_reset in todas_las_ligas_db:
@@ -675,6 +497,12 @@ def avanzar_dia(user_id):
             fixture_generado = generate_fixture(liga_reset['id'], temporada)
             if not fixture_generado: # Si generate_fixture devuelve False
                 mensajes.append(f"Advertencia: No se pudo generar el fixture para la nueva temporada de la liga '{liga_reset['nombre']}'.")
+
+        # Las temporadas que ya terminaron para todas las carreras pasan al archivo; las tablas de
+        # jornadas, partidos y clasificaciones quedan con las temporadas en juego
+        temporadas_archivadas = database.archivar_temporadas_terminadas()
+        if temporadas_archivadas:
+            print(f"DEBUG GAME_LOGIC: Temporadas archivadas (liga_id, temporada): {temporadas_archivadas}")
         nueva_temporada_iniciada = True
 
     # Obtener el estado MÁS RECIENTE de dias_mercado_abierto DESPUÉS de toda la lógica de mercado del día.
@@ -692,11 +520,37 @@ def avanzar_dia(user_id):
     return mensajes
 
 
+@functools.lru_cache(maxsize=None)
+def _plantilla_todos_contra_todos(num_equipos):
+    """
+    Cruces de un todos contra todos de ida y vuelta, por posición (0 a num_equipos - 1):
+    tupla de jornadas, cada una con tuplas (local, visitante). Método del círculo en forma
+    cerrada: en la jornada r la posición fija (la última) juega con r, y para k = 1.. se
+    cruzan (r + k) y (r - k) módulo n - 1. La localía alterna con la paridad de r y de k, así
+    cada equipo es local en la mitad de sus partidos de ida y nunca encadena más de tres
+    partidos seguidos de local o de visitante. La vuelta repite la ida con la localía invertida.
+    Con número impar de equipos se agrega una posición libre y quien le toca descansa esa jornada.
+    Se calcula una vez por cantidad de equipos.
+    """
+    if num_equipos < 2:
+        return ()
+    n = num_equipos + num_equipos % 2
+    fija = n - 1
+    ida = []
+    for r in range(n - 1):
+        partidos = [(r, fija) if r % 2 == 0 else (fija, r)]
+        for k in range(1, n // 2):
+            a, b = (r + k) % (n - 1), (r - k) % (n - 1)
+            partidos.append((a, b) if k % 2 else (b, a))
+        ida.append(tuple(p for p in partidos if num_equipos not in p)) # Posición libre (impar): descansa
+    vuelta = [tuple((visitante, local) for local, visitante in jornada) for jornada in ida]
+    return tuple(ida + vuelta)
+
 def generate_fixture(liga_id, temporada):
     """
     Genera un fixture de ida y vuelta para una liga y lo guarda en la base de datos.
     Soporta ligas con y sin zonas. Para ligas como Primera Nacional, asigna zonas aleatoriamente y las guarda.
-    Algoritmo Round-Robin para generar los emparejamientos.
+    Los emparejamientos salen de _plantilla_todos_contra_todos (una plantilla por cantidad de equipos).
     Asigna una fecha_simulacion a cada jornada.
     
     liga_id: ID de la liga para la que generar el fixture.
@@ -772,64 +626,15 @@ def generate_fixture(liga_id, temporada):
         max_jornadas_totales = 0 # El máximo de jornadas que tendrá la liga (34 para PN, 2*(N-1) para otras)
 
         for zona_nombre, equipo_ids_zona_original in equipos_por_zona.items():
-            current_teams_in_rotation = list(equipo_ids_zona_original)
-            num_equipos_zona = len(current_teams_in_rotation)
-
-            if num_equipos_zona < 2:
-                fixture_por_zona[zona_nombre] = []
-                continue
-
-            if num_equipos_zona % 2 != 0:
-                current_teams_in_rotation.append(None)
-                num_equipos_zona += 1
-            
-            rondas_ida = num_equipos_zona - 1
-            
-            temp_fixture_zona = [] # Almacenar el fixture de esta zona temporalmente
-            # Generación de partidos de IDA para esta zona
-            teams_for_rotation_ida = list(current_teams_in_rotation) # Copia para rotación de ida
-            for ronda_idx in range(rondas_ida):
-                jornada_partidos_ida = []
-                for j in range(num_equipos_zona // 2):
-                    equipo_local_id = teams_for_rotation_ida[j]
-                    equipo_visitante_id = teams_for_rotation_ida[num_equipos_zona - 1 - j]
-                    if equipo_local_id is not None and equipo_visitante_id is not None:
-                        jornada_partidos_ida.append({
-                            'equipo_local_id': equipo_local_id,
-                            'equipo_visitante_id': equipo_visitante_id,
-                            'zona': zona_nombre
-                        })
-                temp_fixture_zona.append(jornada_partidos_ida) # Los partidos de ida se añaden aquí
-                
-                # Rotar equipos para la siguiente ronda de ida
-                primer_equipo = teams_for_rotation_ida[0]
-                resto_equipos = teams_for_rotation_ida[1:]
-                resto_equipos.insert(0, resto_equipos.pop())
-                teams_for_rotation_ida = [primer_equipo] + resto_equipos
-            
-            # --- SECCIÓN CORREGIDA: Generación de partidos de VUELTA para esta zona ---
-            # Crear una lista TEMPORAL para almacenar las jornadas de vuelta
-            # antes de añadirlas a temp_fixture_zona
-            jornadas_vuelta_temp = []
-            
-            # Iterar sobre las jornadas que ya fueron generadas en la fase de ida
-            for jornada_partidos_ida in temp_fixture_zona[:rondas_ida]: # Asegurarse de iterar solo las de ida
-                jornada_partidos_vuelta = []
-                for partido_ida in jornada_partidos_ida:
-                    # Invertir local y visitante
-                    jornada_partidos_vuelta.append({
-                        'equipo_local_id': partido_ida['equipo_visitante_id'],
-                        'equipo_visitante_id': partido_ida['equipo_local_id'],
-                        'zona': partido_ida['zona'] # Usar la zona original del partido de ida
-                    })
-                jornadas_vuelta_temp.append(jornada_partidos_vuelta)
-            
-            # Ahora, añadir TODAS las jornadas de vuelta a temp_fixture_zona
-            temp_fixture_zona.extend(jornadas_vuelta_temp)
-            # --- FIN SECCIÓN CORREGIDA ---
-
-            fixture_por_zona[zona_nombre] = temp_fixture_zona
-            max_jornadas_totales = max(max_jornadas_totales, len(temp_fixture_zona))
+            equipo_ids_zona = list(equipo_ids_zona_original)
+            # Los cruces salen de la plantilla por cantidad de equipos; cada temporada solo cambia quién ocupa cada lugar
+            random.shuffle(equipo_ids_zona)
+            fixture_por_zona[zona_nombre] = [
+                [{'equipo_local_id': equipo_ids_zona[local], 'equipo_visitante_id': equipo_ids_zona[visitante], 'zona': zona_nombre}
+                 for local, visitante in jornada]
+                for jornada in _plantilla_todos_contra_todos(len(equipo_ids_zona))
+            ]
+            max_jornadas_totales = max(max_jornadas_totales, len(fixture_por_zona[zona_nombre]))
 
         # Ajuste para Primera Nacional: asegurar 34 jornadas globales
         if liga_details['nombre'] == LIGA_CON_ZONAS_DINAMICAS:
@@ -848,7 +653,7 @@ def generate_fixture(liga_id, temporada):
                 max_jornadas_totales = final_num_jornadas_globales
             elif max_jornadas_totales < final_num_jornadas_globales and liga_details['nombre'] == LIGA_CON_ZONAS_DINAMICAS:
                 # Esto es una advertencia. Si las zonas no tienen 18 equipos, no se llegarán a 34 jornadas por zona.
-                print(f"ADVERTENCIA: Para Primera Nacional, el número de equipos en una zona ({num_equipos_zona}) no permite generar 34 jornadas por zona.")
+                print(f"ADVERTENCIA: Para Primera Nacional, el número de equipos por zona no permite generar 34 jornadas por zona ({max_jornadas_totales}).")
                 # Podemos optar por mantener el número de jornadas generadas o forzar 34 y tener jornadas con menos partidos.
                 # Por ahora, simplemente nos adaptaremos a `max_jornadas_totales` y combinaremos.
 
@@ -869,11 +674,12 @@ def generate_fixture(liga_id, temporada):
             fixture_completo = fixture_por_zona['unica']
             # Asegurarse de que si se generaron más jornadas por el Round-Robin (ej. impar),
             # el max_jornadas_totales esté bien establecido.
-            # Ya lo hacemos al calcular `len(temp_fixture_zona)`.
+            # Ya lo hacemos al calcular `len(fixture_por_zona[zona_nombre])`.
 
         fecha_base_simulacion_global = datetime.date(2025, 3, 1)
         dias_entre_jornadas = 5 
 
+        jornadas = []
         for i, jornada_partidos_global in enumerate(fixture_completo):
             # Asegurarse de no exceder las 34 jornadas para Primera Nacional (si es el caso)
             if liga_details['nombre'] == LIGA_CON_ZONAS_DINAMICAS and i >= final_num_jornadas_globales:
@@ -886,25 +692,13 @@ def generate_fixture(liga_id, temporada):
             fecha_simulacion_actual = fecha_base_simulacion_global + datetime.timedelta(days=dias_totales_simulados_para_jornada)
             fecha_simulacion_str = fecha_simulacion_actual.strftime('%Y-%m-%d')
 
-            jornada_id = database.add_jornada(liga_id, temporada, numero_jornada_db, conn)
-            
-            if jornada_id:
-                database.update_jornada_fecha(jornada_id, fecha_simulacion_str, conn)
-            else:
-                existing_jornada = database.get_jornada_by_numero(liga_id, temporada, numero_jornada_db, conn)
-                if existing_jornada:
-                    jornada_id = existing_jornada['id']
-                    database.update_jornada_fecha(jornada_id, fecha_simulacion_str, conn)
-                else:
-                    print(f"Error: No se pudo añadir ni encontrar la jornada {numero_jornada_db} para la liga {liga_details['nombre']}.")
-                    return False
-
-            if jornada_id:
-                for partido_info in jornada_partidos_global:
-                    if partido_info['equipo_local_id'] is not None and partido_info['equipo_visitante_id'] is not None:
-                        # Asegurarse de que add_partido reciba el tipo_partido si es necesario.
-                        # Por defecto, add_partido tiene tipo_partido='liga', lo cual es correcto aquí.
-                        database.add_partido(jornada_id, partido_info['equipo_local_id'], partido_info['equipo_visitante_id'], conn, zona=partido_info['zona'])
+            jornadas.append((numero_jornada_db, fecha_simulacion_str,
+                             [(p['equipo_local_id'], p['equipo_visitante_id'], p['zona']) for p in jornada_partidos_global]))
+
+        # Todas las jornadas y partidos de la temporada en dos inserciones
+        if database.add_fixture(liga_id, temporada, jornadas, conn) is None:
+            print(f"Error: No se pudo guardar el fixture de la liga {liga_details['nombre']}.")
+            return False
         
         conn.commit()
         return True
@@ -0,0 +1,32 @@
+# limitador.py
+
+import asyncio
+import time
+
+# Limitador de ritmo sin dependencias externas: lo usan el scraper (scraper_async.py) y la
+# cola de salida del bot (salida_discord.py), así el bot no necesita aiohttp para usarlo.
+
+class LimitadorTokens:
+    """
+    Token bucket: permite `tasa` peticiones por segundo con ráfagas de hasta `capacidad`.
+    Cada adquirir() espera lo justo hasta que haya un token disponible.
+    """
+    def __init__(self, tasa, capacidad=1):
+        if tasa <= 0:
+            raise ValueError(f"La tasa del limitador debe ser mayor que 0 (se recibió {tasa}).")
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self.tokens = capacidad
+        self.ultimo = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def adquirir(self):
+        async with self._lock:
+            while True:
+                ahora = time.monotonic()
+                self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+                self.ultimo = ahora
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.tasa)
@@ -1,161 +1,518 @@
 # local_data.py
 
 import database
-import re
+import csv
+import hashlib
+import json
+import os
 import random
+import re
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
 
-def cargar_datos_desde_txt_a_db(ruta_archivo, liga_nombre, pais_liga):
+# Perfil de valoración que se usa si la liga no tiene uno guardado en `ligas.perfil_valoracion`.
+# Cada tramo cubre las edades hasta `edad_max` (None = sin límite) y sortea en [min, max],
+# sumando `bonus_por_edad * edad` si está definido. Después se acota a [piso, techo].
+PERFIL_VALORACION_POR_DEFECTO = {
+    'tramos': [
+        {'edad_max': 20, 'min': 50, 'max': 67, 'bonus_por_edad': 0.5},
+        {'edad_max': 28, 'min': 55, 'max': 78},
+        {'edad_max': None, 'min': 58, 'max': 72},
+    ],
+    'piso': 40,
+    'techo': 80,
+}
+
+def perfil_desde_banda(banda):
+    """Construye un perfil con los tramos por defecto y el piso/techo de la banda (piso, techo)."""
+    perfil = dict(PERFIL_VALORACION_POR_DEFECTO)
+    perfil['piso'], perfil['techo'] = banda
+    return perfil
+
+def generar_valoraciones(edades, perfil=None, semilla=None):
     """
-    Carga los datos de equipos y jugadores desde un archivo de texto
-    a la base de datos, utilizando las funciones de database.py.
+    Genera de una vez las valoraciones de todos los jugadores de una liga.
+    Con la misma semilla y las mismas edades el resultado es siempre el mismo.
     """
-    database.init_db()
+    perfil = perfil or PERFIL_VALORACION_POR_DEFECTO
+    rng = random.Random(semilla)
+    piso, techo = perfil['piso'], perfil['techo']
 
-    equipos_cargados = set()
-    jugadores_cargados = 0
+    # Resolver el tramo una vez por edad distinta, no una vez por jugador
+    parametros_por_edad = {}
+    for edad in set(edades):
+        tramo = next(t for t in perfil['tramos'] if t['edad_max'] is None or edad <= t['edad_max'])
+        parametros_por_edad[edad] = (tramo['min'], tramo['max'] - tramo['min'] + 1, int(edad * tramo.get('bonus_por_edad', 0)))
 
-    liga_id = database.get_liga_id(liga_nombre)
-    if not liga_id:
-        liga_id = database.add_liga(liga_nombre, pais_liga, 0)
-        if not liga_id:
-            print(f"Error: No se pudo agregar ni encontrar la liga '{liga_nombre}'. Abortando carga.")
-            return
+    valoraciones = []
+    for edad, r in zip(edades, [rng.random() for _ in edades]):
+        minimo, amplitud, bonus = parametros_por_edad[edad]
+        valoraciones.append(min(techo, max(piso, minimo + int(r * amplitud) + bonus)))
+    return valoraciones
 
-    print(f"\nCargando datos desde '{ruta_archivo}' a la base de datos para la liga '{liga_nombre}'...")
+# Fecha de nacimiento exacta en los registros (YYYY-MM-DD)
+PATRON_FECHA = re.compile(r'\d{4}-\d{2}-\d{2}')
 
-    # El formato del archivo para Primera Nacional podría ser: Nombre, Posicion, Edad, Nacionalidad, Nombre Equipo, Zona
-    # Para otras ligas, sigue siendo: Nombre, Posicion, Edad, Nacionalidad, Nombre Equipo
-    
-    with open(ruta_archivo, 'r', encoding='utf-8') as f:
-        for linea in f:
-            linea = linea.strip()
-            if not linea:
-                continue
+# Formatos de origen soportados: extensión -> formato
+FORMATOS_POR_EXTENSION = {
+    '.txt': 'csv',
+    '.csv': 'csv',
+    '.tsv': 'tsv',
+    '.jsonl': 'jsonl',
+}
+
+def _detectar_formato(ruta_archivo):
+    return FORMATOS_POR_EXTENSION.get(os.path.splitext(ruta_archivo)[1].lower(), 'csv')
 
+def _filas_delimitadas(f, delimitador):
+    """Filas de un CSV/TSV con comillas: `"Apellido, Nombre", Defensa, 25, ...` no se rompe en la coma."""
+    for partes in csv.reader(f, delimiter=delimitador, skipinitialspace=True):
+        if not partes or not any(p.strip() for p in partes):
+            continue
+        yield delimitador.join(partes), [p.strip() for p in partes]
+
+def _filas_jsonl(f):
+    for linea in f:
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            obj = json.loads(linea)
+        except json.JSONDecodeError as e:
+            print(f"Error al parsear línea JSON de jugador: {linea} - {e}")
+            continue
+        yield linea, [obj.get(k) for k in ('nombre', 'posicion', 'edad', 'nacionalidad', 'equipo', 'fecha_nacimiento')]
+
+def parsear_archivo_jugadores(ruta_archivo, formato=None):
+    """
+    Generador que lee el archivo fila a fila (sin cargarlo entero en memoria)
+    y devuelve dicts {nombre, posicion, edad, nacionalidad, equipo, fecha_nacimiento}.
+    Soporta CSV (por defecto, también los .txt), TSV y JSON Lines.
+    La fecha de nacimiento (YYYY-MM-DD) es opcional (sexto campo o clave 'fecha_nacimiento'); si falta queda None.
+    Las filas mal formadas se informan y se saltan.
+    """
+    # Formato: Nombre, Posicion, Edad, Nacionalidad, Nombre Equipo[, Fecha Nacimiento]
+    formato = formato or _detectar_formato(ruta_archivo)
+    with open(ruta_archivo, 'r', encoding='utf-8', newline='') as f:
+        if formato == 'jsonl':
+            filas = _filas_jsonl(f)
+        else:
+            filas = _filas_delimitadas(f, '\t' if formato == 'tsv' else ',')
+        for linea, partes in filas:
             try:
-                partes = [p.strip() for p in linea.split(',')]
-                
-                nombre_jugador = partes[0]
-                posicion = partes[1]
-                edad = int(partes[2])
-                nacionalidad = partes[3]
-                nombre_equipo_linea = partes[4]
-                
-
-
-                equipo_id = database.get_equipo_id(nombre_equipo_linea, liga_id)
-                if not equipo_id:
-                    # Pasar la zona al añadir equipo
-                    equipo_id = database.add_equipo(nombre_equipo_linea, liga_id)
-                
-                if not equipo_id:
-                    print(f"Advertencia: No se pudo añadir o encontrar el equipo '{nombre_equipo_linea}' para el jugador '{nombre_jugador}'. Saltando jugador.")
-                    continue
-                
-                equipos_cargados.add(nombre_equipo_linea)
-
-                # ... (Lógica de generación de valoración existente) ...
-                if edad <= 20:
-                    valoracion = random.randint(50, 67) + int(edad * 0.5)
-                elif 21 <= edad <= 28:
-                    valoracion = random.randint(55, 78)
-                else:
-                    valoracion = random.randint(58, 72)
-                
-                if liga_nombre == "Brasileirão Serie A":
-                    valoracion = min(86, valoracion)
-                    valoracion = max(62, valoracion)
-                elif liga_nombre == "Primera Nacional":
-                    valoracion = min(71, valoracion)
-                    valoracion = max(40, valoracion)
-                elif liga_nombre == "LaLiga":
-                    valoracion = min(96, valoracion)
-                    valoracion = max(79, valoracion)
-                elif liga_nombre == "Premier League":
-                    valoracion = min(96, valoracion)
-                    valoracion = max(79, valoracion)
-                else:
-                    valoracion = min(80, valoracion)
-                    valoracion = max(40, valoracion)
-
-                current_year = date.today().year
-                est_birth_year = current_year - edad
-                fecha_nacimiento_str = f"{est_birth_year}-07-01" 
-
-                jugador_existente = database.get_jugador_by_name_and_team(nombre_jugador, equipo_id)
-                if not jugador_existente:
-                    database.add_jugador(
-                        nombre_jugador, posicion, valoracion, fecha_nacimiento_str, 
-                        edad, nacionalidad, equipo_id
-                    )
-                    jugadores_cargados += 1
-
-            # ... (Manejo de errores existente) ...
+                if None in partes[:5]:
+                    raise IndexError("faltan campos")
+                yield {
+                    'nombre': partes[0],
+                    'posicion': partes[1],
+                    'edad': int(partes[2]),
+                    'nacionalidad': partes[3],
+                    'equipo': partes[4],
+                    'fecha_nacimiento': partes[5] if len(partes) > 5 and partes[5] else None,
+                }
             except ValueError as e:
                 print(f"Error al parsear datos numéricos/fecha en línea de jugador: {linea} - {e}")
             except IndexError as e:
                 print(f"Error al acceder a partes de la línea de jugador (posiblemente formato incorrecto): {linea} - {e}")
 
-    # Actualizar el número de equipos en la tabla de ligas
+def _fecha_nacimiento(registro, current_year):
+    """Fecha exacta si el registro la trae; si no, una aproximada a partir de la edad."""
+    return registro.get('fecha_nacimiento') or f"{current_year - registro['edad']}-07-01"
+
+def _obtener_o_crear_liga(liga_nombre, pais_liga, perfil, conn):
+    """
+    Devuelve (liga_id, perfil_valoracion) creando la liga si hace falta.
+    Si se pasa un perfil se guarda en la liga; si no, se usa el guardado o el de por defecto.
+    """
+    liga_id = database.get_liga_id(liga_nombre, conn)
+    if not liga_id:
+        database.add_liga(liga_nombre, pais_liga, 0, conn)
+        liga_id = database.get_liga_id(liga_nombre, conn)
+        if not liga_id:
+            return None, None
+    if perfil:
+        database.update_perfil_valoracion_liga(liga_id, perfil, conn)
+    else:
+        perfil = database.get_perfil_valoracion_liga(liga_id, conn) or PERFIL_VALORACION_POR_DEFECTO
+    return liga_id, perfil
+
+def cargar_registros_en_db(registros, liga_nombre, pais_liga, perfil=None, semilla=None, ruta_archivo=None):
+    """
+    Carga masiva de jugadores ya parseados para una liga.
+    Usa una sola conexión y una sola transacción: los equipos se resuelven con un dict
+    en memoria, los jugadores existentes se deduplican contra un set precargado de
+    (nombre, equipo_id) y los nuevos se insertan con un único executemany.
+    Las valoraciones se generan en un solo lote con el perfil de la liga (semilla opcional).
+    Si los registros vienen de `ruta_archivo`, se guardan también su hash y sus bloques por
+    equipo, como en reimportar_incremental, para que la siguiente reimportación parta de acá.
+    Retorna (equipos_cargados, jugadores_añadidos) o None si falló.
+    """
     conn = database.connect_db()
-    cursor = conn.cursor()
-    cursor.execute("UPDATE ligas SET num_equipos = ? WHERE id = ?", (len(equipos_cargados), liga_id))
-    conn.commit()
-    conn.close()
+    try:
+        liga_id, perfil = _obtener_o_crear_liga(liga_nombre, pais_liga, perfil, conn)
+        if not liga_id:
+            print(f"Error: No se pudo agregar ni encontrar la liga '{liga_nombre}'. Abortando carga.")
+            return None
+
+        equipos_por_nombre = database.get_mapa_equipos_liga(liga_id, conn)
+        jugadores_existentes = database.get_claves_jugadores_liga(liga_id, conn)
+        equipos_cargados = set()
+        equipos_rechazados = set()
+        filas_nuevas = []
+        lineas_por_equipo = {}
+        current_year = date.today().year
+
+        for registro in registros:
+            nombre_equipo = registro['equipo']
+            lineas_por_equipo.setdefault(nombre_equipo, []).append(_linea_normalizada(registro))
+            equipo_id = equipos_por_nombre.get(nombre_equipo)
+            if not equipo_id and nombre_equipo not in equipos_rechazados:
+                equipo_id = database.add_equipo_si_no_existe(nombre_equipo, liga_id, conn=conn)
+                if equipo_id:
+                    equipos_por_nombre[nombre_equipo] = equipo_id
+                else:
+                    equipos_rechazados.add(nombre_equipo)
+            if not equipo_id:
+                print(f"Advertencia: No se pudo añadir o encontrar el equipo '{nombre_equipo}' para el jugador '{registro['nombre']}'. Saltando jugador.")
+                continue
+
+            equipos_cargados.add(nombre_equipo)
+
+            clave = (registro['nombre'], equipo_id)
+            if clave in jugadores_existentes:
+                continue
+            jugadores_existentes.add(clave)
+
+            filas_nuevas.append((
+                registro['nombre'], registro['posicion'], None,
+                _fecha_nacimiento(registro, current_year), registro['edad'], registro['nacionalidad'], equipo_id
+            ))
 
+        valoraciones = generar_valoraciones([fila[4] for fila in filas_nuevas], perfil, semilla)
+        filas_nuevas = [fila[:2] + (valoracion,) + fila[3:] for fila, valoracion in zip(filas_nuevas, valoraciones)]
+        database.add_jugadores_bulk(filas_nuevas, conn)
+        database.update_liga_num_equipos(liga_id, len(equipos_por_nombre), conn)
+        if ruta_archivo:
+            _registrar_importacion(ruta_archivo, _hash_archivo(ruta_archivo), liga_id, lineas_por_equipo, conn)
+        conn.commit()
+        return len(equipos_cargados), len(filas_nuevas)
+    except sqlite3.Error as e:
+        print(f"Error en la carga masiva de la liga '{liga_nombre}': {e}")
+        conn.rollback()
+        return None
+    finally:
+        conn.close()
+
+def cargar_datos_desde_txt_a_db(ruta_archivo, liga_nombre, pais_liga, perfil=None, semilla=None):
+    """
+    Carga los datos de equipos y jugadores desde un archivo de texto
+    a la base de datos, en una sola transacción por liga.
+    """
+    database.init_db()
+
+    print(f"\nCargando datos desde '{ruta_archivo}' a la base de datos para la liga '{liga_nombre}'...")
+
+    resultado = cargar_registros_en_db(parsear_archivo_jugadores(ruta_archivo), liga_nombre, pais_liga, perfil, semilla,
+                                       ruta_archivo=ruta_archivo)
+    if resultado is None:
+        return
+
+    equipos_cargados, jugadores_cargados = resultado
     print(f"\nCarga de datos completada para '{liga_nombre}'.")
-    print(f"  - {len(equipos_cargados)} equipos cargados/actualizados.")
+    print(f"  - {equipos_cargados} equipos cargados/actualizados.")
     print(f"  - {jugadores_cargados} jugadores añadidos.")
 
-# --- Ejecución principal ---
-if __name__ == '__main__':
+def _hash_texto(texto):
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+def _hash_archivo(ruta_archivo):
+    """Hash del contenido del archivo leído por bloques (sin parsearlo)."""
+    h = hashlib.sha256()
+    with open(ruta_archivo, 'rb') as f:
+        for bloque in iter(lambda: f.read(65536), b''):
+            h.update(bloque)
+    return h.hexdigest()
+
+def _linea_normalizada(registro):
+    """Nombre, posición, edad, nacionalidad y fecha de nacimiento (vacía si el registro no la trae)."""
+    return f"{registro['nombre']}, {registro['posicion']}, {registro['edad']}, {registro['nacionalidad']}, {registro.get('fecha_nacimiento') or ''}"
+
+def _bloques(lineas_por_equipo):
+    """[(equipo, hash, lineas)] de los bloques por equipo, como se guardan en importaciones_bloques."""
+    bloques = []
+    for equipo, lineas in lineas_por_equipo.items():
+        texto = "\n".join(lineas)
+        bloques.append((equipo, _hash_texto(texto), texto))
+    return bloques
+
+def _registrar_importacion(ruta_archivo, hash_archivo, liga_id, lineas_por_equipo, conn):
+    """Guarda el hash del archivo y sus bloques por equipo, el punto de partida de la próxima reimportación."""
+    database.replace_bloques_importacion_liga(liga_id, _bloques(lineas_por_equipo), conn)
+    database.set_hash_importacion_archivo(ruta_archivo, liga_id, hash_archivo, conn)
+
+def _bloques_desde_db(liga_id, conn):
+    """
+    Bloques previos armados con los jugadores que ya están en la DB, para una liga que nunca se
+    importó con registro de bloques (ej. cargada antes de que existiera): así la primera
+    reimportación compara contra lo cargado en vez de tomar todo el archivo como altas.
+    """
+    lineas_por_equipo = {}
+    for jugador in database.get_jugadores_importados_liga(liga_id, conn):
+        lineas_por_equipo.setdefault(jugador['equipo'], []).append(_linea_normalizada(jugador))
+    return {equipo: {'hash': hash_bloque, 'lineas': lineas} for equipo, hash_bloque, lineas in _bloques(lineas_por_equipo)}
+
+def _registro_desde_linea(linea, equipo):
+    partes = [p.strip() for p in linea.rsplit(',', 4)]
+    if len(partes) == 5 and (not partes[4] or PATRON_FECHA.fullmatch(partes[4])):
+        nombre, posicion, edad, nacionalidad, fecha_nacimiento = partes
+    else:
+        # Bloque guardado antes de que las líneas llevaran la fecha
+        nombre, posicion, edad, nacionalidad = [p.strip() for p in linea.rsplit(',', 3)]
+        fecha_nacimiento = ''
+    return {'nombre': nombre, 'posicion': posicion, 'edad': int(edad), 'nacionalidad': nacionalidad, 'equipo': equipo,
+            'fecha_nacimiento': fecha_nacimiento or None}
+
+def _cambio(anterior, nuevo, campo):
+    """True si el campo cambió; la fecha de nacimiento solo cuenta si el registro nuevo trae una."""
+    if campo == 'fecha_nacimiento' and not nuevo.get(campo):
+        return False
+    return anterior.get(campo) != nuevo.get(campo)
+
+def _diff_jugadores(anteriores, nuevos):
+    """
+    Compara los registros de los bloques que cambiaron.
+    Primero empareja por (nombre, equipo); lo que queda sin emparejar con el mismo nombre
+    (y nombre único) se interpreta como un cambio de equipo.
+    Retorna (altas, modificaciones, bajas); las modificaciones son pares (anterior, nuevo).
+    """
+    campos = ('posicion', 'edad', 'nacionalidad', 'fecha_nacimiento')
+    previos_por_clave = {(r['nombre'], r['equipo']): r for r in anteriores}
+    nuevos_por_clave = {(r['nombre'], r['equipo']): r for r in nuevos}
+
+    modificaciones = []
+    for clave, nuevo in nuevos_por_clave.items():
+        anterior = previos_por_clave.get(clave)
+        if anterior and any(_cambio(anterior, nuevo, c) for c in campos):
+            modificaciones.append((anterior, nuevo))
+
+    previos_sueltos = {}
+    for clave, r in previos_por_clave.items():
+        if clave not in nuevos_por_clave:
+            previos_sueltos.setdefault(r['nombre'], []).append(r)
+    nuevos_sueltos = {}
+    for clave, r in nuevos_por_clave.items():
+        if clave not in previos_por_clave:
+            nuevos_sueltos.setdefault(r['nombre'], []).append(r)
+
+    altas, bajas = [], []
+    for nombre, candidatos in nuevos_sueltos.items():
+        previos = previos_sueltos.pop(nombre, [])
+        if len(candidatos) == 1 and len(previos) == 1:
+            modificaciones.append((previos[0], candidatos[0])) # Cambio de equipo
+        else:
+            altas.extend(candidatos)
+            bajas.extend(previos)
+    for previos in previos_sueltos.values():
+        bajas.extend(previos)
+    return altas, modificaciones, bajas
+
+def reimportar_incremental(ruta_archivo, liga_nombre, pais_liga, perfil=None, semilla=None):
+    """
+    Reimporta un archivo de jugadores aplicando solo los cambios respecto a la importación anterior.
+    Guarda un hash por archivo (si no cambió, no se parsea) y uno por bloque de equipo; solo los
+    bloques con hash distinto se comparan línea a línea para obtener altas, modificaciones
+    (posición, edad, nacionalidad, equipo) y bajas.
+    Retorna el changeset {'altas': [...], 'modificaciones': [...], 'bajas': [...]} o None si falló.
+    """
     database.init_db()
+    changeset = {'altas': [], 'modificaciones': [], 'bajas': []}
 
-    print("\n--- Cargando Primera División Argentina (ejemplo con nuevo formato) ---")
-    cargar_datos_desde_txt_a_db('equipos primera div.txt', "Primera División", "Argentina")
+    hash_archivo = _hash_archivo(ruta_archivo)
+    if database.get_hash_importacion_archivo(ruta_archivo) == hash_archivo:
+        print(f"'{ruta_archivo}' no cambió desde la última importación. Nada que hacer.")
+        return changeset
 
-    print("\n--- Cargando Brasileirão Serie A ---")
-    cargar_datos_desde_txt_a_db('brasileirao_players.txt', "Brasileirão Serie A", "Brasil")
+    # Agrupar las líneas por equipo (manteniendo el orden del archivo)
+    lineas_por_equipo = {}
+    for registro in parsear_archivo_jugadores(ruta_archivo):
+        lineas_por_equipo.setdefault(registro['equipo'], []).append(_linea_normalizada(registro))
+    bloques_nuevos = {equipo: lineas for equipo, _, lineas in _bloques(lineas_por_equipo)}
 
-    print("\n--- Cargando LaLiga ---")
-    cargar_datos_desde_txt_a_db('laliga_players.txt', "LaLiga", "España")
+    conn = database.connect_db()
+    try:
+        liga_id, perfil = _obtener_o_crear_liga(liga_nombre, pais_liga, perfil, conn)
+        if not liga_id:
+            print(f"Error: No se pudo agregar ni encontrar la liga '{liga_nombre}'. Abortando reimportación.")
+            return None
+
+        bloques_previos = database.get_bloques_importacion_liga(liga_id, conn) or _bloques_desde_db(liga_id, conn)
+        equipos_cambiados = [
+            equipo for equipo in set(bloques_nuevos) | set(bloques_previos)
+            if bloques_previos.get(equipo, {}).get('hash') != _hash_texto(bloques_nuevos.get(equipo, ''))
+        ]
 
-    print("\n--- Cargando Premier League ---")
-    cargar_datos_desde_txt_a_db('premierleague_players.txt', "Premier League", "Inglaterra")
+        anteriores, nuevos = [], []
+        for equipo in equipos_cambiados:
+            if equipo in bloques_previos and bloques_previos[equipo]['lineas']:
+                anteriores.extend(_registro_desde_linea(l, equipo) for l in bloques_previos[equipo]['lineas'].split("\n"))
+            if bloques_nuevos.get(equipo):
+                nuevos.extend(_registro_desde_linea(l, equipo) for l in bloques_nuevos[equipo].split("\n"))
+        altas, modificaciones, bajas = _diff_jugadores(anteriores, nuevos)
 
-    print("\n--- Cargando Primera Nacional ---")
-    cargar_datos_desde_txt_a_db('bnacional_players.txt', "Primera Nacional", "Argentina") # Asumiendo Argentina
+        equipos_por_nombre = database.get_mapa_equipos_liga(liga_id, conn)
+        for equipo in bloques_nuevos:
+            if equipo not in equipos_por_nombre:
+                equipo_id = database.add_equipo_si_no_existe(equipo, liga_id, conn=conn)
+                if equipo_id:
+                    equipos_por_nombre[equipo] = equipo_id
+                else:
+                    print(f"Advertencia: No se pudo añadir o encontrar el equipo '{equipo}'. Se saltan sus jugadores.")
+
+        current_year = date.today().year
+        jugadores_existentes = database.get_claves_jugadores_liga(liga_id, conn)
 
+        filas_altas = []
+        for r in altas:
+            equipo_id = equipos_por_nombre.get(r['equipo'])
+            if not equipo_id or (r['nombre'], equipo_id) in jugadores_existentes:
+                continue
+            jugadores_existentes.add((r['nombre'], equipo_id))
+            filas_altas.append((r['nombre'], r['posicion'], None,
+                                _fecha_nacimiento(r, current_year), r['edad'], r['nacionalidad'], equipo_id))
+            changeset['altas'].append(r)
+        valoraciones = generar_valoraciones([fila[4] for fila in filas_altas], perfil, semilla)
+        filas_altas = [fila[:2] + (valoracion,) + fila[3:] for fila, valoracion in zip(filas_altas, valoraciones)]
+
+        filas_modificaciones = []
+        for anterior, nuevo in modificaciones:
+            equipo_anterior_id = equipos_por_nombre.get(anterior['equipo'])
+            equipo_nuevo_id = equipos_por_nombre.get(nuevo['equipo'])
+            if not equipo_anterior_id or not equipo_nuevo_id:
+                continue
+            filas_modificaciones.append((nuevo['posicion'], nuevo['edad'], nuevo['nacionalidad'],
+                                         nuevo['fecha_nacimiento'], equipo_nuevo_id, # None: queda la guardada
+                                         anterior['nombre'], equipo_anterior_id))
+            changeset['modificaciones'].append((anterior, nuevo))
+
+        claves_bajas = []
+        for r in bajas:
+            equipo_id = equipos_por_nombre.get(r['equipo'])
+            if equipo_id:
+                claves_bajas.append((r['nombre'], equipo_id))
+                changeset['bajas'].append(r)
+
+        database.delete_jugadores_bulk(claves_bajas, conn)
+        database.update_jugadores_bulk(filas_modificaciones, conn)
+        database.add_jugadores_bulk(filas_altas, conn)
+        _registrar_importacion(ruta_archivo, hash_archivo, liga_id, lineas_por_equipo, conn)
+        database.update_liga_num_equipos(liga_id, len([e for e in bloques_nuevos if e in equipos_por_nombre]), conn)
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Error en la reimportación incremental de '{ruta_archivo}': {e}")
+        conn.rollback()
+        return None
+    finally:
+        conn.close()
+
+    print(f"\nReimportación incremental de '{ruta_archivo}' ({liga_nombre}): {len(equipos_cambiados)} equipos con cambios.")
+    for r in changeset['altas']:
+        print(f"  + {r['nombre']} ({r['posicion']}, {r['edad']}) -> {r['equipo']}")
+    for anterior, nuevo in changeset['modificaciones']:
+        cambios = [f"{c}: {anterior.get(c)} -> {nuevo.get(c)}" for c in ('posicion', 'edad', 'nacionalidad', 'fecha_nacimiento', 'equipo')
+                   if _cambio(anterior, nuevo, c)]
+        print(f"  ~ {nuevo['nombre']} ({', '.join(cambios)})")
+    for r in changeset['bajas']:
+        print(f"  - {r['nombre']} ({r['equipo']})")
+    print(f"  Total: {len(changeset['altas'])} altas, {len(changeset['modificaciones'])} modificaciones, {len(changeset['bajas'])} bajas.")
+    return changeset
+
+# --- Importación de varias ligas a partir de un manifiesto ---
+# Cada entrada: archivo, liga, país, banda de valoración (piso, techo) y, opcionalmente, formato
+# ('csv', 'tsv' o 'jsonl'; si falta se deduce de la extensión), 'perfil' completo de valoración
+# (mismo formato que PERFIL_VALORACION_POR_DEFECTO, tiene prioridad sobre la banda) y 'semilla'.
+MANIFIESTO_LIGAS = [
+    {'archivo': 'equipos primera div.txt', 'liga': "Primera División", 'pais': "Argentina", 'banda': (40, 80)},
+    {'archivo': 'brasileirao_players.txt', 'liga': "Brasileirão Serie A", 'pais': "Brasil", 'banda': (62, 86)},
+    {'archivo': 'laliga_players.txt', 'liga': "LaLiga", 'pais': "España", 'banda': (79, 96)},
+    {'archivo': 'premierleague_players.txt', 'liga': "Premier League", 'pais': "Inglaterra", 'banda': (79, 96)},
+    {'archivo': 'bnacional_players.txt', 'liga': "Primera Nacional", 'pais': "Argentina", 'banda': (40, 71)},
+]
+
+def cargar_manifiesto(ruta_manifiesto):
+    """Lee un manifiesto en JSON (lista de objetos con las mismas claves que MANIFIESTO_LIGAS)."""
+    with open(ruta_manifiesto, 'r', encoding='utf-8') as f:
+        entradas = json.load(f)
+    for entrada in entradas:
+        if entrada.get('banda'):
+            entrada['banda'] = tuple(entrada['banda'])
+    return entradas
+
+def perfil_de_entrada(entrada):
+    if entrada.get('perfil'):
+        return entrada['perfil']
+    if entrada.get('banda'):
+        return perfil_desde_banda(entrada['banda'])
+    return None
+
+def _parsear_entrada_manifiesto(entrada):
+    """Trabajo de cada proceso del pool: parsea un archivo entero y devuelve la lista de registros."""
+    return list(parsear_archivo_jugadores(entrada['archivo'], entrada.get('formato')))
+
+def importar_manifiesto(manifiesto=None, max_procesos=None):
+    """
+    Importa todas las ligas del manifiesto. El parseo de los archivos se reparte en un pool
+    de procesos; la escritura en SQLite la hace solo este proceso (un único escritor),
+    liga por liga en el orden del manifiesto, así los ids de ligas y equipos no dependen de
+    qué parseo termine primero.
+    Retorna {liga: (equipos_cargados, jugadores_añadidos)}.
+    """
+    manifiesto = manifiesto or MANIFIESTO_LIGAS
+    database.init_db()
+    resumen = {}
+
+    with ProcessPoolExecutor(max_workers=max_procesos) as pool:
+        futuros = [(pool.submit(_parsear_entrada_manifiesto, entrada), entrada) for entrada in manifiesto]
+        for futuro, entrada in futuros:
+            try:
+                registros = futuro.result()
+            except OSError as e:
+                print(f"Error al leer '{entrada['archivo']}': {e}. Se salta la liga '{entrada['liga']}'.")
+                continue
+            print(f"\n--- Cargando {entrada['liga']} ({len(registros)} jugadores en '{entrada['archivo']}') ---")
+            resultado = cargar_registros_en_db(registros, entrada['liga'], entrada['pais'],
+                                               perfil_de_entrada(entrada), entrada.get('semilla'),
+                                               ruta_archivo=entrada['archivo'])
+            if resultado is not None:
+                resumen[entrada['liga']] = resultado
+                print(f"  - {resultado[0]} equipos cargados/actualizados.")
+                print(f"  - {resultado[1]} jugadores añadidos.")
+    return resumen
+
+# --- Ejecución principal ---
+# Uso: python local_data.py [--incremental] [--manifiesto ruta.json]
+if __name__ == '__main__':
+    database.init_db()
+
+    manifiesto = MANIFIESTO_LIGAS
+    if '--manifiesto' in sys.argv:
+        manifiesto = cargar_manifiesto(sys.argv[sys.argv.index('--manifiesto') + 1])
+
+    if '--incremental' in sys.argv:
+        # La reimportación incremental solo aplica los cambios desde la última importación
+        for entrada in manifiesto:
+            print(f"\n--- Reimportando {entrada['liga']} ---")
+            reimportar_incremental(entrada['archivo'], entrada['liga'], entrada['pais'],
+                                   perfil_de_entrada(entrada), entrada.get('semilla'))
+    else:
+        importar_manifiesto(manifiesto)
 
     # --- Verificación de la carga (opcional) ---
     print("\n--- Verificando datos cargados en la DB ---")
-    
-    # Verifica la Primera División
-    primera_id = database.get_liga_id("Primera División")
-    if primera_id:
-        print(f"\nLiga 'Primera División' (ID: {primera_id}, Equipos: {database.get_liga_by_id(primera_id)['num_equipos']})")
-        # Puedes añadir una verificación de algunos equipos/jugadores si quieres
-
-    # Verifica el Brasileirão
-    brasileirao_id = database.get_liga_id("Brasileirão Serie A")
-    if brasileirao_id:
-        print(f"\nLiga 'Brasileirão Serie A' (ID: {brasileirao_id}, Equipos: {database.get_liga_by_id(brasileirao_id)['num_equipos']})")
-        # Puedes añadir una verificación de algunos equipos/jugadores si quieres
-
-    laliga_id = database.get_liga_id("LaLiga")
-    if laliga_id:
-        print(f"\nLiga 'LaLiga' (ID: {laliga_id}, Equipos: {database.get_liga_by_id(laliga_id)['num_equipos']})")
-        # Puedes añadir una verificación de algunos equipos/jugadores si quieres
-
-    premierleague_id = database.get_liga_id("Premier League")
-    if premierleague_id:
-        print(f"\nLiga 'Premier League' (ID: {premierleague_id}, Equipos: {database.get_liga_by_id(premierleague_id)['num_equipos']})")
-        # Puedes añadir una verificación de algunos equipos/jugadores si quieres
-
-    bnacional_id = database.get_liga_id("Primera Nacional")
-    if bnacional_id:
-        print(f"\nLiga 'Primera División' (ID: {bnacional_id}, Equipos: {database.get_liga_by_id(bnacional_id)['num_equipos']})")
-        # Puedes añadir una verificación de algunos equipos/jugadores si quieres
-
-    print("\nVerificación de datos completada.")
\ No newline at end of file
+    for entrada in manifiesto:
+        liga = database.get_liga_by_name(entrada['liga'])
+        if liga:
+            print(f"Liga '{liga['nombre']}' (ID: {liga['id']}, Equipos: {liga['num_equipos']})")
+
+    print("\nVerificación de datos completada.")
@@ -4,11 +4,17 @@ import os
 import discord
 from dotenv import load_dotenv
 import database
+import database_async
 import game_logic # ¡Importa nuestro nuevo módulo de lógica del juego!
 import market_logic
 import datetime # Para manejar fechas
 import commands
-import re
+import cache_entidades
+import cache_render
+import estado_conversacion
+import proyecciones
+import salida_discord
+from enrutador import EnrutadorComandos
 
 # Carga las variables de entorno del archivo .env
 load_dotenv()
@@ -22,7 +28,9 @@ intents.members = True
 
 bot = discord.Client(intents=intents)
 
-setup_state = {} # Para manejar el estado de setup
+setup_state = estado_conversacion.EstadoConversacion() # Paso de conversación de cada usuario (persistente, con vencimiento)
+salida = salida_discord.SalidaDiscord() # Cola de salida: empaqueta y pagina las respuestas largas
+enrutador = EnrutadorComandos() # Comando ('!tabla') -> handler, con métricas por comando
 
 @bot.event
 async def on_ready():
@@ -31,943 +39,1059 @@ async def on_ready():
     print('-----------------------------------------')
     database.init_db()
     print("Base de datos verificada/inicializada.")
+    setup_state.iniciar_barrido() # Borra periódicamente los pasos de conversación vencidos
     print('-----------------------------------------')
 
 
-@bot.event
-async def on_message(message):
-    if message.author == bot.user:
+# --- Manejo del estado para confirmaciones (fichar, simular partido IA) ---
+# Son pasos prioritarios: se atienden ANTES que cualquier comando para que los "si/no" sean procesados.
+# Lógica de confirmación de simulación de partido IA
+@enrutador.paso('confirm_simular_partido_ia', prioritario=True)
+async def paso_confirm_simular_partido_ia(message, estado):
+    user_id = message.author.id
+    if message.content.lower() == 'si':
+        partido_details_to_sim = estado
+        
+        # Simulación, resultado, tabla y goleadores en el hilo de escritura, como los partidos de la IA
+        jugados, errores = await database_async.escribir(
+            game_logic.jugar_partidos_liga,
+            partido_details_to_sim['liga_id'],
+            partido_details_to_sim['temporada'],
+            [{'id': partido_details_to_sim['partido_id'],
+              'equipo_local_id': partido_details_to_sim['equipo_local_id'],
+              'equipo_visitante_id': partido_details_to_sim['equipo_visitante_id'],
+              'zona': partido_details_to_sim.get('zona')}]
+        )
+
+        if not jugados:
+            error_sim = errores[0][1] if errores else "No se pudo guardar el resultado."
+            await message.channel.send(f"Error al simular el partido: {error_sim}")
+            del setup_state[user_id]
+            return
+        resultado_sim = jugados[0][1]
+        
+        equipo_local_sim_nombre = (await database_async.get_equipo_by_id(partido_details_to_sim['equipo_local_id']))['nombre']
+        equipo_visitante_sim_nombre = (await database_async.get_equipo_by_id(partido_details_to_sim['equipo_visitante_id']))['nombre']
+        await message.channel.send(
+            f"¡Partido simulado por IA! Resultado: **{equipo_local_sim_nombre} {resultado_sim['goles_e1']} - {resultado_sim['goles_e2']} {equipo_visitante_sim_nombre}**."
+        )
+        
+        # DESPUÉS de simular el partido del usuario, AVANZA EL DÍA
+        # Esto evita la doble llamada a avanzar_dia
+        mensajes_avance = await database_async.escribir(game_logic.avanzar_dia, user_id) # Llamada a avanzar_dia SÓLO AQUÍ para el usuario
+        await salida.enviar(message.channel, mensajes_avance)
+        
+        del setup_state[user_id] # Limpia el estado después de procesar y avanzar
+        return
+    elif message.content.lower() == 'no':
+        await message.channel.send("Simulación cancelada. Ingresa el resultado de tu partido con `!resultado TusGoles-GolesRival` antes de avanzar.")
+        del setup_state[user_id] # Limpia el estado si el usuario no quiere simular
+        return
+    else:
+        await message.channel.send("Respuesta no válida. Por favor, responde `si` para simular por IA y avanzar, o `no` para cancelar.")
         return
 
+
+# Lógica de confirmación de fichaje
+@enrutador.paso('confirm_fichar', prioritario=True)
+async def paso_confirm_fichar(message, estado):
     user_id = message.author.id
+    if message.content.lower() == 'si':
+        offer_details = estado
+        
+        success, msg = await database_async.escribir(
+            market_logic.intentar_fichar_jugador_ia,
+            user_id,
+            offer_details['jugador_id'],
+            offer_details['monto_oferta']
+        )
+        await message.channel.send(msg)
+        del setup_state[user_id]
+        return # <-- Este return es CRÍTICO
+    elif message.content.lower() == 'no':
+        await message.channel.send("Oferta cancelada.")
+        del setup_state[user_id]
+        return # <-- Este return es CRÍTICO
+    else:
+        await message.channel.send("Respuesta no válida. Por favor, responde `si` para confirmar o `no` para cancelar la oferta.")
+        return # <-- Este return es CRÍTICO
+
+
+# --- Comandos generales ---
+@enrutador.comando('!hola')
+async def cmd_hola(message, args):
     username = message.author.name
+    await message.channel.send(f'¡Hola, {username}! Soy tu bot de modo carrera de Dream Patch.')
+    return # Añade return aquí también para evitar procesar como comando o estado.
+
+
+@enrutador.comando('!ping')
+async def cmd_ping(message, args):
+    await message.channel.send('Pong!')
+    return # Añade return
+
+
+# --- Comando !plantilla ---
+@enrutador.comando('!plantilla')
+async def cmd_plantilla(message, args):
+    user_id = message.author.id
+    liga_arg = args[0] if len(args) >= 1 else None
+    equipo_arg = args[1] if len(args) >= 2 else None
+    clave = (liga_arg, equipo_arg)
+    response_message = cache_render.obtener('plantilla', clave)
+    if response_message is None:
+        sello = cache_render.sello() # Antes de leer: si los datos cambian mientras tanto, no se guarda
+        response_message = await database_async.leer(commands.ver_plantilla_comando, liga_nombre=liga_arg, equipo_nombre=equipo_arg)
+        dependencias = [('equipos', None)]
+        if liga_arg and equipo_arg:
+            liga_id = await database_async.get_liga_id(liga_arg)
+            equipo_id = await database_async.get_equipo_id(equipo_arg, liga_id) if liga_id else None
+            if equipo_id:
+                dependencias.append(('plantilla', equipo_id))
+        cache_render.guardar('plantilla', clave, response_message, dependencias, sello)
+    await salida.enviar_paginado(message.channel, response_message, autor_id=user_id)
+    return # Añade return
+
+
+# --- Lógica de iniciar carrera ---
+@enrutador.comando('!iniciar_carrera')
+async def cmd_iniciar_carrera(message, args):
+    user_id = message.author.id
+    carrera_existente = await database_async.get_carrera_by_user(user_id)
+    if carrera_existente:
+        equipo_detalles = await database_async.get_equipo_by_id(carrera_existente['equipo_id'])
+        await message.channel.send(f"Ya tienes una carrera iniciada con el equipo **{equipo_detalles['nombre']}** en la **{equipo_detalles['liga_nombre']}**. Día actual: {carrera_existente['dia_actual']}.")
+        return
 
-    # --- Manejo del estado para confirmaciones (fichar, simular partido IA) ---
-    # Esto debe ir ANTES de la lógica de !iniciar_carrera para que los "si/no" sean procesados.
+    setup_state[user_id] = {'step': 'select_liga'}
+    ligas_disponibles = await database_async.get_all_ligas_info()
     
-    # Lógica de confirmación de simulación de partido IA
-    if user_id in setup_state and setup_state[user_id]['step'] == 'confirm_simular_partido_ia':
-        if message.content.lower() == 'si':
-            partido_details_to_sim = setup_state[user_id]
-            
-            resultado_sim, error_sim = game_logic.simular_partido(
-                partido_details_to_sim['equipo_local_id'],
-                partido_details_to_sim['equipo_visitante_id']
-            )
+    if not ligas_disponibles:
+        await message.channel.send("No hay ligas disponibles en la base de datos. Por favor, contacta al administrador para que las agregue.")
+        del setup_state[user_id]
+        return
 
-            if error_sim:
-                await message.channel.send(f"Error al simular el partido: {error_sim}")
-                del setup_state[user_id]
-                return
+    ligas_str = "\n".join([f"- {liga['nombre']}" for liga in ligas_disponibles])
+    await message.channel.send(f"¡Vamos a iniciar tu modo carrera! Primero, ¿en qué liga quieres jugar?\nDisponibles:\n{ligas_str}\n\nEscribe el nombre exacto de la liga (ej: `Primera División`).")
+    return
 
-            database.update_partido_resultado(
-                partido_details_to_sim['partido_id'],
-                resultado_sim['goles_e1'],
-                resultado_sim['goles_e2']
-            )
-            game_logic.update_clasificacion(
-                partido_details_to_sim['liga_id'],
-                partido_details_to_sim['temporada'],
-                resultado_sim,
-                zona_nombre=partido_details_to_sim.get('zona')
-            )
-            
-            equipo_local_sim_nombre = database.get_equipo_by_id(partido_details_to_sim['equipo_local_id'])['nombre']
-            equipo_visitante_sim_nombre = database.get_equipo_by_id(partido_details_to_sim['equipo_visitante_id'])['nombre']
-            await message.channel.send(
-                f"¡Partido simulado por IA! Resultado: **{equipo_local_sim_nombre} {resultado_sim['goles_e1']} - {resultado_sim['goles_e2']} {equipo_visitante_sim_nombre}**."
-            )
-            
-            # DESPUÉS de simular el partido del usuario, AVANZA EL DÍA
-            # Esto evita la doble llamada a avanzar_dia
-            mensajes_avance = game_logic.avanzar_dia(user_id) # Llamada a avanzar_dia SÓLO AQUÍ para el usuario
-            for msg in mensajes_avance:
-                if len(msg) > 1900:
-                    chunks = [msg[i:i+1900] for i in range(0, len(msg), 1900)]
-                    for chunk in chunks:
-                        await message.channel.send(chunk)
-                else:
-                    await message.channel.send(msg)
-            
-            del setup_state[user_id] # Limpia el estado después de procesar y avanzar
-            return
-        elif message.content.lower() == 'no':
-            await message.channel.send("Simulación cancelada. Ingresa el resultado de tu partido con `!resultado TusGoles-GolesRival` antes de avanzar.")
-            del setup_state[user_id] # Limpia el estado si el usuario no quiere simular
-            return
-        else:
-            await message.channel.send("Respuesta no válida. Por favor, responde `si` para simular por IA y avanzar, o `no` para cancelar.")
-            return
-            
 
-            # Lógica de confirmación de fichaje
-    if user_id in setup_state and setup_state[user_id]['step'] == 'confirm_fichar':
-        if message.content.lower() == 'si':
-            offer_details = setup_state[user_id]
-            
-            success, msg = market_logic.intentar_fichar_jugador_ia(
-                user_id,
-                offer_details['jugador_id'],
-                offer_details['monto_oferta']
-            )
-            await message.channel.send(msg)
-            del setup_state[user_id]
-            return # <-- Este return es CRÍTICO
-        elif message.content.lower() == 'no':
-            await message.channel.send("Oferta cancelada.")
-            del setup_state[user_id]
-            return # <-- Este return es CRÍTICO
+# Este bloque maneja la SELECCIÓN DE LIGA
+@enrutador.paso('select_liga')
+async def paso_select_liga(message, estado):
+    user_id = message.author.id
+    liga_elegida_nombre = message.content.strip()
+    liga_id = await database_async.get_liga_id(liga_elegida_nombre)
+
+    if liga_id:
+        equipos_liga = await database_async.get_equipos_by_liga(liga_id)
+        if equipos_liga:
+            setup_state[user_id] = {**estado, 'liga_id': liga_id, 'step': 'select_equipo'}
+            equipos_str = "\n".join([f"- {equipo['nombre']}" for equipo in equipos_liga])
+            await message.channel.send(f"¡Excelente! Has elegido **{liga_elegida_nombre}**. Ahora, ¿qué equipo quieres manejar?\nEquipos disponibles en esta liga:\n{equipos_str}\n\nEscribe el nombre exacto del equipo (ej: `River Plate`).")
         else:
-            await message.channel.send("Respuesta no válida. Por favor, responde `si` para confirmar o `no` para cancelar la oferta.")
-            return # <-- Este return es CRÍTICO
-        
-        
-    # --- Comandos generales ---
-    if message.content == '!hola':
-        await message.channel.send(f'¡Hola, {username}! Soy tu bot de modo carrera de Dream Patch.')
-        return # Añade return aquí también para evitar procesar como comando o estado.
+            await message.channel.send(f"No se encontraron equipos para la liga '{liga_elegida_nombre}'. Por favor, elige otra liga o contacta al administrador.")
+            del setup_state[user_id]
+    else:
+        await message.channel.send(f"La liga '{liga_elegida_nombre}' no se encontró. Por favor, escribe el nombre exacto de una de las ligas disponibles.")
+    return
+
+
+# Este bloque maneja la SELECCIÓN DE EQUIPO
+@enrutador.paso('select_equipo')
+async def paso_select_equipo(message, estado):
+    user_id = message.author.id
+    equipo_elegido_nombre = message.content.strip()
+    liga_id = estado['liga_id']
     
-    if message.content == '!ping':
-        await message.channel.send('Pong!')
-        return # Añade return
+    equipo_id = await database_async.get_equipo_id(equipo_elegido_nombre, liga_id) 
     
-    # --- Comando !plantilla ---
-    if message.content.startswith('!plantilla'):
-        args = message.content.split(maxsplit=1)
-        liga_arg = None
-        equipo_arg = None
-        if len(args) > 1:
-            full_args_str = args[1].strip()
-            matches = re.findall(r'"([^"]*)"|\'([^\']*)\'|(\S+)', full_args_str)
-            parsed_args = []
-            for m in matches:
-                if m[0]: parsed_args.append(m[0])
-                elif m[1]: parsed_args.append(m[1])
-                elif m[2]: parsed_args.append(m[2])
-            if len(parsed_args) >= 1:
-                liga_arg = parsed_args[0]
-            if len(parsed_args) >= 2:
-                equipo_arg = parsed_args[1]
-        response_message = commands.ver_plantilla_comando(liga_nombre=liga_arg, equipo_nombre=equipo_arg)
-        await message.channel.send(response_message)
-        return # Añade return
-
-    # --- Lógica de iniciar carrera ---
-    if message.content.startswith('!iniciar_carrera'):
-        carrera_existente = database.get_carrera_by_user(user_id)
-        if carrera_existente:
-            equipo_detalles = database.get_equipo_by_id(carrera_existente['equipo_id'])
-            await message.channel.send(f"Ya tienes una carrera iniciada con el equipo **{equipo_detalles['nombre']}** en la **{equipo_detalles['liga_nombre']}**. Día actual: {carrera_existente['dia_actual']}.")
-            return
+    equipos_en_liga_ids = [e['id'] for e in await database_async.get_equipos_by_liga(liga_id)]
 
-        setup_state[user_id] = {'step': 'select_liga'}
-        ligas_disponibles = database.get_all_ligas_info()
+    if equipo_id and equipo_id in equipos_en_liga_ids:
+        # La carrera nace en un mundo propio clonado de la plantilla (mismos ids de ligas y equipos)
+        # Es una copia completa de la base (backup de SQLite): corre en el hilo de escritura
+        if not await database_async.escribir(database.crear_mundo, user_id):
+            await message.channel.send("No se pudo crear el mundo de tu carrera. Por favor, contacta al administrador.")
+            del setup_state[user_id]
+            return
+        await database_async.usar_mundo(user_id)
+        await database_async.escribir(database.add_carrera, user_id, equipo_id, liga_id)
         
-        if not ligas_disponibles:
-            await message.channel.send("No hay ligas disponibles en la base de datos. Por favor, contacta al administrador para que las agregue.")
+        # --- ¡Generar fixture SÓLO para la liga del usuario al iniciar la carrera! ---
+        # La generación de fixtures para otras ligas se hará al inicio de cada nueva temporada en game_logic.py
+        await message.channel.send("Generando el fixture de tu liga, esto puede tomar un momento...")
+        
+        carrera_creada = await database_async.get_carrera_by_user(user_id)
+        if not carrera_creada:
+            await message.channel.send("Error al obtener la carrera recién creada. Contacta al administrador.")
             del setup_state[user_id]
             return
 
-        ligas_str = "\n".join([f"- {liga['nombre']}" for liga in ligas_disponibles])
-        await message.channel.send(f"¡Vamos a iniciar tu modo carrera! Primero, ¿en qué liga quieres jugar?\nDisponibles:\n{ligas_str}\n\nEscribe el nombre exacto de la liga (ej: `Primera División`).")
-        return
-
-    # Este bloque maneja la SELECCIÓN DE LIGA
-    if user_id in setup_state and setup_state[user_id]['step'] == 'select_liga':
-        liga_elegida_nombre = message.content.strip()
-        liga_id = database.get_liga_id(liga_elegida_nombre)
+        temporada_inicial = carrera_creada['temporada']
 
-        if liga_id:
-            equipos_liga = database.get_equipos_by_liga(liga_id)
-            if equipos_liga:
-                setup_state[user_id]['liga_id'] = liga_id
-                setup_state[user_id]['step'] = 'select_equipo'
-                equipos_str = "\n".join([f"- {equipo['nombre']}" for equipo in equipos_liga])
-                await message.channel.send(f"¡Excelente! Has elegido **{liga_elegida_nombre}**. Ahora, ¿qué equipo quieres manejar?\nEquipos disponibles en esta liga:\n{equipos_str}\n\nEscribe el nombre exacto del equipo (ej: `River Plate`).")
-            else:
-                await message.channel.send(f"No se encontraron equipos para la liga '{liga_elegida_nombre}'. Por favor, elige otra liga o contacta al administrador.")
-                del setup_state[user_id]
+        # Solo generar fixture para la liga del usuario
+        if await database_async.escribir(game_logic.generate_fixture, liga_id, temporada_inicial): #
+            equipo_details = await database_async.get_equipo_by_id(equipo_id) #
+            await message.channel.send(f"¡Felicitaciones! Has elegido a **{equipo_elegido_nombre}** para tu modo carrera en la **{equipo_details['liga_nombre']}**.\n\nEl fixture de tu liga ha sido generado. Ahora puedes usar `!mi_equipo` para ver tu plantilla, `!avanzar_dia` para empezar a jugar, y `!proximo_partido` para ver tu siguiente encuentro.")
         else:
-            await message.channel.send(f"La liga '{liga_elegida_nombre}' no se encontró. Por favor, escribe el nombre exacto de una de las ligas disponibles.")
+            await message.channel.send("Hubo un error al generar el fixture de tu liga. Por favor, contacta al administrador.")
+        
+        del setup_state[user_id]
+    else:
+        await message.channel.send(f"El equipo '{equipo_elegido_nombre}' no se encontró o no pertenece a la liga seleccionada. Por favor, escribe el nombre exacto de uno de los equipos disponibles.")
+    return
+
+
+# --- Comando: !mi_equipo ---
+@enrutador.comando('!mi_equipo')
+async def cmd_mi_equipo(message, args):
+    user_id = message.author.id
+    print(f"DEBUG: !mi_equipo recibido de {user_id}") # <--- Añade esta línea
+    carrera = await database_async.get_carrera_by_user(user_id) #
+    if not carrera: #
+        await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
+        return #
+
+    equipo_id = carrera['equipo_id'] #
+    response = cache_render.obtener('mi_equipo', equipo_id)
+    if response is not None:
+        await salida.enviar_paginado(message.channel, response, autor_id=user_id)
         return
 
-    # Este bloque maneja la SELECCIÓN DE EQUIPO
-    if user_id in setup_state and setup_state[user_id]['step'] == 'select_equipo':
-        equipo_elegido_nombre = message.content.strip()
-        liga_id = setup_state[user_id]['liga_id']
+    sello = cache_render.sello()
+    equipo_details = await database_async.get_equipo_by_id(equipo_id) #
+    jugadores = await database_async.get_jugadores_por_equipo(equipo_id) #
+
+    if not equipo_details: #
+        await message.channel.send("Hubo un error al obtener los detalles de tu equipo. Por favor, contacta al administrador.")
+        return #
+
+    response = f"**Tu Equipo: {equipo_details['nombre']}** (Liga: {equipo_details['liga_nombre']})\n\n**Plantilla:**\n" #
+    if jugadores: #
+        # Organizar por posición (copiado de commands.py para consistencia)
+        jugadores_por_posicion = {} #
+        for jugador in jugadores: #
+            posicion = jugador['posicion'].strip() # Limpiar posición
+            if posicion not in jugadores_por_posicion: #
+                jugadores_por_posicion[posicion] = [] #
+            jugadores_por_posicion[posicion].append(jugador) #
         
-        equipo_id = database.get_equipo_id(equipo_elegido_nombre, liga_id) 
+        posiciones_ordenadas = [ #
+            'Portero', #
+            'Defensa central', #
+            'Lateral izquierdo', 'Lateral derecho', #
+            'Pivote', 'Mediocentro', 'Interior derecho', 'Interior izquierdo', #
+            'Mediocentro ofensivo', #
+            'Extremo izquierdo', 'Extremo derecho', #
+            'Delantero centro', 'Delantero' #
+        ]
+        impresos = set() #
+        for pos_key in posiciones_ordenadas: #
+            if pos_key in jugadores_por_posicion and pos_key not in impresos: #
+                response += f"\n**{pos_key}:**\n" #
+                for jugador in jugadores_por_posicion[pos_key]: #
+                    response += f"- {jugador['nombre']} (OVR: {jugador['valoracion']})\n" #
+                impresos.add(pos_key) #
         
-        equipos_en_liga_ids = [e['id'] for e in database.get_equipos_by_liga(liga_id)]
+        for pos, j_list in jugadores_por_posicion.items(): #
+            if pos not in impresos: #
+                response += f"\n**{pos} (Otros):**\n" #
+                for jugador in j_list: #
+                    response += f"- {jugador['nombre']} (OVR: {jugador['valoracion']})\n" #
+
+    else: #
+        response += "Aún no tienes jugadores en tu plantilla." #
+    
+    cache_render.guardar('mi_equipo', equipo_id, response, [('plantilla', equipo_id)], sello)
+    await salida.enviar_paginado(message.channel, response, autor_id=user_id)
+    return # <--- Asegúrate de que este return esté presente
 
-        if equipo_id and equipo_id in equipos_en_liga_ids:
-            database.add_carrera(user_id, equipo_id, liga_id)
-            
-            # --- ¡Generar fixture SÓLO para la liga del usuario al iniciar la carrera! ---
-            # La generación de fixtures para otras ligas se hará al inicio de cada nueva temporada en game_logic.py
-            await message.channel.send("Generando el fixture de tu liga, esto puede tomar un momento...")
-            
-            carrera_creada = database.get_carrera_by_user(user_id)
-            if not carrera_creada:
-                await message.channel.send("Error al obtener la carrera recién creada. Contacta al administrador.")
-                del setup_state[user_id]
-                return
-
-            temporada_inicial = carrera_creada['temporada']
-
-            # Solo generar fixture para la liga del usuario
-            if game_logic.generate_fixture(liga_id, temporada_inicial): #
-                equipo_details = database.get_equipo_by_id(equipo_id) #
-                await message.channel.send(f"¡Felicitaciones! Has elegido a **{equipo_elegido_nombre}** para tu modo carrera en la **{equipo_details['liga_nombre']}**.\n\nEl fixture de tu liga ha sido generado. Ahora puedes usar `!mi_equipo` para ver tu plantilla, `!avanzar_dia` para empezar a jugar, y `!proximo_partido` para ver tu siguiente encuentro.")
-            else:
-                await message.channel.send("Hubo un error al generar el fixture de tu liga. Por favor, contacta al administrador.")
-            
-            del setup_state[user_id]
-        else:
-            await message.channel.send(f"El equipo '{equipo_elegido_nombre}' no se encontró o no pertenece a la liga seleccionada. Por favor, escribe el nombre exacto de uno de los equipos disponibles.")
+
+# --- Lógica MEJORADA: !avanzar_dia (con aviso y confirmación para el partido del usuario) ---
+@enrutador.comando('!avanzar_dia')
+async def cmd_avanzar_dia(message, args):
+    user_id = message.author.id
+    username = message.author.name
+    carrera = await database_async.get_carrera_by_user(user_id)
+    if not carrera:
+        await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
         return
+
+    tu_equipo_id = carrera['equipo_id']
     
+    fecha_base_simulacion_global = datetime.date(2025, 3, 1)
+    dia_actual_carrera = carrera['dia_actual']
+    temporada_actual_carrera = carrera['temporada']
+    dias_totales_simulados_actual = (dia_actual_carrera - 1) + (temporada_actual_carrera - 1) * 365
+    fecha_actual_simulada_calendario = fecha_base_simulacion_global + datetime.timedelta(days=dias_totales_simulados_actual)
+    fecha_str_actual_calendario = fecha_actual_simulada_calendario.strftime('%Y-%m-%d')
 
-    # --- Comando: !mi_equipo ---
-    if message.content == '!mi_equipo':
-        print(f"DEBUG: !mi_equipo recibido de {user_id}") # <--- Añade esta línea
-        carrera = database.get_carrera_by_user(user_id) #
-        if not carrera: #
-            await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
-            return #
-
-        equipo_id = carrera['equipo_id'] #
-        equipo_details = database.get_equipo_by_id(equipo_id) #
-        jugadores = database.get_jugadores_por_equipo(equipo_id) #
-
-        if not equipo_details: #
-            await message.channel.send("Hubo un error al obtener los detalles de tu equipo. Por favor, contacta al administrador.")
-            return #
-
-        response = f"**Tu Equipo: {equipo_details['nombre']}** (Liga: {equipo_details['liga_nombre']})\n\n**Plantilla:**\n" #
-        if jugadores: #
-            # Organizar por posición (copiado de commands.py para consistencia)
-            jugadores_por_posicion = {} #
-            for jugador in jugadores: #
-                posicion = jugador['posicion'].strip() # Limpiar posición
-                if posicion not in jugadores_por_posicion: #
-                    jugadores_por_posicion[posicion] = [] #
-                jugadores_por_posicion[posicion].append(jugador) #
-            
-            posiciones_ordenadas = [ #
-                'Portero', #
-                'Defensa central', #
-                'Lateral izquierdo', 'Lateral derecho', #
-                'Pivote', 'Mediocentro', 'Interior derecho', 'Interior izquierdo', #
-                'Mediocentro ofensivo', #
-                'Extremo izquierdo', 'Extremo derecho', #
-                'Delantero centro', 'Delantero' #
-            ]
-            impresos = set() #
-            for pos_key in posiciones_ordenadas: #
-                if pos_key in jugadores_por_posicion and pos_key not in impresos: #
-                    response += f"\n**{pos_key}:**\n" #
-                    for jugador in jugadores_por_posicion[pos_key]: #
-                        response += f"- {jugador['nombre']} (OVR: {jugador['valoracion']})\n" #
-                    impresos.add(pos_key) #
-            
-            for pos, j_list in jugadores_por_posicion.items(): #
-                if pos not in impresos: #
-                    response += f"\n**{pos} (Otros):**\n" #
-                    for jugador in j_list: #
-                        response += f"- {jugador['nombre']} (OVR: {jugador['valoracion']})\n" #
-
-        else: #
-            response += "Aún no tienes jugadores en tu plantilla." #
-        
-        await message.channel.send(response) #
-        return # <--- Asegúrate de que este return esté presente
+    partido_pendiente_hoy = await database_async.get_partido_pendiente(user_id, tu_equipo_id, fecha_str_actual_calendario)
 
+    if partido_pendiente_hoy:
+        equipo_local_nombre_partido = (await database_async.get_equipo_by_id(partido_pendiente_hoy['equipo_local_id']))['nombre']
+        equipo_visitante_nombre_partido = (await database_async.get_equipo_by_id(partido_pendiente_hoy['equipo_visitante_id']))['nombre']
 
+        setup_state[user_id] = {
+            'step': 'confirm_simular_partido_ia', # Establece el estado de confirmación
+            'partido_id': partido_pendiente_hoy['id'],
+            'equipo_local_id': partido_pendiente_hoy['equipo_local_id'],
+            'equipo_visitante_id': partido_pendiente_hoy['equipo_visitante_id'],
+            'liga_id': carrera['liga_id'],
+            'temporada': carrera['temporada'],
+            'zona': partido_pendiente_hoy.get('zona')
+        }
+        await message.channel.send(
+            f"🚨 **¡ATENCIÓN {username.upper()}! ¡HOY JUEGA TU EQUIPO!** 🚨\n"
+            f"Tu partido de hoy es: **{equipo_local_nombre_partido} vs {equipo_visitante_nombre_partido}**.\n"
+            f"Si no ingresas el resultado con `!resultado TusGoles-GolesRival`, lo simulará la IA.\n\n"
+            f"¿Quieres que simulemos este partido por IA y avancemos? Responde `si` o `no`."
+        )
+        return # Detiene el procesamiento aquí, esperando la respuesta 'si' o 'no'
+    
+    # Si no hay partido pendiente del usuario, avanza el día normalmente
+    # Esta parte se ejecuta SÓLO si `partido_pendiente_hoy` es None.
+    mensajes_avance = await database_async.escribir(game_logic.avanzar_dia, user_id)
+    await salida.enviar(message.channel, mensajes_avance)
+    return
 
-    # --- Lógica MEJORADA: !avanzar_dia (con aviso y confirmación para el partido del usuario) ---
-    if message.content == '!avanzar_dia':
-        carrera = database.get_carrera_by_user(user_id)
-        if not carrera:
-            await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
-            return
 
-        tu_equipo_id = carrera['equipo_id']
-        
-        fecha_base_simulacion_global = datetime.date(2025, 3, 1)
-        dia_actual_carrera = carrera['dia_actual']
-        temporada_actual_carrera = carrera['temporada']
-        dias_totales_simulados_actual = (dia_actual_carrera - 1) + (temporada_actual_carrera - 1) * 365
-        fecha_actual_simulada_calendario = fecha_base_simulacion_global + datetime.timedelta(days=dias_totales_simulados_actual)
-        fecha_str_actual_calendario = fecha_actual_simulada_calendario.strftime('%Y-%m-%d')
-
-        partido_pendiente_hoy = database.get_partido_pendiente(user_id, tu_equipo_id, fecha_str_actual_calendario)
-
-        if partido_pendiente_hoy:
-            equipo_local_nombre_partido = database.get_equipo_by_id(partido_pendiente_hoy['equipo_local_id'])['nombre']
-            equipo_visitante_nombre_partido = database.get_equipo_by_id(partido_pendiente_hoy['equipo_visitante_id'])['nombre']
-
-            setup_state[user_id] = {
-                'step': 'confirm_simular_partido_ia', # Establece el estado de confirmación
-                'partido_id': partido_pendiente_hoy['id'],
-                'equipo_local_id': partido_pendiente_hoy['equipo_local_id'],
-                'equipo_visitante_id': partido_pendiente_hoy['equipo_visitante_id'],
-                'liga_id': carrera['liga_id'],
-                'temporada': carrera['temporada'],
-                'zona': partido_pendiente_hoy.get('zona')
-            }
-            await message.channel.send(
-                f"🚨 **¡ATENCIÓN {username.upper()}! ¡HOY JUEGA TU EQUIPO!** 🚨\n"
-                f"Tu partido de hoy es: **{equipo_local_nombre_partido} vs {equipo_visitante_nombre_partido}**.\n"
-                f"Si no ingresas el resultado con `!resultado TusGoles-GolesRival`, lo simulará la IA.\n\n"
-                f"¿Quieres que simulemos este partido por IA y avancemos? Responde `si` o `no`."
-            )
-            return # Detiene el procesamiento aquí, esperando la respuesta 'si' o 'no'
-        
-        # Si no hay partido pendiente del usuario, avanza el día normalmente
-        # Esta parte se ejecuta SÓLO si `partido_pendiente_hoy` es None.
-        mensajes_avance = game_logic.avanzar_dia(user_id)
-        for msg in mensajes_avance:
-            if len(msg) > 1900:
-                chunks = [msg[i:i+1900] for i in range(0, len(msg), 1900)]
-                for chunk in chunks:
-                    await message.channel.send(chunk)
-            else:
-                await message.channel.send(msg)
+# --- Comando: !avanzar_dias ---
+@enrutador.comando('!avanzar_dias')
+async def cmd_avanzar_dias(message, args):
+    user_id = message.author.id
+    carrera = await database_async.get_carrera_by_user(user_id)
+    if not carrera:
+        await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
         return
 
-    # --- Comando: !avanzar_dias ---
-    if message.content.startswith('!avanzar_dias '):
-        carrera = database.get_carrera_by_user(user_id)
-        if not carrera:
-            await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
+    try:
+        num_dias_a_avanzar = int(args[0])
+        if num_dias_a_avanzar <= 0:
+            await message.channel.send("El número de días a avanzar debe ser positivo.")
             return
-
-        try:
-            num_dias_a_avanzar = int(message.content.split(' ')[1])
-            if num_dias_a_avanzar <= 0:
-                await message.channel.send("El número de días a avanzar debe ser positivo.")
-                return
-            if num_dias_a_avanzar > 90: # Límite para evitar procesamientos muy largos
-                await message.channel.send("No puedes avanzar más de 90 días a la vez. Elige un número menor.")
-                return
-        except (ValueError, IndexError):
-            await message.channel.send("Formato incorrecto. Usa `!avanzar_dias <numero_de_dias>` (ej: `!avanzar_dias 7`).")
+        if num_dias_a_avanzar > 90: # Límite para evitar procesamientos muy largos
+            await message.channel.send("No puedes avanzar más de 90 días a la vez. Elige un número menor.")
             return
+    except (ValueError, IndexError):
+        await message.channel.send("Formato incorrecto. Usa `!avanzar_dias <numero_de_dias>` (ej: `!avanzar_dias 7`).")
+        return
 
-        await message.channel.send(f"Iniciando avance de {num_dias_a_avanzar} días. Esto puede tomar un momento...")
-        
-        total_mensajes_avance = []
-        dias_avanzados_efectivamente = 0
-
-        for i in range(num_dias_a_avanzar):
-            # Recargar carrera en cada iteración para obtener el día_actual más reciente
-            current_carrera_loop = database.get_carrera_by_user(user_id)
-            if not current_carrera_loop:
-                total_mensajes_avance.append("Error: Se perdió la referencia a tu carrera durante el avance.")
-                break
+    await message.channel.send(f"Iniciando avance de {num_dias_a_avanzar} días. Esto puede tomar un momento...")
     
-            tu_equipo_id_loop = current_carrera_loop['equipo_id']
-            dia_actual_loop = current_carrera_loop['dia_actual']
-            temporada_actual_loop = current_carrera_loop['temporada']
-    
-            fecha_base_simulacion_global = datetime.date(2025, 3, 1)
-            dias_totales_simulados_loop = (dia_actual_loop - 1) + (temporada_actual_loop - 1) * 365
-            fecha_actual_simulada_calendario_loop = fecha_base_simulacion_global + datetime.timedelta(days=dias_totales_simulados_loop)
-            fecha_str_actual_calendario_loop = fecha_actual_simulada_calendario_loop.strftime('%Y-%m-%d')
-    
-            # DEBUG: Imprimir estado antes de llamar a avanzar_dia
-            print(f"DEBUG MAIN: Iteración {i+1}/{num_dias_a_avanzar}. Dia actual (desde DB) ANTES de avanzar_dia: {dia_actual_loop}, Temporada: {temporada_actual_loop}, Fecha str: {fecha_str_actual_calendario_loop}")
-
-            partido_pendiente_hoy_loop = database.get_partido_pendiente(user_id, tu_equipo_id_loop, fecha_str_actual_calendario_loop)
-
-            if partido_pendiente_hoy_loop:
-                # Simular automáticamente el partido del usuario
-                if not any(f"--- Día {dia_actual_loop}" in msg for msg in total_mensajes_avance): # Evitar duplicar encabezado de día
-                    total_mensajes_avance.append(f"--- Día {dia_actual_loop} (Fecha: {fecha_str_actual_calendario_loop}) ---")
-                
-                equipo_local_nombre_partido = database.get_equipo_by_id(partido_pendiente_hoy_loop['equipo_local_id'])['nombre']
-                equipo_visitante_nombre_partido = database.get_equipo_by_id(partido_pendiente_hoy_loop['equipo_visitante_id'])['nombre']
-                total_mensajes_avance.append(f"⚠️ ¡Partido de tu equipo detectado! **{equipo_local_nombre_partido} vs {equipo_visitante_nombre_partido}**. Simulando automáticamente...")
-
-                resultado_sim_usuario, error_sim = game_logic.simular_partido(
-                    partido_pendiente_hoy_loop['equipo_local_id'],
-                    partido_pendiente_hoy_loop['equipo_visitante_id']
-                )
-                if error_sim:
-                    total_mensajes_avance.append(f"Error al simular tu partido: {error_sim}. Se continuará avanzando el día sin simular este partido.")
-                else:
-                    database.update_partido_resultado(
-                        partido_pendiente_hoy_loop['id'],
-                        resultado_sim_usuario['goles_e1'],
-                        resultado_sim_usuario['goles_e2']
-                    )
-                    game_logic.update_clasificacion(
-                        current_carrera_loop['liga_id'],
-                        current_carrera_loop['temporada'],
-                        resultado_sim_usuario,
-                        zona_nombre=partido_pendiente_hoy_loop.get('zona')
-                    )
-                    total_mensajes_avance.append(
-                        f"Resultado de tu partido simulado: **{equipo_local_nombre_partido} {resultado_sim_usuario['goles_e1']} - {resultado_sim_usuario['goles_e2']} {equipo_visitante_nombre_partido}**."
-                    )
-
-            mensajes_un_dia = game_logic.avanzar_dia(user_id)
-            
-            if partido_pendiente_hoy_loop and mensajes_un_dia: # Si hubo partido de usuario, omitir el encabezado de día de avanzar_dia
-                total_mensajes_avance.extend(mensajes_un_dia[1:]) 
-            elif mensajes_un_dia: # Si no hubo partido de usuario, incluir todos los mensajes de avanzar_dia
-                total_mensajes_avance.extend(mensajes_un_dia)
-                
-            # DEBUG: Imprimir estado después de llamar a avanzar_dia
-            current_carrera_after_avanzar = database.get_carrera_by_user(user_id)
-            if current_carrera_after_avanzar:
-                print(f"DEBUG MAIN: Iteración {i+1}/{num_dias_a_avanzar}. Dia actual (desde DB) DESPUÉS de avanzar_dia: {current_carrera_after_avanzar['dia_actual']}, Temporada: {current_carrera_after_avanzar['temporada']}")
-            dias_avanzados_efectivamente += 1
-
-        # Enviar todos los mensajes acumulados
-        for msg_block in total_mensajes_avance:
-            if len(msg_block) > 1900:
-                chunks = [msg_block[i:i+1900] for i in range(0, len(msg_block), 1900)]
-                for chunk in chunks:
-                    await message.channel.send(chunk)
-            else:
-                await message.channel.send(msg_block)
-        
-        # Mensaje final de estado
-        if dias_avanzados_efectivamente == num_dias_a_avanzar:
-            await message.channel.send(f"🗓️ Se avanzaron con éxito los {num_dias_a_avanzar} días solicitados. Los partidos de tu equipo en este período fueron simulados automáticamente.")
-        elif dias_avanzados_efectivamente > 0 and dias_avanzados_efectivamente < num_dias_a_avanzar:
-             await message.channel.send(f"🗓️ Proceso de avance de días finalizado. Se avanzaron {dias_avanzados_efectivamente} de los {num_dias_a_avanzar} solicitados (posiblemente interrumpido por un error o fin de temporada). Los partidos de tu equipo en este período fueron simulados automáticamente.")
-        elif num_dias_a_avanzar > 0 and dias_avanzados_efectivamente == 0:
-            await message.channel.send(f"🗓️ No se avanzó ningún día. Verifica si hay un error en la simulación.")
+    total_mensajes_avance = []
+    dias_avanzados_efectivamente = 0
 
-        return
+    for i in range(num_dias_a_avanzar):
+        # Recargar carrera en cada iteración para obtener el día_actual más reciente
+        current_carrera_loop = await database_async.get_carrera_by_user(user_id)
+        if not current_carrera_loop:
+            total_mensajes_avance.append("Error: Se perdió la referencia a tu carrera durante el avance.")
+            break
 
+        tu_equipo_id_loop = current_carrera_loop['equipo_id']
+        dia_actual_loop = current_carrera_loop['dia_actual']
+        temporada_actual_loop = current_carrera_loop['temporada']
 
-    if user_id in setup_state and setup_state[user_id]['step'] == 'confirm_simular_partido_ia':
-        if message.content.lower() == 'si':
-            partido_details_to_sim = setup_state[user_id]
-            
-            resultado_sim, error_sim = game_logic.simular_partido(
-                partido_details_to_sim['equipo_local_id'],
-                partido_details_to_sim['equipo_visitante_id']
-            )
+        fecha_base_simulacion_global = datetime.date(2025, 3, 1)
+        dias_totales_simulados_loop = (dia_actual_loop - 1) + (temporada_actual_loop - 1) * 365
+        fecha_actual_simulada_calendario_loop = fecha_base_simulacion_global + datetime.timedelta(days=dias_totales_simulados_loop)
+        fecha_str_actual_calendario_loop = fecha_actual_simulada_calendario_loop.strftime('%Y-%m-%d')
 
-            if error_sim:
-                await message.channel.send(f"Error al simular el partido: {error_sim}")
-                del setup_state[user_id]
-                return
+        # DEBUG: Imprimir estado antes de llamar a avanzar_dia
+        print(f"DEBUG MAIN: Iteración {i+1}/{num_dias_a_avanzar}. Dia actual (desde DB) ANTES de avanzar_dia: {dia_actual_loop}, Temporada: {temporada_actual_loop}, Fecha str: {fecha_str_actual_calendario_loop}")
 
-            database.update_partido_resultado(
-                partido_details_to_sim['partido_id'],
-                resultado_sim['goles_e1'],
-                resultado_sim['goles_e2']
-            )
-            game_logic.update_clasificacion(
-                partido_details_to_sim['liga_id'],
-                partido_details_to_sim['temporada'],
-                resultado_sim,
-                zona_nombre=partido_details_to_sim.get('zona') # ¡Pasando la zona aquí!
-            )
+        partido_pendiente_hoy_loop = await database_async.get_partido_pendiente(user_id, tu_equipo_id_loop, fecha_str_actual_calendario_loop)
+
+        if partido_pendiente_hoy_loop:
+            # Simular automáticamente el partido del usuario
+            if not any(f"--- Día {dia_actual_loop}" in msg for msg in total_mensajes_avance): # Evitar duplicar encabezado de día
+                total_mensajes_avance.append(f"--- Día {dia_actual_loop} (Fecha: {fecha_str_actual_calendario_loop}) ---")
             
-            equipo_local_sim_nombre = database.get_equipo_by_id(partido_details_to_sim['equipo_local_id'])['nombre']
-            equipo_visitante_sim_nombre = database.get_equipo_by_id(partido_details_to_sim['equipo_visitante_id'])['nombre']
-            await message.channel.send(
-                f"¡Partido simulado por IA! Resultado: **{equipo_local_sim_nombre} {resultado_sim['goles_e1']} - {resultado_sim['goles_e2']} {equipo_visitante_sim_nombre}**."
+            equipo_local_nombre_partido = (await database_async.get_equipo_by_id(partido_pendiente_hoy_loop['equipo_local_id']))['nombre']
+            equipo_visitante_nombre_partido = (await database_async.get_equipo_by_id(partido_pendiente_hoy_loop['equipo_visitante_id']))['nombre']
+            total_mensajes_avance.append(f"⚠️ ¡Partido de tu equipo detectado! **{equipo_local_nombre_partido} vs {equipo_visitante_nombre_partido}**. Simulando automáticamente...")
+
+            jugados, errores = await database_async.escribir(
+                game_logic.jugar_partidos_liga,
+                current_carrera_loop['liga_id'],
+                current_carrera_loop['temporada'],
+                [partido_pendiente_hoy_loop]
             )
-            
-            mensajes_avance = game_logic.avanzar_dia(user_id)
-            for msg in mensajes_avance:
-                if len(msg) > 1900:
-                    chunks = [msg[i:i+1900] for i in range(0, len(msg), 1900)]
-                    for chunk in chunks:
-                        await message.channel.send(chunk)
-                else:
-                    await message.channel.send(msg)
-            
-            del setup_state[user_id]
-            return
-        
-    # --- Comando: !resultado (Lógica MEJORADA) ---
-    if message.content.startswith('!resultado '):
-        carrera = database.get_carrera_by_user(user_id)
-        if not carrera:
-            await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
-            return
+            if not jugados:
+                error_sim = errores[0][1] if errores else "No se pudo guardar el resultado."
+                total_mensajes_avance.append(f"Error al simular tu partido: {error_sim}. Se continuará avanzando el día sin simular este partido.")
+            else:
+                resultado_sim_usuario = jugados[0][1]
+                total_mensajes_avance.append(
+                    f"Resultado de tu partido simulado: **{equipo_local_nombre_partido} {resultado_sim_usuario['goles_e1']} - {resultado_sim_usuario['goles_e2']} {equipo_visitante_nombre_partido}**."
+                )
 
-        tu_equipo_id = carrera['equipo_id']
+        mensajes_un_dia = await database_async.escribir(game_logic.avanzar_dia, user_id)
         
-        fecha_base_simulacion_global = datetime.date(2025, 3, 1)
-        dia_actual_carrera = carrera['dia_actual']
-        temporada_actual_carrera = carrera['temporada']
-        dias_totales_simulados_hasta_hoy = (dia_actual_carrera - 1) + (temporada_actual_carrera - 1) * 365
-        fecha_actual_simulada_calendario = fecha_base_simulacion_global + datetime.timedelta(days=dias_totales_simulados_hasta_hoy)
-        fecha_str = fecha_actual_simulada_calendario.strftime('%Y-%m-%d')
+        if partido_pendiente_hoy_loop and mensajes_un_dia: # Si hubo partido de usuario, omitir el encabezado de día de avanzar_dia
+            total_mensajes_avance.extend(mensajes_un_dia[1:]) 
+        elif mensajes_un_dia: # Si no hubo partido de usuario, incluir todos los mensajes de avanzar_dia
+            total_mensajes_avance.extend(mensajes_un_dia)
+            
+        # DEBUG: Imprimir estado después de llamar a avanzar_dia
+        current_carrera_after_avanzar = await database_async.get_carrera_by_user(user_id)
+        if current_carrera_after_avanzar:
+            print(f"DEBUG MAIN: Iteración {i+1}/{num_dias_a_avanzar}. Dia actual (desde DB) DESPUÉS de avanzar_dia: {current_carrera_after_avanzar['dia_actual']}, Temporada: {current_carrera_after_avanzar['temporada']}")
+        dias_avanzados_efectivamente += 1
+
+    # Enviar todos los mensajes acumulados
+    # Se empaquetan en mensajes de hasta 2000 caracteres (unos pocos envíos en lugar de uno por línea)
+    await salida.enviar(message.channel, total_mensajes_avance)
+    
+    # Mensaje final de estado
+    if dias_avanzados_efectivamente == num_dias_a_avanzar:
+        await message.channel.send(f"🗓️ Se avanzaron con éxito los {num_dias_a_avanzar} días solicitados. Los partidos de tu equipo en este período fueron simulados automáticamente.")
+    elif dias_avanzados_efectivamente > 0 and dias_avanzados_efectivamente < num_dias_a_avanzar:
+         await message.channel.send(f"🗓️ Proceso de avance de días finalizado. Se avanzaron {dias_avanzados_efectivamente} de los {num_dias_a_avanzar} solicitados (posiblemente interrumpido por un error o fin de temporada). Los partidos de tu equipo en este período fueron simulados automáticamente.")
+    elif num_dias_a_avanzar > 0 and dias_avanzados_efectivamente == 0:
+        await message.channel.send(f"🗓️ No se avanzó ningún día. Verifica si hay un error en la simulación.")
 
-        partido_a_reportar = database.get_partido_pendiente(user_id, tu_equipo_id, fecha_str)
+    return
 
-        if not partido_a_reportar:
-            await message.channel.send(f"No hay un partido pendiente de resultado para tu equipo hoy ({fecha_str}).")
-            return
 
-        args = message.content.split(' ')[1]
-        try:
-            local_score, visitante_score = map(int, args.split('-'))
-            if local_score < 0 or visitante_score < 0:
-                 raise ValueError("Los resultados no pueden ser negativos.")
-        except ValueError:
-            await message.channel.send("Formato de resultado inválido. Usa `!resultado TusGoles-GolesRival` (ej: `!resultado 2-1`).")
-            return
+# --- Comando: !resultado (Lógica MEJORADA) ---
+@enrutador.comando('!resultado')
+async def cmd_resultado(message, args):
+    user_id = message.author.id
+    carrera = await database_async.get_carrera_by_user(user_id)
+    if not carrera:
+        await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
+        return
 
-        if partido_a_reportar['equipo_local_id'] == tu_equipo_id:
-            final_local_score = local_score
-            final_visitante_score = visitante_score
-        elif partido_a_reportar['equipo_visitante_id'] == tu_equipo_id:
-            final_local_score = visitante_score
-            final_visitante_score = local_score
-        else:
-            await message.channel.send("Error interno: el partido no coincide con tu equipo. Por favor, contacta al administrador.")
-            return
+    tu_equipo_id = carrera['equipo_id']
+    
+    fecha_base_simulacion_global = datetime.date(2025, 3, 1)
+    dia_actual_carrera = carrera['dia_actual']
+    temporada_actual_carrera = carrera['temporada']
+    dias_totales_simulados_hasta_hoy = (dia_actual_carrera - 1) + (temporada_actual_carrera - 1) * 365
+    fecha_actual_simulada_calendario = fecha_base_simulacion_global + datetime.timedelta(days=dias_totales_simulados_hasta_hoy)
+    fecha_str = fecha_actual_simulada_calendario.strftime('%Y-%m-%d')
 
-        database.update_partido_resultado(partido_a_reportar['id'], final_local_score, final_visitante_score)
-        
-        resultado_simulacion = {
-            'equipo1_id': partido_a_reportar['equipo_local_id'],
-            'goles_e1': final_local_score,
-            'equipo2_id': partido_a_reportar['equipo_visitante_id'],
-            'goles_e2': final_visitante_score
-        }
-        game_logic.update_clasificacion(
-            carrera['liga_id'],
-            carrera['temporada'],
-            resultado_simulacion,
-            zona_nombre=partido_a_reportar.get('zona') # ¡Pasando la zona!
-        )
+    partido_a_reportar = await database_async.get_partido_pendiente(user_id, tu_equipo_id, fecha_str)
 
-        await message.channel.send(f"¡Resultado guardado! **{partido_a_reportar['equipo_local_nombre']} {final_local_score}-{final_visitante_score} {partido_a_reportar['equipo_visitante_nombre']}**.")
-        await message.channel.send("Puedes usar `!avanzar_dia` para continuar.")
+    if not partido_a_reportar:
+        await message.channel.send(f"No hay un partido pendiente de resultado para tu equipo hoy ({fecha_str}).")
         return
 
-    # --- NUEVO COMANDO: !proximo_partido ---
-    if message.content == '!proximo_partido':
-        carrera = database.get_carrera_by_user(user_id)
-        if not carrera:
-            await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
-            return
+    marcador = args[0] if args else ''
+    try:
+        local_score, visitante_score = map(int, marcador.split('-'))
+        if local_score < 0 or visitante_score < 0:
+             raise ValueError("Los resultados no pueden ser negativos.")
+    except ValueError:
+        await message.channel.send("Formato de resultado inválido. Usa `!resultado TusGoles-GolesRival` (ej: `!resultado 2-1`).")
+        return
 
-        equipo_id = carrera['equipo_id']
-        proximo_partido = database.get_proximo_partido_tu_equipo(user_id, equipo_id, carrera['dia_actual']) 
+    if partido_a_reportar['equipo_local_id'] == tu_equipo_id:
+        final_local_score = local_score
+        final_visitante_score = visitante_score
+    elif partido_a_reportar['equipo_visitante_id'] == tu_equipo_id:
+        final_local_score = visitante_score
+        final_visitante_score = local_score
+    else:
+        await message.channel.send("Error interno: el partido no coincide con tu equipo. Por favor, contacta al administrador.")
+        return
 
-        if proximo_partido:
-            jornada_details = database.get_jornada_by_numero(
-                carrera['liga_id'], carrera['temporada'], proximo_partido['numero_jornada']
-            )
-            fecha_partido_str = jornada_details['fecha_simulacion'] if jornada_details and 'fecha_simulacion' in jornada_details else "Fecha no definida"
+    # Escrituras por el hilo de escritura, como las de avanzar_dia: nunca en paralelo con ellas
+    await database_async.escribir(database.update_partido_resultado, partido_a_reportar['id'], final_local_score, final_visitante_score)
+    
+    resultado_simulacion = {
+        'equipo1_id': partido_a_reportar['equipo_local_id'],
+        'goles_e1': final_local_score,
+        'equipo2_id': partido_a_reportar['equipo_visitante_id'],
+        'goles_e2': final_visitante_score
+    }
+    await database_async.escribir(
+        game_logic.update_clasificacion,
+        carrera['liga_id'],
+        carrera['temporada'],
+        resultado_simulacion,
+        zona_nombre=partido_a_reportar.get('zona') # ¡Pasando la zona!
+    )
+
+    await message.channel.send(f"¡Resultado guardado! **{partido_a_reportar['equipo_local_nombre']} {final_local_score}-{final_visitante_score} {partido_a_reportar['equipo_visitante_nombre']}**.")
+    await message.channel.send("Puedes usar `!avanzar_dia` para continuar.")
+    return
+
+
+# --- NUEVO COMANDO: !proximo_partido ---
+@enrutador.comando('!proximo_partido')
+async def cmd_proximo_partido(message, args):
+    user_id = message.author.id
+    carrera = await database_async.get_carrera_by_user(user_id)
+    if not carrera:
+        await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
+        return
 
-            await message.channel.send(f"Tu próximo partido es en la Jornada {proximo_partido['numero_jornada']}:\n**{proximo_partido['equipo_local_nombre']} vs {proximo_partido['equipo_visitante_nombre']}** (Fecha: {fecha_partido_str})")
-        else:
-            await message.channel.send("No hay partidos de tu equipo programados en el futuro cercano. ¡La temporada podría haber terminado o se está generando el fixture!")
-        return # Añade return
-
-    # --- NUEVO COMANDO: !calendario (muestra tu fixture) ---
-    if message.content == '!calendario':
-        carrera = database.get_carrera_by_user(user_id)
-        if not carrera:
-            await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
-            return
+    equipo_id = carrera['equipo_id']
+    proximo_partido = await database_async.get_proximo_partido_tu_equipo(user_id, equipo_id, carrera['dia_actual']) 
 
-        partidos_carrera = database.get_all_partidos_carrera(user_id)
-        if not partidos_carrera:
-            await message.channel.send("Aún no hay partidos en tu calendario. El fixture podría no haberse generado aún.")
-            return
+    if proximo_partido:
+        jornada_details = await database_async.get_jornada_by_numero(
+            carrera['liga_id'], carrera['temporada'], proximo_partido['numero_jornada']
+        )
+        fecha_partido_str = jornada_details['fecha_simulacion'] if jornada_details and 'fecha_simulacion' in jornada_details else "Fecha no definida"
+
+        await message.channel.send(f"Tu próximo partido es en la Jornada {proximo_partido['numero_jornada']}:\n**{proximo_partido['equipo_local_nombre']} vs {proximo_partido['equipo_visitante_nombre']}** (Fecha: {fecha_partido_str})")
+    else:
+        await message.channel.send("No hay partidos de tu equipo programados en el futuro cercano. ¡La temporada podría haber terminado o se está generando el fixture!")
+    return # Añade return
+
+
+def _resumen_calendario(partidos_carrera, temporada):
+    """Una línea por partido del usuario: jornada, fecha, L/V, rival y resultado (G/E/P) desde su punto de vista."""
+    ANCHO_RIVAL = 22
+    balance = {'G': 0, 'E': 0, 'P': 0}
+    lineas = []
+    for p in partidos_carrera:
+        es_local = p['equipo_local_id'] == p['id_equipo_usuario']
+        rival = p['equipo_visitante_nombre'] if es_local else p['equipo_local_nombre']
+        resultado = "-"
+        if p['jugado'] == 1:
+            propios, ajenos = (p['resultado_local'], p['resultado_visitante']) if es_local else (p['resultado_visitante'], p['resultado_local'])
+            signo = 'G' if propios > ajenos else 'E' if propios == ajenos else 'P'
+            balance[signo] += 1
+            resultado = f"{propios}-{ajenos} {signo}"
+        lineas.append(f"J{str(p['numero_jornada']).ljust(3)} {p['fecha_partido'] or 'Fecha N/A':<10} {'L' if es_local else 'V'} {rival[:ANCHO_RIVAL].ljust(ANCHO_RIVAL)} {resultado}")
+
+    jugados = sum(balance.values())
+    encabezado = (f"**Resumen del calendario - Temporada {temporada}:** {jugados} jugados "
+                  f"({balance['G']}G {balance['E']}E {balance['P']}P), {len(partidos_carrera) - jugados} por jugar")
+    return [encabezado, "```", *lineas, "```"]
+
+
+# --- NUEVO COMANDO: !calendario (muestra tu fixture) ---
+@enrutador.comando('!calendario')
+async def cmd_calendario(message, args):
+    user_id = message.author.id
+    carrera = await database_async.get_carrera_by_user(user_id)
+    if not carrera:
+        await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
+        return
+
+    # !calendario [temporada] [resumen]
+    temporada = next((int(a) for a in args if a.isdigit()), carrera['temporada'])
+    resumen = any(a.lower() == 'resumen' for a in args)
 
-        response_parts = ["**Calendario de Partidos (Tu Carrera):**\n"]
+    clave = (user_id, carrera['liga_id'], temporada, resumen)
+    final_response = cache_render.obtener('calendario', clave)
+    if final_response is not None:
+        await salida.enviar_paginado(message.channel, final_response, autor_id=user_id)
+        return
+
+    sello = cache_render.sello()
+    partidos_carrera = await database_async.get_all_partidos_carrera(user_id, temporada)
+    if not partidos_carrera and temporada < carrera['temporada']:
+        # Temporada terminada: puede estar ya en el archivo
+        partidos_carrera = await database_async.get_partidos_archivados_equipo(carrera['equipo_id'], carrera['liga_id'], temporada)
+    if not partidos_carrera:
+        await message.channel.send(f"Aún no hay partidos en tu calendario de la Temporada {temporada}. El fixture podría no haberse generado aún.")
+        return
+
+    if resumen:
+        response_parts = _resumen_calendario(partidos_carrera, temporada)
+    else:
+        response_parts = [f"**Calendario de Partidos (Tu Carrera) - Temporada {temporada}:**\n"]
         current_jornada = 0
         for p in partidos_carrera:
-            jornada_info = database.get_jornada_by_numero(carrera['liga_id'], carrera['temporada'], p['numero_jornada'])
-            fecha_jornada = jornada_info['fecha_simulacion'] if jornada_info else "Fecha N/A"
-
             if p['numero_jornada'] != current_jornada:
                 current_jornada = p['numero_jornada']
-                response_parts.append(f"\n--- Jornada {current_jornada} ({fecha_jornada}) ---")
-            
-            resultado = f"{p['resultado_local']}-{p['resultado_visitante']}" if p['jugado'] == 1 else "PENDIENTE" 
+                response_parts.append(f"\n--- Jornada {current_jornada} ({p['fecha_partido'] or 'Fecha N/A'}) ---")
+
+            resultado = f"{p['resultado_local']}-{p['resultado_visitante']}" if p['jugado'] == 1 else "PENDIENTE"
             response_parts.append(f"{p['equipo_local_nombre']} vs {p['equipo_visitante_nombre']} - Resultado: {resultado}")
-        
-        final_response = "\n".join(response_parts)
-        if len(final_response) > 1900:
-            await message.channel.send("Tu calendario es muy extenso. Aquí está la primera parte:\n")
-            await message.channel.send(final_response[:1900] + "...")
-        else:
-            await message.channel.send(final_response)
-        return # Añade return
 
-    # --- COMANDO: !tabla (MODIFICADO para otras ligas y zonas) ---
-    if message.content.startswith('!tabla'):
-        carrera = database.get_carrera_by_user(user_id)
-        if not carrera:
-            await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
-            return
+    final_response = cache_render.guardar('calendario', clave, "\n".join(response_parts),
+                                          [('fixture', carrera['liga_id']), ('partidos', carrera['liga_id'])], sello)
+    await salida.enviar_paginado(message.channel, final_response, autor_id=user_id)
+    return # Añade return
+
+
+# --- COMANDO: !tabla (MODIFICADO para otras ligas y zonas) ---
+def _texto_tabla(carrera, liga_a_mostrar_nombre=None, zona_a_mostrar_nombre=None):
+    """
+    Arma la tabla de posiciones pedida con !tabla.
+    Retorna (texto, liga_id); liga_id es None cuando el texto es un aviso (liga inexistente, sin datos)
+    y no conviene guardarlo en la caché de vistas.
+    """
+    if not liga_a_mostrar_nombre:
+        liga_id_mostrar = carrera['liga_id']
+        liga_details_mostrar = database.get_liga_by_id(liga_id_mostrar)
+        if not liga_details_mostrar:
+            return "No se pudo encontrar la liga de tu carrera. Contacta al administrador.", None
+        liga_a_mostrar_nombre = liga_details_mostrar['nombre']
+    else:
+        liga_id_mostrar = database.get_liga_id(liga_a_mostrar_nombre)
+        if not liga_id_mostrar:
+            return f"La liga '{liga_a_mostrar_nombre}' no fue encontrada. Asegúrate de escribirla exactamente como está registrada (ej. \"Brasileirão Serie A\").", None
+        liga_details_mostrar = database.get_liga_by_id(liga_id_mostrar)
+
+    # Determinar si la liga es la Primera Nacional para mostrar zonas
+    es_primera_nacional = (liga_details_mostrar['nombre'] == "Primera Nacional") # <-- ¡Asegúrate que este nombre sea exacto!
+    
+    response = []
 
-        args = message.content.split(maxsplit=1)
-        liga_a_mostrar_nombre = None
-        zona_a_mostrar_nombre = None
-
-        if len(args) > 1:
-            arg_content = args[1].strip()
-            matches = re.findall(r'"([^"]*)"|\'([^\']*)\'|(\S+)', arg_content)
-            parsed_args = []
-            for m in matches:
-                if m[0]: parsed_args.append(m[0])
-                elif m[1]: parsed_args.append(m[1])
-                elif m[2]: parsed_args.append(m[2])
-            
-            if len(parsed_args) >= 1:
-                liga_a_mostrar_nombre = parsed_args[0]
-            if len(parsed_args) >= 2:
-                zona_a_mostrar_nombre = parsed_args[1]
-        
+    # ANCHOS DE COLUMNA AJUSTADOS
+    ANCHO_EQUIPO = 22 # Antes 17. Probado con 22 para un mejor ajuste.
+    ENCABEZADO_TABLA = f"POS EQUIPO{' ' * (ANCHO_EQUIPO - 6)} PJ PG PE PP GF GC DG PTS"
 
 
-        if not liga_a_mostrar_nombre:
-            liga_id_mostrar = carrera['liga_id']
-            liga_details_mostrar = database.get_liga_by_id(liga_id_mostrar)
-            if not liga_details_mostrar:
-                await message.channel.send("No se pudo encontrar la liga de tu carrera. Contacta al administrador.")
-                return
-            liga_a_mostrar_nombre = liga_details_mostrar['nombre']
-        else:
-            liga_id_mostrar = database.get_liga_id(liga_a_mostrar_nombre)
-            if not liga_id_mostrar:
-                await message.channel.send(f"La liga '{liga_a_mostrar_nombre}' no fue encontrada. Asegúrate de escribirla exactamente como está registrada (ej. \"Brasileirão Serie A\").")
-                return
-            liga_details_mostrar = database.get_liga_by_id(liga_id_mostrar)
-
-        # Determinar si la liga es la Primera Nacional para mostrar zonas
-        es_primera_nacional = (liga_details_mostrar['nombre'] == "Primera Nacional") # <-- ¡Asegúrate que este nombre sea exacto!
+    if es_primera_nacional and not zona_a_mostrar_nombre:
+        # Si es Primera Nacional y no se especifica zona, mostrar todas las zonas
+        all_clasificaciones = database.get_clasificacion_liga(liga_id_mostrar, carrera['temporada'])
+        # Obtener las zonas únicas de las clasificaciones
+        zonas_encontradas = sorted(list(set([c['zona'] for c in all_clasificaciones if c['zona'] is not None])))
         
-        response = []
+        if not zonas_encontradas:
+            response.append(f"Aún no hay partidos jugados en la {liga_details_mostrar['nombre']} para generar la tabla de posiciones en la Temporada {carrera['temporada']}.")
+            response.append("No se encontraron zonas o no hay datos de zona en la clasificación. ¿Ya se generó el fixture?")
+            return "\n".join(response), None
+
+        response.append(f"**Tabla de Posiciones - {liga_details_mostrar['nombre']} (Temporada {carrera['temporada']})**\n")
+        response.append("Puedes usar `!tabla \"Primera Nacional\" \"Zona A\"` para ver una zona específica.")
+
+        for zona_name in zonas_encontradas:
+            tabla_posiciones_zona = database.get_clasificacion_liga(liga_id_mostrar, carrera['temporada'], zona_name)
+            if tabla_posiciones_zona:
+                response.append(f"\n--- {zona_name} ---")
+                response.append(f"```ansi\n{ENCABEZADO_TABLA}")
+                for i, equipo_stats in enumerate(tabla_posiciones_zona):
+                    pos = str(i + 1).ljust(3)
+                    nombre_equipo_display = equipo_stats['equipo_nombre'][:ANCHO_EQUIPO].ljust(ANCHO_EQUIPO)
+                    
+                    pj = str(equipo_stats['pj']).ljust(3)
+                    pg = str(equipo_stats['pg']).ljust(3)
+                    pe = str(equipo_stats['pe']).ljust(3)
+                    pp = str(equipo_stats['pp']).ljust(3)
+                    gf = str(equipo_stats['gf']).ljust(3)
+                    gc = str(equipo_stats['gc']).ljust(3)
+                    dg = str(equipo_stats['dg']).ljust(4)
+                    pts = str(equipo_stats['pts']).ljust(3)
+
+                    tu_equipo_nombre = database.get_equipo_by_id(carrera['equipo_id'])['nombre'] # Re-obtener el nombre del equipo del usuario
+                    if liga_id_mostrar == carrera['liga_id'] and equipo_stats['equipo_nombre'] == tu_equipo_nombre:
+                        line = f" [2;36m{pos} {nombre_equipo_display} {pj}{pg}{pe}{pp}{gf}{gc}{dg}{pts} [0m"
+                    else:
+                        line = f"{pos} {nombre_equipo_display} {pj}{pg}{pe}{pp}{gf}{gc}{dg}{pts}"
+                    response.append(line)
+                response.append("```")
+            else:
+                response.append(f"\nNo hay datos de clasificación para {zona_name}.")
+    else: # Ligas normales o Primera Nacional con zona específica
+        tabla_posiciones = database.get_clasificacion_liga(liga_id_mostrar, carrera['temporada'], zona_a_mostrar_nombre)
 
-        # ANCHOS DE COLUMNA AJUSTADOS
-        ANCHO_EQUIPO = 22 # Antes 17. Probado con 22 para un mejor ajuste.
-        ENCABEZADO_TABLA = f"POS EQUIPO{' ' * (ANCHO_EQUIPO - 6)} PJ PG PE PP GF GC DG PTS"
+        if not tabla_posiciones:
+            response.append(f"Aún no hay partidos jugados en la {liga_details_mostrar['nombre']} para generar la tabla de posiciones en la Temporada {carrera['temporada']}.")
+            if zona_a_mostrar_nombre:
+                response.append(f"No se encontraron datos para la zona '{zona_a_mostrar_nombre}'.")
+            return "\n".join(response), None
+
+        header_text = f"**Tabla de Posiciones - {liga_details_mostrar['nombre']} (Temporada {carrera['temporada']})"
+        if zona_a_mostrar_nombre:
+            header_text += f" - {zona_a_mostrar_nombre}"
+        header_text += "**\n"
+        response.append(header_text)
+        response.append(f"```ansi\n{ENCABEZADO_TABLA}")
+
+        tu_equipo_nombre = None
+        if liga_id_mostrar == carrera['liga_id']:
+            equipo_del_usuario_details = database.get_equipo_by_id(carrera['equipo_id'])
+            tu_equipo_nombre = equipo_del_usuario_details['nombre']
+
+        for i, equipo_stats in enumerate(tabla_posiciones):
+            pos = str(i + 1).ljust(3)
+            nombre_equipo_display = equipo_stats['equipo_nombre'][:ANCHO_EQUIPO].ljust(ANCHO_EQUIPO)
+            
+            pj = str(equipo_stats['pj']).ljust(3)
+            pg = str(equipo_stats['pg']).ljust(3)
+            pe = str(equipo_stats['pe']).ljust(3)
+            pp = str(equipo_stats['pp']).ljust(3)
+            gf = str(equipo_stats['gf']).ljust(3)
+            gc = str(equipo_stats['gc']).ljust(3)
+            dg = str(equipo_stats['dg']).ljust(4)
+            pts = str(equipo_stats['pts']).ljust(3)
+
+            if tu_equipo_nombre and equipo_stats['equipo_nombre'] == tu_equipo_nombre:
+                line = f"[2;36m{pos} {nombre_equipo_display} {pj}{pg}{pe}{pp}{gf}{gc}{dg}{pts}[0m"
+            else:
+                line = f"{pos} {nombre_equipo_display} {pj}{pg}{pe}{pp}{gf}{gc}{dg}{pts}"
+            
+            response.append(line)
+        response.append("```")
+    
+    return "\n".join(response), liga_id_mostrar
 
 
-        if es_primera_nacional and not zona_a_mostrar_nombre:
-            # Si es Primera Nacional y no se especifica zona, mostrar todas las zonas
-            all_clasificaciones = database.get_clasificacion_liga(liga_id_mostrar, carrera['temporada'])
-            # Obtener las zonas únicas de las clasificaciones
-            zonas_encontradas = sorted(list(set([c['zona'] for c in all_clasificaciones if c['zona'] is not None])))
-            
-            if not zonas_encontradas:
-                response.append(f"Aún no hay partidos jugados en la {liga_details_mostrar['nombre']} para generar la tabla de posiciones en la Temporada {carrera['temporada']}.")
-                response.append("No se encontraron zonas o no hay datos de zona en la clasificación. ¿Ya se generó el fixture?")
-                await message.channel.send("\n".join(response))
-                return
-
-            response.append(f"**Tabla de Posiciones - {liga_details_mostrar['nombre']} (Temporada {carrera['temporada']})**\n")
-            response.append("Puedes usar `!tabla \"Primera Nacional\" \"Zona A\"` para ver una zona específica.")
-
-            for zona_name in zonas_encontradas:
-                tabla_posiciones_zona = database.get_clasificacion_liga(liga_id_mostrar, carrera['temporada'], zona_name)
-                if tabla_posiciones_zona:
-                    response.append(f"\n--- {zona_name} ---")
-                    response.append(f"```ansi\n{ENCABEZADO_TABLA}")
-                    for i, equipo_stats in enumerate(tabla_posiciones_zona):
-                        pos = str(i + 1).ljust(3)
-                        nombre_equipo_display = equipo_stats['equipo_nombre'][:ANCHO_EQUIPO].ljust(ANCHO_EQUIPO)
-                        
-                        pj = str(equipo_stats['pj']).ljust(3)
-                        pg = str(equipo_stats['pg']).ljust(3)
-                        pe = str(equipo_stats['pe']).ljust(3)
-                        pp = str(equipo_stats['pp']).ljust(3)
-                        gf = str(equipo_stats['gf']).ljust(3)
-                        gc = str(equipo_stats['gc']).ljust(3)
-                        dg = str(equipo_stats['dg']).ljust(4)
-                        pts = str(equipo_stats['pts']).ljust(3)
-
-                        tu_equipo_nombre = database.get_equipo_by_id(carrera['equipo_id'])['nombre'] # Re-obtener el nombre del equipo del usuario
-                        if liga_id_mostrar == carrera['liga_id'] and equipo_stats['equipo_nombre'] == tu_equipo_nombre:
-                            line = f" [2;36m{pos} {nombre_equipo_display} {pj}{pg}{pe}{pp}{gf}{gc}{dg}{pts} [0m"
-                        else:
-                            line = f"{pos} {nombre_equipo_display} {pj}{pg}{pe}{pp}{gf}{gc}{dg}{pts}"
-                        response.append(line)
-                    response.append("```")
-                else:
-                    response.append(f"\nNo hay datos de clasificación para {zona_name}.")
-        else: # Ligas normales o Primera Nacional con zona específica
-            tabla_posiciones = database.get_clasificacion_liga(liga_id_mostrar, carrera['temporada'], zona_a_mostrar_nombre)
-
-            if not tabla_posiciones:
-                response.append(f"Aún no hay partidos jugados en la {liga_details_mostrar['nombre']} para generar la tabla de posiciones en la Temporada {carrera['temporada']}.")
-                if zona_a_mostrar_nombre:
-                    response.append(f"No se encontraron datos para la zona '{zona_a_mostrar_nombre}'.")
-                await message.channel.send("\n".join(response))
-                return
-
-            header_text = f"**Tabla de Posiciones - {liga_details_mostrar['nombre']} (Temporada {carrera['temporada']})"
-            if zona_a_mostrar_nombre:
-                header_text += f" - {zona_a_mostrar_nombre}"
-            header_text += "**\n"
-            response.append(header_text)
-            response.append(f"```ansi\n{ENCABEZADO_TABLA}")
-
-            tu_equipo_nombre = None
-            if liga_id_mostrar == carrera['liga_id']:
-                equipo_del_usuario_details = database.get_equipo_by_id(carrera['equipo_id'])
-                tu_equipo_nombre = equipo_del_usuario_details['nombre']
-
-            for i, equipo_stats in enumerate(tabla_posiciones):
-                pos = str(i + 1).ljust(3)
-                nombre_equipo_display = equipo_stats['equipo_nombre'][:ANCHO_EQUIPO].ljust(ANCHO_EQUIPO)
-                
-                pj = str(equipo_stats['pj']).ljust(3)
-                pg = str(equipo_stats['pg']).ljust(3)
-                pe = str(equipo_stats['pe']).ljust(3)
-                pp = str(equipo_stats['pp']).ljust(3)
-                gf = str(equipo_stats['gf']).ljust(3)
-                gc = str(equipo_stats['gc']).ljust(3)
-                dg = str(equipo_stats['dg']).ljust(4)
-                pts = str(equipo_stats['pts']).ljust(3)
-
-                if tu_equipo_nombre and equipo_stats['equipo_nombre'] == tu_equipo_nombre:
-                    line = f"[2;36m{pos} {nombre_equipo_display} {pj}{pg}{pe}{pp}{gf}{gc}{dg}{pts}[0m"
-                else:
-                    line = f"{pos} {nombre_equipo_display} {pj}{pg}{pe}{pp}{gf}{gc}{dg}{pts}"
-                
-                response.append(line)
-            response.append("```")
-        
-        final_response = "\n".join(response)
-        if len(final_response) > 1900:
-            await message.channel.send("La tabla es muy extensa. Aquí está la primera parte:\n")
-            await message.channel.send(final_response[:1900] + "...")
-        else:
-            await message.channel.send(final_response)
+@enrutador.comando('!tabla')
+async def cmd_tabla(message, args):
+    user_id = message.author.id
+    carrera = await database_async.get_carrera_by_user(user_id)
+    if not carrera:
+        await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
         return
 
-    # --- NUEVO COMANDO: !palmares (MODIFICADO para incluir títulos del usuario) ---
-    if message.content.startswith('!palmares'):
-        carrera = database.get_carrera_by_user(user_id)
-        if not carrera:
-            await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
+    liga_a_mostrar_nombre = args[0] if len(args) >= 1 else None
+    zona_a_mostrar_nombre = args[1] if len(args) >= 2 else None
+
+    # La vista depende de la liga/zona pedida y, por el resaltado, de la liga, temporada y equipo del usuario
+    clave = (liga_a_mostrar_nombre, zona_a_mostrar_nombre, carrera['liga_id'], carrera['temporada'], carrera['equipo_id'])
+    final_response = cache_render.obtener('tabla', clave)
+    if final_response is None:
+        sello = cache_render.sello()
+        final_response, liga_id_mostrar = await database_async.leer(_texto_tabla, carrera, liga_a_mostrar_nombre, zona_a_mostrar_nombre)
+        if liga_id_mostrar is None:
+            await message.channel.send(final_response)
             return
+        cache_render.guardar('tabla', clave, final_response, [('clasificacion', liga_id_mostrar)], sello)
+    await salida.enviar_paginado(message.channel, final_response, autor_id=user_id)
+    return
 
-        # Intentar parsear el nombre de la liga del argumento
-        args = message.content.split(maxsplit=1)
-        liga_a_mostrar_nombre = None # Variable para almacenar el nombre de la liga si se especifica
 
-        if len(args) > 1:
-            arg_content = args[1].strip()
-            match = re.match(r'"([^"]*)"|\'([^\']*)\'|(\S+)', arg_content)
-            if match:
-                liga_a_mostrar_nombre = match.group(1) or match.group(2) or match.group(3)
-        
-        response_parts = []
+# --- Comando: !proyeccion (Monte Carlo del resto de la temporada) ---
+@enrutador.comando('!proyeccion')
+async def cmd_proyeccion(message, args):
+    user_id = message.author.id
+    carrera = await database_async.get_carrera_by_user(user_id)
+    if not carrera:
+        await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
+        return
 
-        if not liga_a_mostrar_nombre:
-            # Si no se especificó un nombre de liga, mostrar los títulos del equipo del usuario
-            equipo_del_usuario = database.get_equipo_by_id(carrera['equipo_id'])
-            if not equipo_del_usuario:
-                await message.channel.send("Error: No se pudo encontrar tu equipo. Contacta al administrador.")
-                return
+    # !proyeccion ["Nombre Liga"] [simulaciones]
+    simulaciones = proyecciones.SIMULACIONES
+    if args and args[-1].isdigit():
+        simulaciones = max(proyecciones.MIN_SIMULACIONES, min(proyecciones.MAX_SIMULACIONES, int(args[-1])))
+        args = args[:-1]
+    liga_id = carrera['liga_id']
+    if args:
+        liga_id = await database_async.get_liga_id(args[0])
+        if not liga_id:
+            await message.channel.send(f"La liga '{args[0]}' no fue encontrada. Asegúrate de escribirla exactamente como está registrada (ej. \"Brasileirão Serie A\").")
+            return
 
-            tus_titulos = database.get_campeonatos_equipo(equipo_del_usuario['id'])
+    clave = (liga_id, carrera['temporada'], simulaciones, carrera['equipo_id'])
+    final_response = cache_render.obtener('proyeccion', clave)
+    if final_response is None:
+        sello = cache_render.sello()
+        datos = await database_async.leer(proyecciones.preparar_proyeccion, liga_id, carrera['temporada'])
+        if not datos or not datos['equipos']:
+            await message.channel.send("Aún no hay tabla ni fixture para proyectar en esta liga. ¿Ya se generó el fixture?")
+            return
+        await message.channel.send(f"Simulando {simulaciones} veces lo que queda de la temporada...")
+        # La simulación corre en un hilo de fondo; los datos ya se leyeron acá, en el mundo del usuario
+        resultado = await proyecciones.proyectar(datos, simulaciones)
+        lineas = proyecciones.formatear_proyeccion(datos, resultado, simulaciones, equipo_usuario_id=carrera['equipo_id'])
+        final_response = cache_render.guardar('proyeccion', clave, "\n".join(lineas),
+                                              [('clasificacion', liga_id), ('partidos', liga_id), ('fixture', liga_id)], sello)
+    await salida.enviar_paginado(message.channel, final_response, autor_id=user_id)
+    return
+
+
+# --- Comando: !goleadores (goles y asistencias de la temporada) ---
+@enrutador.comando('!goleadores')
+async def cmd_goleadores(message, args):
+    user_id = message.author.id
+    carrera = await database_async.get_carrera_by_user(user_id)
+    if not carrera:
+        await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
+        return
 
-            if not tus_titulos:
-                response_parts.append(f"🏆 **Palmarés de tu equipo ({equipo_del_usuario['nombre']}):**\n")
-                response_parts.append("Aún no has ganado ningún título. ¡Sigue esforzándote!")
-            else:
-                response_parts.append(f"🏆 **Palmarés de tu equipo ({equipo_del_usuario['nombre']}):**\n")
-                for titulo in tus_titulos:
-                    response_parts.append(f"- Temporada {titulo['temporada']}: Campeón de **{titulo['liga_nombre']}**")
-                # Aquí podrías añadir un else para copas si las implementas más adelante
-                # Por ejemplo: if not tus_copas: response_parts.append("Aún no tienes copas.")
-                # else: for copa in tus_copas: response_parts.append(f"- Temporada {copa['temporada']}: {copa['nombre_copa']}")
+    # !goleadores ["Nombre Liga"]
+    liga_id = carrera['liga_id']
+    if args:
+        liga_id = await database_async.get_liga_id(args[0])
+        if not liga_id:
+            await message.channel.send(f"La liga '{args[0]}' no fue encontrada. Asegúrate de escribirla exactamente como está registrada (ej. \"Brasileirão Serie A\").")
+            return
 
-        else:
-            # Si se especificó un nombre de liga, mostrar el palmarés de esa liga (comportamiento actual)
-            liga_id_mostrar = database.get_liga_id(liga_a_mostrar_nombre)
-            if not liga_id_mostrar:
-                await message.channel.send(f"La liga '{liga_a_mostrar_nombre}' no fue encontrada. Asegúrate de escribirla exactamente como está registrada (ej. \"Brasileirão Serie A\").")
-                return
-            liga_details_mostrar = database.get_liga_by_id(liga_id_mostrar) #
-
-            palmares_liga = database.get_palmares_liga(liga_id_mostrar) #
-
-            if not palmares_liga:
-                response_parts.append(f"🏆 **Palmarés de la {liga_details_mostrar['nombre']}** 🏆\n")
-                response_parts.append("Aún no hay campeones registrados para esta liga.")
-            else:
-                response_parts.append(f"🏆 **Palmarés de la {liga_details_mostrar['nombre']}** 🏆\n")
-                for entry in palmares_liga:
-                    response_parts.append(f"- Temporada {entry['temporada']}: **{entry['equipo_campeon_nombre']}**")
-        
-        final_response = "\n".join(response_parts)
-        if len(final_response) > 1900:
-            await message.channel.send("El palmarés es muy extenso. Aquí está la primera parte:\n")
-            await message.channel.send(final_response[:1900] + "...")
-        else:
-            await message.channel.send(final_response)
+    clave = (liga_id, carrera['temporada'])
+    final_response = cache_render.obtener('goleadores', clave)
+    if final_response is None:
+        sello = cache_render.sello()
+        goleadores = await database_async.get_goleadores_liga(liga_id, carrera['temporada'], limit=15)
+        if not goleadores:
+            await message.channel.send("Todavía no hay goles registrados en esta liga esta temporada.")
+            return
+        asistidores = await database_async.get_goleadores_liga(liga_id, carrera['temporada'], limit=10, por='asistencias')
+        liga = await database_async.get_liga_by_id(liga_id)
+        lineas = [f"**Goleadores - {liga['nombre']} (Temporada {carrera['temporada']})**", "```"]
+        for i, jugador in enumerate(goleadores):
+            lineas.append(f"{str(i + 1).rjust(2)}. {(jugador['nombre'] or 'Retirado')[:24].ljust(24)} {(jugador['equipo_nombre'] or '')[:20].ljust(20)} {str(jugador['goles']).rjust(3)} G {str(jugador['asistencias']).rjust(3)} A")
+        lineas.append("```")
+        if asistidores:
+            lineas += ["**Asistidores**", "```"]
+            for i, jugador in enumerate(asistidores):
+                lineas.append(f"{str(i + 1).rjust(2)}. {(jugador['nombre'] or 'Retirado')[:24].ljust(24)} {(jugador['equipo_nombre'] or '')[:20].ljust(20)} {str(jugador['asistencias']).rjust(3)} A {str(jugador['goles']).rjust(3)} G")
+            lineas.append("```")
+        final_response = cache_render.guardar('goleadores', clave, "\n".join(lineas), [('partidos', liga_id)], sello)
+    await salida.enviar_paginado(message.channel, final_response, autor_id=user_id)
+    return
+
+
+# --- NUEVO COMANDO: !palmares (MODIFICADO para incluir títulos del usuario) ---
+@enrutador.comando('!palmares')
+async def cmd_palmares(message, args):
+    user_id = message.author.id
+    carrera = await database_async.get_carrera_by_user(user_id)
+    if not carrera:
+        await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar.")
         return
 
+    # Nombre de la liga si se especifica como argumento
+    liga_a_mostrar_nombre = args[0] if args else None
 
-    # --- Comando: !fichar (MODIFICADO para incluir cartel de seguridad) ---
-    if message.content.startswith('!fichar '):
-        carrera = database.get_carrera_by_user(user_id)
-        if not carrera:
-            await message.channel.send("No tienes una carrera iniciada para fichar jugadores. Usa `!iniciar_carrera`.")
-            return
+    response_parts = []
 
-        if not market_logic.es_mercado_abierto(user_id):
-            await message.channel.send("El mercado de pases no está abierto en este momento. Espera a que se abra para hacer ofertas.")
-            print(f"DEBUG: Intento de fichar con mercado cerrado para user_id {user_id}. Es mercado abierto? {market_logic.es_mercado_abierto(user_id)}") # AÑADE ESTA LÍNEA
+    if not liga_a_mostrar_nombre:
+        # Si no se especificó un nombre de liga, mostrar los títulos del equipo del usuario
+        equipo_del_usuario = await database_async.get_equipo_by_id(carrera['equipo_id'])
+        if not equipo_del_usuario:
+            await message.channel.send("Error: No se pudo encontrar tu equipo. Contacta al administrador.")
             return
 
-        if user_id in setup_state and setup_state[user_id].get('step') == 'confirm_fichar':
-            del setup_state[user_id]
+        tus_titulos = await database_async.get_campeonatos_equipo(equipo_del_usuario['id'])
 
-        args_str = message.content[len('!fichar '):].strip()
-        
-        matches = re.findall(r'"([^"]*)"(?:\s+"([^"]*)")?\s+(\d+)', args_str)
+        if not tus_titulos:
+            response_parts.append(f"🏆 **Palmarés de tu equipo ({equipo_del_usuario['nombre']}):**\n")
+            response_parts.append("Aún no has ganado ningún título. ¡Sigue esforzándote!")
+        else:
+            response_parts.append(f"🏆 **Palmarés de tu equipo ({equipo_del_usuario['nombre']}):**\n")
+            for titulo in tus_titulos:
+                response_parts.append(f"- Temporada {titulo['temporada']}: Campeón de **{titulo['liga_nombre']}**")
+            # Aquí podrías añadir un else para copas si las implementas más adelante
+            # Por ejemplo: if not tus_copas: response_parts.append("Aún no tienes copas.")
+            # else: for copa in tus_copas: response_parts.append(f"- Temporada {copa['temporada']}: {copa['nombre_copa']}")
+
+    else:
+        # Si se especificó un nombre de liga, mostrar el palmarés de esa liga (comportamiento actual)
+        liga_id_mostrar = await database_async.get_liga_id(liga_a_mostrar_nombre)
+        if not liga_id_mostrar:
+            await message.channel.send(f"La liga '{liga_a_mostrar_nombre}' no fue encontrada. Asegúrate de escribirla exactamente como está registrada (ej. \"Brasileirão Serie A\").")
+            return
+        liga_details_mostrar = await database_async.get_liga_by_id(liga_id_mostrar) #
 
-        jugador_nombre = None
-        equipo_vendedor_nombre = None
-        monto_oferta_str = None
+        palmares_liga = await database_async.get_palmares_liga(liga_id_mostrar) #
 
-        if matches and len(matches[0]) == 3:
-            jugador_nombre, equipo_vendedor_nombre, monto_oferta_str = matches[0]
+        if not palmares_liga:
+            response_parts.append(f"🏆 **Palmarés de la {liga_details_mostrar['nombre']}** 🏆\n")
+            response_parts.append("Aún no hay campeones registrados para esta liga.")
         else:
-            parts = args_str.split()
-            if len(parts) >= 3:
-                try:
-                    monto_oferta = int(parts[-1])
-                    jugador_nombre = " ".join(parts[:-2])
-                    equipo_vendedor_nombre = parts[-2]
-                except ValueError:
-                    if len(parts) == 3:
-                        jugador_nombre = parts[0]
-                        equipo_vendedor_nombre = parts[1]
-                        monto_oferta_str = parts[2]
-            
-        if not jugador_nombre or not equipo_vendedor_nombre or not monto_oferta_str:
-            await message.channel.send("Formato incorrecto. Usa `!fichar \"Nombre Jugador\" \"Nombre Equipo Vendedor\" Monto`.\nEj: `!fichar \"Lionel Messi\" \"Inter Miami\" 100000000`")
-            return
+            response_parts.append(f"🏆 **Palmarés de la {liga_details_mostrar['nombre']}** 🏆\n")
+            for entry in palmares_liga:
+                response_parts.append(f"- Temporada {entry['temporada']}: **{entry['equipo_campeon_nombre']}**")
+    
+    final_response = "\n".join(response_parts)
+    await salida.enviar_paginado(message.channel, final_response, autor_id=user_id)
+    return
 
-        try:
-            monto_oferta = int(monto_oferta_str)
-        except ValueError:
-            await message.channel.send("El monto de la oferta debe ser un número entero válido.")
-            return
 
-        if monto_oferta <= 0:
-            await message.channel.send("El monto de la oferta debe ser un número positivo.")
-            return
+# --- Comando: !fichar (MODIFICADO para incluir cartel de seguridad) ---
+@enrutador.comando('!fichar')
+async def cmd_fichar(message, args):
+    user_id = message.author.id
+    carrera = await database_async.get_carrera_by_user(user_id)
+    if not carrera:
+        await message.channel.send("No tienes una carrera iniciada para fichar jugadores. Usa `!iniciar_carrera`.")
+        return
 
-        equipo_vendedor_details = database.get_equipo_by_name(equipo_vendedor_nombre)
-        if not equipo_vendedor_details:
-            await message.channel.send(f"Error: El equipo '{equipo_vendedor_nombre}' no fue encontrado. Asegúrate de escribirlo correctamente.")
-            return
+    if not await database_async.leer(market_logic.es_mercado_abierto, user_id):
+        await message.channel.send("El mercado de pases no está abierto en este momento. Espera a que se abra para hacer ofertas.")
+        return
 
-        jugador_obj_from_db = database.get_jugador_by_name_and_team(jugador_nombre, equipo_vendedor_details['id'])
-        if not jugador_obj_from_db:
-            await message.channel.send(f"Error: El jugador '{jugador_nombre}' no fue encontrado en el equipo '{equipo_vendedor_nombre}'.")
-            return
-        
-        valor_mercado_estimado = market_logic.calcular_valor_mercado(jugador_obj_from_db)
-        
-        probabilidad_aceptacion = 0.15 
-        if monto_oferta >= valor_mercado_estimado * 1.5:
-            probabilidad_aceptacion = 0.95
-        elif monto_oferta >= valor_mercado_estimado * 1.2:
-            probabilidad_aceptacion = 0.75
-        elif monto_oferta >= valor_mercado_estimado * 1.05:
-            probabilidad_aceptacion = 0.5
-        
-        probabilidad_porcentaje = int(probabilidad_aceptacion * 100)
+    estado_previo = await setup_state.obtener(user_id)
+    if estado_previo and estado_previo.get('step') == 'confirm_fichar':
+        del setup_state[user_id]
 
-        setup_state[user_id] = {
-            'step': 'confirm_fichar',
-            'jugador_id': jugador_obj_from_db['id'],
-            'jugador_nombre': jugador_obj_from_db['nombre'],
-            'equipo_vendedor_nombre': equipo_vendedor_details['nombre'],
-            'monto_oferta': monto_oferta,
-            'probabilidad_aceptacion': probabilidad_porcentaje
-        }
+    jugador_nombre = None
+    equipo_vendedor_nombre = None
+    monto_oferta_str = None
+
+    # "Nombre Jugador" "Equipo" Monto; sin comillas, el equipo es la penúltima palabra y el resto es el jugador
+    if len(args) >= 3:
+        jugador_nombre = " ".join(args[:-2])
+        equipo_vendedor_nombre = args[-2]
+        monto_oferta_str = args[-1]
+
+    if not jugador_nombre or not equipo_vendedor_nombre or not monto_oferta_str:
+        await message.channel.send("Formato incorrecto. Usa `!fichar \"Nombre Jugador\" \"Nombre Equipo Vendedor\" Monto`.\nEj: `!fichar \"Lionel Messi\" \"Inter Miami\" 100000000`")
+        return
+
+    try:
+        monto_oferta = int(monto_oferta_str)
+    except ValueError:
+        await message.channel.send("El monto de la oferta debe ser un número entero válido.")
+        return
+
+    if monto_oferta <= 0:
+        await message.channel.send("El monto de la oferta debe ser un número positivo.")
+        return
 
-        confirmation_message = (
-            f"Estás a punto de ofrecer **{market_logic.format_money(monto_oferta)}** "
-            f"por **{jugador_obj_from_db['nombre']}** ({jugador_obj_from_db['posicion']}, OVR: {jugador_obj_from_db['valoracion']}, Valor de Mercado: {market_logic.format_money(valor_mercado_estimado)}) "
-            f"del **{equipo_vendedor_details['nombre']}**.\n\n"
-            f"**Probabilidad estimada de que la oferta sea aceptada: {probabilidad_porcentaje}%**\n\n"
-            f"¿Confirmas esta oferta? Responde `si` para confirmar o `no` para cancelar."
+    equipo_vendedor_details = await database_async.get_equipo_by_name(equipo_vendedor_nombre)
+    if not equipo_vendedor_details:
+        await message.channel.send(f"Error: El equipo '{equipo_vendedor_nombre}' no fue encontrado. Asegúrate de escribirlo correctamente.")
+        return
+
+    jugador_obj_from_db = await database_async.get_jugador_by_name_and_team(jugador_nombre, equipo_vendedor_details['id'])
+    if not jugador_obj_from_db:
+        await message.channel.send(f"Error: El jugador '{jugador_nombre}' no fue encontrado en el equipo '{equipo_vendedor_nombre}'.")
+        return
+    
+    valor_mercado_estimado = market_logic.calcular_valor_mercado(jugador_obj_from_db)
+    
+    probabilidad_aceptacion = 0.15 
+    if monto_oferta >= valor_mercado_estimado * 1.5:
+        probabilidad_aceptacion = 0.95
+    elif monto_oferta >= valor_mercado_estimado * 1.2:
+        probabilidad_aceptacion = 0.75
+    elif monto_oferta >= valor_mercado_estimado * 1.05:
+        probabilidad_aceptacion = 0.5
+    
+    probabilidad_porcentaje = int(probabilidad_aceptacion * 100)
+
+    setup_state[user_id] = {
+        'step': 'confirm_fichar',
+        'jugador_id': jugador_obj_from_db['id'],
+        'jugador_nombre': jugador_obj_from_db['nombre'],
+        'equipo_vendedor_nombre': equipo_vendedor_details['nombre'],
+        'monto_oferta': monto_oferta,
+        'probabilidad_aceptacion': probabilidad_porcentaje
+    }
+
+    confirmation_message = (
+        f"Estás a punto de ofrecer **{market_logic.format_money(monto_oferta)}** "
+        f"por **{jugador_obj_from_db['nombre']}** ({jugador_obj_from_db['posicion']}, OVR: {jugador_obj_from_db['valoracion']}, Valor de Mercado: {market_logic.format_money(valor_mercado_estimado)}) "
+        f"del **{equipo_vendedor_details['nombre']}**.\n\n"
+        f"**Probabilidad estimada de que la oferta sea aceptada: {probabilidad_porcentaje}%**\n\n"
+        f"¿Confirmas esta oferta? Responde `si` para confirmar o `no` para cancelar."
+    )
+    await message.channel.send(confirmation_message)
+    return
+
+
+@enrutador.comando('!ofertas_recibidas')
+async def cmd_ofertas_recibidas(message, args):
+    user_id = message.author.id
+    carrera = await database_async.get_carrera_by_user(user_id)
+    if not carrera:
+        await message.channel.send("No tienes una carrera activa.")
+        return
+
+    if not await database_async.leer(market_logic.es_mercado_abierto, user_id):
+        await message.channel.send("El mercado de pases no está abierto en este momento.")
+        return
+
+    ofertas = await database_async.get_ofertas_por_equipo(carrera['equipo_id']) 
+    if not ofertas:
+        await message.channel.send("No tienes ofertas de transferencia pendientes.")
+        return
+
+    response_msg = "**Ofertas de Transferencia Recibidas:**\n"
+    for oferta in ofertas:
+        response_msg += (
+            f"ID: `{oferta['id']}` - "
+            f"**{oferta['equipo_oferta_nombre']}** oferta **{market_logic.format_money(oferta['monto'])}** "
+            f"por **{oferta['jugador_nombre']}** (OVR: {oferta['jugador_valoracion']}).\n"
         )
-        await message.channel.send(confirmation_message)
+    response_msg += "\nUsa `!aceptar_oferta [ID]` o `!rechazar_oferta [ID]`."
+    await message.channel.send(response_msg)
+    return # Añade return
+
+
+# --- Comando: !aceptar_oferta ---
+@enrutador.comando('!aceptar_oferta')
+async def cmd_aceptar_oferta(message, args):
+    user_id = message.author.id
+    try:
+        oferta_id = int(args[0])
+    except (ValueError, IndexError):
+        await message.channel.send("Formato incorrecto. Usa `!aceptar_oferta [ID_Oferta]`.")
         return
+    
+    response_msg = await database_async.escribir(market_logic.procesar_respuesta_oferta_ia_a_usuario, user_id, oferta_id, True)
+    await message.channel.send(response_msg)
+    return # Añade return
 
-    if message.content == '!ofertas_recibidas':
-        carrera = database.get_carrera_by_user(user_id)
-        if not carrera:
-            await message.channel.send("No tienes una carrera activa.")
-            return
 
-        if not market_logic.es_mercado_abierto(user_id):
-            await message.channel.send("El mercado de pases no está abierto en este momento.")
-            return
+# --- Comando: !rechazar_oferta ---
+@enrutador.comando('!rechazar_oferta')
+async def cmd_rechazar_oferta(message, args):
+    user_id = message.author.id
+    try:
+        oferta_id = int(args[0])
+    except (ValueError, IndexError):
+        await message.channel.send("Formato incorrecto. Usa `!rechazar_oferta [ID_Oferta]`.")
+        return
+    
+    response_msg = await database_async.escribir(market_logic.procesar_respuesta_oferta_ia_a_usuario, user_id, oferta_id, False)
+    await message.channel.send(response_msg)
+    return # Añade return
 
-        ofertas = database.get_ofertas_por_equipo(carrera['equipo_id']) 
-        if not ofertas:
-            await message.channel.send("No tienes ofertas de transferencia pendientes.")
-            return
 
-        response_msg = "**Ofertas de Transferencia Recibidas:**\n"
-        for oferta in ofertas:
-            response_msg += (
-                f"ID: `{oferta['id']}` - "
-                f"**{oferta['equipo_oferta_nombre']}** oferta **{market_logic.format_money(oferta['monto'])}** "
-                f"por **{oferta['jugador_nombre']}** (OVR: {oferta['jugador_valoracion']}).\n"
-            )
-        response_msg += "\nUsa `!aceptar_oferta [ID]` o `!rechazar_oferta [ID]`."
-        await message.channel.send(response_msg)
-        return # Añade return
-
-    # --- Comando: !aceptar_oferta ---
-    if message.content.startswith('!aceptar_oferta '):
-        try:
-            oferta_id = int(message.content.split(' ')[1])
-        except (ValueError, IndexError):
-            await message.channel.send("Formato incorrecto. Usa `!aceptar_oferta [ID_Oferta]`.")
-            return
-        
-        response_msg = market_logic.procesar_respuesta_oferta_ia_a_usuario(user_id, oferta_id, True)
-        await message.channel.send(response_msg)
-        return # Añade return
-
-    # --- Comando: !rechazar_oferta ---
-    if message.content.startswith('!rechazar_oferta '):
-        try:
-            oferta_id = int(message.content.split(' ')[1])
-        except (ValueError, IndexError):
-            await message.channel.send("Formato incorrecto. Usa `!rechazar_oferta [ID_Oferta]`.")
-            return
-        
-        response_msg = market_logic.procesar_respuesta_oferta_ia_a_usuario(user_id, oferta_id, False)
-        await message.channel.send(response_msg)
-        return # Añade return
-
-    # --- NUEVO COMANDO: !presupuesto ---
-    if message.content == '!presupuesto':
-        carrera = database.get_carrera_by_user(user_id)
-        if not carrera:
-            await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar y ver tu presupuesto.")
-            return
+# --- NUEVO COMANDO: !presupuesto ---
+@enrutador.comando('!presupuesto')
+async def cmd_presupuesto(message, args):
+    user_id = message.author.id
+    carrera = await database_async.get_carrera_by_user(user_id)
+    if not carrera:
+        await message.channel.send("No tienes una carrera iniciada. Usa `!iniciar_carrera` para comenzar y ver tu presupuesto.")
+        return
+
+    presupuesto_actual = carrera['presupuesto']
+    presupuesto_formateado = market_logic.format_money(presupuesto_actual)
 
-        presupuesto_actual = carrera['presupuesto']
-        presupuesto_formateado = market_logic.format_money(presupuesto_actual)
+    await message.channel.send(f"Tu presupuesto actual es de **{presupuesto_formateado}**.")
+    return # Añade return
+
+
+@bot.event
+async def on_message(message):
+    if message.author == bot.user:
+        return
+
+    # Los mensajes que no son un comando ni responden a un paso pendiente no tocan ningún mundo
+    estado = await setup_state.obtener(message.author.id)
+    if not enrutador.atiende(message, estado):
+        return
+
+    # Cada carrera tiene su propio mundo (base de datos); queda activo solo para esta tarea.
+    # Una carrera anterior a los mundos se pasa a uno propio antes de seguir jugando.
+    await database_async.usar_mundo(message.author.id)
+
+    # Los pasos de confirmación (si/no) se atienden antes que cualquier comando
+    await enrutador.despachar(message, estado)
+
+
+# --- Comando: !metricas (llamadas, errores y latencia por comando) ---
+_dueño_bot_id = None
+
+async def _es_administrador(message):
+    """True si el autor es el dueño de la aplicación del bot o tiene permiso de administrador en el servidor."""
+    global _dueño_bot_id
+    permisos = getattr(message.author, 'guild_permissions', None) # Solo existe en mensajes de un servidor
+    if permisos and permisos.administrator:
+        return True
+    if _dueño_bot_id is None:
+        _dueño_bot_id = (await bot.application_info()).owner.id
+    return message.author.id == _dueño_bot_id
+
+@enrutador.comando('!metricas')
+async def cmd_metricas(message, args):
+    if not await _es_administrador(message):
+        await message.channel.send("Solo el dueño del bot o un administrador del servidor puede ver las métricas.")
+        return
+    lineas = enrutador.resumen_metricas()
+    if not lineas:
+        await message.channel.send("Aún no hay métricas de comandos.")
+        return
+    await salida.enviar_paginado(message.channel, ["**Métricas de comandos:**", "```", *lineas, cache_entidades.resumen(), "```"],
+                                 autor_id=message.author.id)
 
-        await message.channel.send(f"Tu presupuesto actual es de **{presupuesto_formateado}**.")
-        return # Añade return
 
 # Inicia el bot usando el token
 bot.run(TOKEN)
\ No newline at end of file
@@ -0,0 +1,179 @@
+# modelos_partido.py
+
+import array
+import functools
+import math
+import os
+import random
+
+import database
+
+# Modelos de partido. Un modelo se define con dos funciones:
+# - 'fuerza'(nivel_general, jugadores): la fuerza de un equipo a partir de su plantilla
+#   (jugadores = [(posicion, valoracion), ...]); debe ser hashable.
+# - 'distribucion'(fuerza_local, fuerza_visitante): [((goles_local, goles_visitante), probabilidad), ...].
+# Más 'nivel'(fuerza) -> número, para desempates (ej. el partido eliminatorio).
+#
+# El sorteo es común a todos los modelos: la distribución de cada cruce se convierte una vez
+# en una tabla de 4096 casilleros (probabilidades redondeadas a 1/4096) y sortear un resultado
+# es leer un casillero al azar. sortear() da un resultado y sortear_lote() miles de una vez,
+# sin bucles en Python; los usan el día a día, la temporada de la IA y las proyecciones.
+#
+# El modelo activo sale de la variable de entorno MODELO_PARTIDO ('poisson' por defecto,
+# 'uniforme' = el simulador original).
+
+MODELO_POR_DEFECTO = 'poisson'
+
+# Marcadores posibles: de 0 a MAX_GOLES goles por equipo; cada resultado se guarda por su índice
+MAX_GOLES = 9
+RESULTADOS = [(goles_local, goles_visitante) for goles_local in range(MAX_GOLES + 1) for goles_visitante in range(MAX_GOLES + 1)]
+_INDICE_RESULTADO = {resultado: i for i, resultado in enumerate(RESULTADOS)}
+
+BITS_SORTEO = 12
+RESOLUCION_SORTEO = 1 << BITS_SORTEO
+_MASCARA_SORTEO = RESOLUCION_SORTEO - 1
+
+# --- Modelo uniforme (el original de simular_partido) ---
+
+def _fuerza_uniforme(nivel_general, jugadores):
+    return nivel_general
+
+def _distribucion_uniforme(ovr1, ovr2):
+    """
+    Distribución exacta del simulador original: gana el local con probabilidad p según la
+    diferencia de OVR; el ganador hace 1-4 goles y el perdedor menos; el empate, 0-3 cada uno.
+    """
+    prob_victoria_1 = max(0.1, min(0.9, 0.5 + ((ovr1 - ovr2) / 100 * 0.2)))
+    # Mismos cortes que el original: gana 1 si rand < p, gana 2 si rand > 1 - p (y no ganó 1), si no empate
+    prob_victoria_2 = 1 - max(prob_victoria_1, 1 - prob_victoria_1)
+    prob_empate = 1 - prob_victoria_1 - prob_victoria_2
+
+    distribucion = []
+    for goles_ganador in range(1, 5):
+        for goles_perdedor in range(goles_ganador):
+            prob = 1 / 4 / goles_ganador
+            distribucion.append(((goles_ganador, goles_perdedor), prob_victoria_1 * prob))
+            distribucion.append(((goles_perdedor, goles_ganador), prob_victoria_2 * prob))
+    if prob_empate > 0:
+        distribucion.extend(((goles, goles), prob_empate / 4) for goles in range(4))
+    return distribucion
+
+# --- Modelo Poisson (goles esperados por ataque/defensa) ---
+
+# Goles esperados de un equipo contra un rival parejo, en cancha neutral
+GOLES_BASE = 1.25
+# Multiplicador de los goles esperados del local
+VENTAJA_LOCAL = 1.15
+# Cuánto cambian los goles esperados por cada punto de diferencia entre ataque y defensa rival
+FACTOR_DIFERENCIA = 0.06
+
+# Líneas del equipo: posiciones y cuántos titulares se promedian
+LINEAS = {
+    'arco': ({'Portero'}, 1),
+    'defensa': ({'Defensa', 'Defensa central', 'Lateral derecho', 'Lateral izquierdo'}, 4),
+    'medio': ({'Pivote', 'Mediocentro', 'Centrocampista', 'Interior derecho', 'Interior izquierdo',
+               'Mediocentro ofensivo', 'Mediapunta'}, 3),
+    'ataque': ({'Delantero', 'Delantero centro', 'Extremo derecho', 'Extremo izquierdo'}, 3),
+}
+
+def _promedio_linea(jugadores, posiciones, titulares, nivel_general):
+    """Promedio de los mejores de la línea; los puestos sin jugador cuentan con el nivel del equipo."""
+    valoraciones = sorted((v for posicion, v in jugadores if posicion in posiciones and v is not None), reverse=True)[:titulares]
+    valoraciones += [nivel_general] * (titulares - len(valoraciones))
+    return sum(valoraciones) / titulares
+
+def _fuerza_poisson(nivel_general, jugadores):
+    """(ataque, defensa) del equipo, redondeados a medio punto para que los cruces parecidos compartan tabla."""
+    lineas = {nombre: _promedio_linea(jugadores, posiciones, titulares, nivel_general)
+              for nombre, (posiciones, titulares) in LINEAS.items()}
+    ataque = 0.65 * lineas['ataque'] + 0.35 * lineas['medio']
+    defensa = 0.6 * lineas['defensa'] + 0.25 * lineas['arco'] + 0.15 * lineas['medio']
+    return round(ataque * 2) / 2, round(defensa * 2) / 2
+
+def _poisson(lam):
+    probs = [math.exp(-lam)]
+    for goles in range(1, MAX_GOLES + 1):
+        probs.append(probs[-1] * lam / goles)
+    return probs
+
+def _distribucion_poisson(fuerza_local, fuerza_visitante):
+    """Goles de cada equipo como Poisson independientes, cortadas en MAX_GOLES y renormalizadas."""
+    ataque_local, defensa_local = fuerza_local
+    ataque_visitante, defensa_visitante = fuerza_visitante
+    lam_local = GOLES_BASE * VENTAJA_LOCAL * math.exp(FACTOR_DIFERENCIA * (ataque_local - defensa_visitante))
+    lam_visitante = GOLES_BASE * math.exp(FACTOR_DIFERENCIA * (ataque_visitante - defensa_local))
+    probs_local, probs_visitante = _poisson(lam_local), _poisson(lam_visitante)
+    total = sum(probs_local) * sum(probs_visitante)
+    return [((gl, gv), probs_local[gl] * probs_visitante[gv] / total) for gl, gv in RESULTADOS]
+
+MODELOS = {
+    'uniforme': {'fuerza': _fuerza_uniforme, 'distribucion': _distribucion_uniforme, 'nivel': lambda fuerza: fuerza},
+    'poisson': {'fuerza': _fuerza_poisson, 'distribucion': _distribucion_poisson, 'nivel': lambda fuerza: sum(fuerza) / 2},
+}
+
+def nombre_modelo_activo():
+    nombre = os.getenv('MODELO_PARTIDO', MODELO_POR_DEFECTO)
+    return nombre if nombre in MODELOS else MODELO_POR_DEFECTO
+
+def modelo_activo():
+    return MODELOS[nombre_modelo_activo()]
+
+# --- Fuerzas de los equipos ---
+
+def _fuerzas_desde_filas(filas, modelo):
+    plantillas = {}
+    for fila in filas:
+        nivel, jugadores = plantillas.setdefault(fila['equipo_id'], (fila['nivel_general'], []))
+        if fila['posicion'] is not None:
+            jugadores.append((fila['posicion'], fila['valoracion']))
+    return {equipo_id: modelo['fuerza'](nivel, jugadores) for equipo_id, (nivel, jugadores) in plantillas.items()}
+
+def fuerzas_desde_filas(filas):
+    """{equipo_id: fuerza} con el modelo activo a partir de filas de database.get_valoraciones_plantillas ya leídas."""
+    return _fuerzas_desde_filas(filas, modelo_activo())
+
+def fuerzas_liga(liga_id, conn=None):
+    """{equipo_id: fuerza} de todos los equipos de la liga con el modelo activo (una consulta)."""
+    return _fuerzas_desde_filas(database.get_valoraciones_plantillas(liga_id=liga_id, conn=conn), modelo_activo())
+
+def fuerzas_equipos(equipo_ids, conn=None):
+    """{equipo_id: fuerza} de los equipos dados con el modelo activo (una consulta)."""
+    return _fuerzas_desde_filas(database.get_valoraciones_plantillas(equipo_ids=equipo_ids, conn=conn), modelo_activo())
+
+def nivel(fuerza):
+    """Número comparable de la fuerza (mayor = mejor), para desempates."""
+    return modelo_activo()['nivel'](fuerza)
+
+# --- Sorteo común ---
+
+def distribucion(fuerza_local, fuerza_visitante):
+    return modelo_activo()['distribucion'](fuerza_local, fuerza_visitante)
+
+@functools.lru_cache(maxsize=4096)
+def _tabla_sorteo(nombre_modelo, fuerza_local, fuerza_visitante):
+    tabla = bytearray()
+    acumulado = 0.0
+    for resultado, prob in MODELOS[nombre_modelo]['distribucion'](fuerza_local, fuerza_visitante):
+        acumulado += prob
+        cantidad = min(RESOLUCION_SORTEO, round(acumulado * RESOLUCION_SORTEO)) - len(tabla)
+        if cantidad > 0:
+            tabla.extend([_INDICE_RESULTADO[resultado]] * cantidad)
+    tabla.extend(tabla[-1:] * (RESOLUCION_SORTEO - len(tabla))) # Redondeo: el último resultado completa la tabla
+    return bytes(tabla)
+
+def tabla_sorteo(fuerza_local, fuerza_visitante):
+    """
+    bytes de RESOLUCION_SORTEO casilleros con índices de RESULTADOS, repartidos según la
+    distribución del cruce con el modelo activo. Se calcula una vez por cruce.
+    """
+    return _tabla_sorteo(nombre_modelo_activo(), fuerza_local, fuerza_visitante)
+
+def sortear(fuerza_local, fuerza_visitante):
+    """Un resultado (goles_local, goles_visitante) del cruce."""
+    return RESULTADOS[tabla_sorteo(fuerza_local, fuerza_visitante)[random.getrandbits(BITS_SORTEO)]]
+
+def sortear_lote(fuerza_local, fuerza_visitante, cantidad):
+    """Lista de `cantidad` índices de RESULTADOS sorteados para el cruce (un sorteo de 12 bits cada uno)."""
+    tabla = tabla_sorteo(fuerza_local, fuerza_visitante)
+    azar = array.array('H', random.randbytes(2 * cantidad))
+    return list(map(tabla.__getitem__, map(_MASCARA_SORTEO.__and__, azar)))
@@ -0,0 +1,193 @@
+# progresion.py
+
+import random
+from collections import Counter
+
+import database
+
+# Progresión de fin de temporada: todos los jugadores cumplen un año y su valoración sube o
+# baja según la edad y el nivel de la liga; los veteranos se retiran y cada retirado deja su
+# lugar a un juvenil del mismo equipo y puesto. Es una sola pasada en memoria sobre todos los
+# jugadores (una consulta) y una sola escritura (database.guardar_progresion_temporada), con
+# el nivel_general de cada equipo recalculado al final.
+
+# (edad máxima, cambio mínimo, cambio máximo) de la valoración por temporada, con la edad ya cumplida
+CURVA_EDAD = [
+    (19, 1, 5),
+    (21, 1, 4),
+    (23, 0, 3),
+    (26, -1, 2),
+    (29, -1, 1),
+    (31, -2, 1),
+    (33, -3, 0),
+    (99, -5, -1),
+]
+
+# Bandas de liga por valoración media: (media mínima, nombre, techo de crecimiento, factor de crecimiento)
+# En las ligas fuertes los jugadores mejoran más y hasta más arriba.
+BANDAS_LIGA = [
+    (75, 'alta', 92, 1.25),
+    (67, 'media', 85, 1.0),
+    (0, 'baja', 80, 0.8),
+]
+
+# Probabilidad de retiro por edad (con la edad ya cumplida); desde la última edad de la lista, esa
+PROB_RETIRO = {32: 0.05, 33: 0.1, 34: 0.2, 35: 0.35, 36: 0.5, 37: 0.65, 38: 0.85}
+# Por debajo de esta valoración, desde EDAD_RETIRO_BAJO_NIVEL se retiran seguro
+VALORACION_MINIMA = 50
+EDAD_RETIRO_BAJO_NIVEL = 28
+
+EDAD_JUVENIL = (17, 19)
+# Los juveniles entran entre 4 y 12 puntos por debajo de la media de su equipo
+DIFERENCIA_JUVENIL = (4, 12)
+VALORACION_MIN, VALORACION_MAX = 40, 99
+# El nivel_general de un equipo es la media de sus mejores TITULARES jugadores
+TITULARES = 11
+
+def _banda(media):
+    for minima, nombre, techo, factor in BANDAS_LIGA:
+        if media >= minima:
+            return nombre, techo, factor
+    return BANDAS_LIGA[-1][1:]
+
+def _cambios_posibles(edad, factor):
+    """Cambios de valoración equiprobables para la edad; las subidas se escalan por la banda de la liga."""
+    for edad_max, minimo, maximo in CURVA_EDAD:
+        if edad <= edad_max:
+            return tuple(round(d * factor) if d > 0 else d for d in range(minimo, maximo + 1))
+    return (0,)
+
+def _prob_retiro(edad):
+    if edad >= max(PROB_RETIRO):
+        return PROB_RETIRO[max(PROB_RETIRO)]
+    return PROB_RETIRO.get(edad, 0.0)
+
+def _limitar(valoracion, minimo=VALORACION_MIN, maximo=VALORACION_MAX):
+    return max(minimo, min(maximo, valoracion))
+
+def _nombres_por_nacionalidad(jugadores):
+    """{nacionalidad: (nombres, apellidos)} sacados de la propia base, para nombrar a los juveniles."""
+    pools = {}
+    for j in jugadores:
+        partes = j['nombre'].lstrip('\ufeff').split()
+        if len(partes) >= 2:
+            nombres, apellidos = pools.setdefault(j['nacionalidad'], ([], []))
+            nombres.append(partes[0])
+            apellidos.append(partes[-1])
+    return pools
+
+def _anio_referencia(jugadores):
+    """Año "actual" de los datos: el más común de año de nacimiento + edad."""
+    anios = Counter(int(j['fecha_nacimiento'][:4]) + j['edad']
+                    for j in jugadores if j['fecha_nacimiento'] and j['edad'] is not None and j['fecha_nacimiento'][:4].isdigit())
+    return anios.most_common(1)[0][0] if anios else None
+
+def calcular_progresion(jugadores):
+    """
+    Calcula la progresión sin tocar la DB. jugadores: filas de database.get_jugadores_progresion.
+    Retorna un dict con:
+      'actualizados': [(edad, valoracion, jugador_id)] de los que siguen,
+      'retirados': [jugador dict] de los que se retiran,
+      'juveniles': [(nombre, posicion, valoracion, fecha_nacimiento, edad, nacionalidad, equipo_id)],
+      'niveles': [(nivel_general, equipo_id)] recalculados,
+      'cambios': {jugador_id: cambio de valoración}.
+    """
+    medias_liga = {}
+    for j in jugadores:
+        suma, cantidad = medias_liga.get(j['liga_id'], (0, 0))
+        medias_liga[j['liga_id']] = (suma + (j['valoracion'] or 0), cantidad + 1)
+    bandas = {liga_id: _banda(suma / cantidad) for liga_id, (suma, cantidad) in medias_liga.items()}
+
+    # Tablas de cambios por (edad, liga): se arman una vez y cada jugador solo elige al azar
+    tablas = {}
+    actualizados, retirados, cambios = [], [], {}
+    for j in jugadores:
+        edad = (j['edad'] or EDAD_JUVENIL[1]) + 1
+        _, techo, factor = bandas[j['liga_id']]
+        clave = (edad, j['liga_id'])
+        if clave not in tablas:
+            tablas[clave] = _cambios_posibles(edad, factor)
+        valoracion_anterior = j['valoracion'] or VALORACION_MINIMA
+        cambio = random.choice(tablas[clave])
+        if cambio > 0:
+            cambio = max(0, min(cambio, techo - valoracion_anterior)) # Por encima del techo ya no crece
+        valoracion = _limitar(valoracion_anterior + cambio)
+
+        if (random.random() < _prob_retiro(edad)
+                or (valoracion < VALORACION_MINIMA and edad >= EDAD_RETIRO_BAJO_NIVEL)):
+            retirados.append(dict(j, edad=edad))
+            continue
+        actualizados.append((edad, valoracion, j['id']))
+        cambios[j['id']] = valoracion - valoracion_anterior
+
+    # Valoraciones finales por equipo, para la media de los juveniles y el nivel_general
+    valoraciones_equipo = {}
+    nacionalidades_equipo = {}
+    por_id = {j['id']: j for j in jugadores}
+    for edad, valoracion, jugador_id in actualizados:
+        equipo_id = por_id[jugador_id]['equipo_id']
+        valoraciones_equipo.setdefault(equipo_id, []).append(valoracion)
+        nacionalidades_equipo.setdefault(equipo_id, []).append(por_id[jugador_id]['nacionalidad'])
+
+    anio_actual = _anio_referencia(jugadores)
+    pools = _nombres_por_nacionalidad(jugadores)
+    nombres_usados = {(j['nombre'], j['equipo_id']) for j in jugadores}
+    juveniles = []
+    for retirado in retirados:
+        equipo_id = retirado['equipo_id']
+        valoraciones = valoraciones_equipo.get(equipo_id) or [retirado['valoracion'] or VALORACION_MINIMA]
+        _, techo, _ = bandas[retirado['liga_id']]
+        media = sum(valoraciones) / len(valoraciones)
+        valoracion = _limitar(round(media) - random.randint(*DIFERENCIA_JUVENIL), maximo=techo)
+        edad = random.randint(*EDAD_JUVENIL)
+        nacionalidad = random.choice(nacionalidades_equipo.get(equipo_id) or [retirado['nacionalidad']])
+        nombres, apellidos = pools.get(nacionalidad) or pools.get(retirado['nacionalidad']) or (["Juvenil"], [str(retirado['id'])])
+        for _ in range(10):
+            nombre = f"{random.choice(nombres)} {random.choice(apellidos)}"
+            if (nombre, equipo_id) not in nombres_usados:
+                break
+        nombres_usados.add((nombre, equipo_id))
+        fecha_nacimiento = f"{anio_actual + 1 - edad}-07-01" if anio_actual else None
+        juveniles.append((nombre, retirado['posicion'], valoracion, fecha_nacimiento, edad, nacionalidad, equipo_id))
+        valoraciones_equipo.setdefault(equipo_id, []).append(valoracion)
+
+    niveles = [(round(sum(mejores) / len(mejores)), equipo_id)
+               for equipo_id, valoraciones in valoraciones_equipo.items()
+               for mejores in [sorted(valoraciones, reverse=True)[:TITULARES]]]
+
+    return {'actualizados': actualizados, 'retirados': retirados, 'juveniles': juveniles,
+            'niveles': niveles, 'cambios': cambios}
+
+def progresar_temporada(conn=None):
+    """
+    Aplica la progresión de fin de temporada a todos los jugadores del mundo activo.
+    Retorna el dict de calcular_progresion (con los jugadores leídos en 'jugadores'), o None si hubo error.
+    """
+    jugadores = database.get_jugadores_progresion(conn)
+    progresion = calcular_progresion(jugadores)
+    if not database.guardar_progresion_temporada(progresion['actualizados'], [j['id'] for j in progresion['retirados']],
+                                                 progresion['juveniles'], progresion['niveles'], conn):
+        return None
+    progresion['jugadores'] = jugadores
+    return progresion
+
+def resumen_equipo(progresion, equipo_id, cantidad=3):
+    """Líneas para el usuario: retiros, juveniles y mayores subidas/bajadas de su equipo."""
+    lineas = []
+    del_equipo = {j['id']: j for j in progresion['jugadores'] if j['equipo_id'] == equipo_id}
+    retirados = [j for j in progresion['retirados'] if j['equipo_id'] == equipo_id]
+    juveniles = [fila for fila in progresion['juveniles'] if fila[6] == equipo_id]
+    cambios = sorted(((cambio, del_equipo[jugador_id]) for jugador_id, cambio in progresion['cambios'].items()
+                      if jugador_id in del_equipo), key=lambda item: item[0])
+
+    if retirados:
+        lineas.append("👋 Se retiran: " + ", ".join(f"{j['nombre']} ({j['edad']} años)" for j in retirados))
+    if juveniles:
+        lineas.append("🌱 Suben de juveniles: " + ", ".join(f"{fila[0]} ({fila[1]}, OVR {fila[2]})" for fila in juveniles))
+    subidas = [f"{j['nombre']} +{cambio}" for cambio, j in reversed(cambios[-cantidad:]) if cambio > 0]
+    bajadas = [f"{j['nombre']} {cambio}" for cambio, j in cambios[:cantidad] if cambio < 0]
+    if subidas:
+        lineas.append("📈 Mejoran: " + ", ".join(subidas))
+    if bajadas:
+        lineas.append("📉 Bajan: " + ", ".join(bajadas))
+    return lineas
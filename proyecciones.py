@@ -0,0 +1,208 @@
+# proyecciones.py
+
+import asyncio
+import concurrent.futures
+from operator import add
+
+import database
+import eliminatorias
+import game_logic
+import modelos_partido
+
+# Proyección Monte Carlo de la temporada: se simula muchas veces lo que falta de la fase
+# regular (y la llave eliminatoria de la liga, si tiene) partiendo de la tabla actual, y se
+# cuenta en cuántas simulaciones cada equipo sale primero, entra en el top N, asciende, etc.
+#
+# En lugar de llamar a simular_partido una vez por partido y simulación, cada partido
+# pendiente se sortea para todas las simulaciones de una vez (modelos_partido.sortear_lote,
+# el mismo modelo y tabla de sorteo que usa el juego) y cada resultado se traduce a su aporte
+# a la tabla. Las operaciones por simulación corren dentro de map() en C, así que el costo
+# por partido es de unas pocas pasadas sobre listas de enteros.
+
+SIMULACIONES = 10000
+MIN_SIMULACIONES = 100
+MAX_SIMULACIONES = 50000
+TOP_N = 4
+
+# Puntos, diferencia y goles a favor en un solo entero que ordena igual que la tabla (pts, dg, gf)
+_PESO_PTS = 1_000_000
+_PESO_DG = 1_000
+
+# Un único hilo de fondo: las proyecciones no bloquean el loop del bot y no compiten entre sí
+_trabajador = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='proyecciones')
+
+def _puntaje(goles_a_favor, goles_en_contra):
+    puntos = 3 if goles_a_favor > goles_en_contra else 1 if goles_a_favor == goles_en_contra else 0
+    return puntos * _PESO_PTS + (goles_a_favor - goles_en_contra) * _PESO_DG + goles_a_favor
+
+def _puntos(puntaje):
+    return round(puntaje / _PESO_PTS)
+
+# Aporte de cada resultado de modelos_partido.RESULTADOS al local y al visitante
+_PUNTAJE_LOCAL = [_puntaje(gl, gv) for gl, gv in modelos_partido.RESULTADOS]
+_PUNTAJE_VISITANTE = [_puntaje(gv, gl) for gl, gv in modelos_partido.RESULTADOS]
+
+def _puntaje_tabla(stats):
+    if not stats:
+        return 0
+    return stats['pts'] * _PESO_PTS + stats['dg'] * _PESO_DG + stats['gf']
+
+def preparar_proyeccion(liga_id, temporada, conn=None):
+    """
+    Lee de la DB lo que necesita la simulación: tabla actual, partidos de liga pendientes y
+    fuerzas de los equipos. Retorna un dict sin conexiones, listo para simular en otro hilo,
+    o None si la liga no tiene equipos.
+    """
+    equipos = database.get_equipos_by_liga(liga_id, conn)
+    if not equipos:
+        return None
+    liga = database.get_liga_by_id(liga_id, conn)
+    clasificacion = {c['equipo_id']: c for c in database.get_clasificacion_liga(liga_id, temporada, conn=conn)}
+    pendientes = database.get_partidos_pendientes_liga(liga_id, temporada, conn)
+
+    en_juego = set(clasificacion)
+    for p in pendientes:
+        en_juego.update((p['equipo_local_id'], p['equipo_visitante_id']))
+    # Orden por nombre: con puntaje igual, la tabla desempata por nombre
+    equipos = sorted((e for e in equipos if e['id'] in en_juego), key=lambda e: e['nombre'])
+
+    zonas = {}
+    for p in pendientes:
+        zonas.setdefault(p['equipo_local_id'], p['zona'])
+        zonas.setdefault(p['equipo_visitante_id'], p['zona'])
+    for equipo_id, c in clasificacion.items():
+        zonas[equipo_id] = c['zona']
+
+    return {
+        'liga_id': liga_id,
+        'liga_nombre': liga['nombre'] if liga else '',
+        'temporada': temporada,
+        'equipos': [{
+            'id': e['id'],
+            'nombre': e['nombre'],
+            'zona': zonas.get(e['id']) or e['zona'],
+            'pts': clasificacion.get(e['id'], {}).get('pts', 0),
+            'puntaje': _puntaje_tabla(clasificacion.get(e['id'])),
+        } for e in equipos],
+        'fuerzas': modelos_partido.fuerzas_liga(liga_id, conn),
+        'partidos': [(p['equipo_local_id'], p['equipo_visitante_id']) for p in pendientes],
+        'torneo': eliminatorias.TORNEOS_POR_LIGA.get(liga['nombre']) if liga else None,
+    }
+
+def simular_proyeccion(datos, simulaciones=SIMULACIONES, top_n=TOP_N):
+    """
+    Corre las simulaciones sobre los datos de preparar_proyeccion (no toca la DB).
+    Retorna una lista por equipo con 'id', 'nombre', 'zona', 'pts' (actuales), 'pts_esperados',
+    'primero' y 'top' (probabilidad de terminar 1° y entre los top_n de su zona o tabla),
+    'ascenso' (ganar una ronda con premio de ascenso) y, por cada columna de
+    torneo['proyeccion'], la probabilidad de jugar esas rondas.
+    """
+    equipos = datos['equipos']
+    fuerzas = datos['fuerzas']
+    torneo = datos['torneo']
+    indice = {e['id']: i for i, e in enumerate(equipos)}
+
+    # Puntaje final de cada equipo en cada simulación (una lista por equipo)
+    puntajes = [[e['puntaje']] * simulaciones for e in equipos]
+    for local, visitante in datos['partidos']:
+        if local not in indice or visitante not in indice or local not in fuerzas or visitante not in fuerzas:
+            continue
+        resultados = modelos_partido.sortear_lote(fuerzas[local], fuerzas[visitante], simulaciones)
+        i, j = indice[local], indice[visitante]
+        puntajes[i] = list(map(add, puntajes[i], map(_PUNTAJE_LOCAL.__getitem__, resultados)))
+        puntajes[j] = list(map(add, puntajes[j], map(_PUNTAJE_VISITANTE.__getitem__, resultados)))
+
+    grupos = {}
+    for i, e in enumerate(equipos):
+        grupos.setdefault(e['zona'], []).append(i)
+    todos = list(range(len(equipos)))
+
+    conteo_puestos = [[0] * len(grupos[e['zona']]) for e in equipos]
+    ascensos = [0] * len(equipos)
+    columnas = (torneo or {}).get('proyeccion', {})
+    participaciones = {columna: [0] * len(equipos) for columna in columnas}
+
+    for fila in zip(*puntajes):
+        posiciones = {}
+        for zona, miembros in grupos.items():
+            orden = sorted(miembros, key=fila.__getitem__, reverse=True) # sorted es estable: empate -> nombre
+            for puesto, i in enumerate(orden):
+                conteo_puestos[i][puesto] += 1
+            posiciones[zona] = [equipos[i]['id'] for i in orden]
+        if not torneo:
+            continue
+
+        if None not in posiciones:
+            posiciones[None] = [equipos[i]['id'] for i in sorted(todos, key=fila.__getitem__, reverse=True)]
+        rondas, ganadores, _ = eliminatorias.resolver_llave(
+            torneo, posiciones, lambda equipo_id: fila[indice[equipo_id]],
+            game_logic.simular_partido_eliminatorio, fuerzas)
+        jugaron = {}
+        for jugada in rondas:
+            ronda = jugada['ronda']
+            if (ronda.get('premio') or {}).get('ascenso') and len(jugada['partidos']) == 1:
+                ascensos[indice[ganadores[ronda['clave']][0]]] += 1
+            equipos_ronda = set(jugada['libres'])
+            for e1, e2, _ in jugada['partidos']:
+                equipos_ronda.update((e1, e2))
+            jugaron[ronda['clave']] = equipos_ronda
+        for columna, claves in columnas.items():
+            # Un equipo puede jugar varias rondas de la columna; cuenta una vez por simulación
+            for equipo_id in set().union(*(jugaron.get(clave, ()) for clave in claves)):
+                participaciones[columna][indice[equipo_id]] += 1
+
+    resultado = []
+    for i, e in enumerate(equipos):
+        fila = {
+            'id': e['id'],
+            'nombre': e['nombre'],
+            'zona': e['zona'],
+            'pts': e['pts'],
+            'pts_esperados': sum(map(_puntos, puntajes[i])) / simulaciones,
+            'primero': conteo_puestos[i][0] / simulaciones,
+            'top': sum(conteo_puestos[i][:top_n]) / simulaciones,
+            'ascenso': ascensos[i] / simulaciones if torneo else None,
+        }
+        for columna in columnas:
+            fila[columna] = participaciones[columna][i] / simulaciones
+        resultado.append(fila)
+    return resultado
+
+async def proyectar(datos, simulaciones=SIMULACIONES, top_n=TOP_N):
+    """Corre simular_proyeccion en el hilo de fondo y espera el resultado sin bloquear el bot."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_trabajador, simular_proyeccion, datos, simulaciones, top_n)
+
+def _porcentaje(prob):
+    if prob is None:
+        return "  -  "
+    if 0 < prob < 0.001:
+        return " <0.1"
+    return f"{prob * 100:5.1f}"
+
+def formatear_proyeccion(datos, resultado, simulaciones, top_n=TOP_N, equipo_usuario_id=None):
+    """Líneas de la tabla de probabilidades, por zona y ordenada por puntos esperados."""
+    ANCHO_EQUIPO = 22
+    columnas = list((datos['torneo'] or {}).get('proyeccion', {}))
+    encabezado = f"EQUIPO{' ' * (ANCHO_EQUIPO - 6)} PTS  ESP    1°  TOP{top_n}"
+    if datos['torneo']:
+        encabezado += "   ASC" + "".join(f" {columna[:5].upper().rjust(5)}" for columna in columnas)
+
+    lineas = [f"**Proyección - {datos['liga_nombre']} (Temporada {datos['temporada']})**",
+              f"{simulaciones} simulaciones de los {len(datos['partidos'])} partidos que faltan. Probabilidades en %."]
+    zonas = sorted({fila['zona'] for fila in resultado}, key=lambda z: (z is None, z or ''))
+    for zona in zonas:
+        if len(zonas) > 1 or zona:
+            lineas.append(f"\n--- {zona or 'Sin zona'} ---")
+        lineas.append(f"```ansi\n{encabezado}")
+        filas = sorted((f for f in resultado if f['zona'] == zona), key=lambda f: -f['pts_esperados'])
+        for fila in filas:
+            linea = (f"{fila['nombre'][:ANCHO_EQUIPO].ljust(ANCHO_EQUIPO)} {str(fila['pts']).rjust(3)} {fila['pts_esperados']:4.0f} "
+                     f"{_porcentaje(fila['primero'])} {_porcentaje(fila['top'])}")
+            if datos['torneo']:
+                linea += " " + _porcentaje(fila['ascenso']) + "".join(f" {_porcentaje(fila[columna])}" for columna in columnas)
+            if fila['id'] == equipo_usuario_id:
+                linea = f"\u001b[2;36m{linea}\u001b[0m"
+            lineas.append(linea)
+        lineas.append("```")
+    return lineas
@@ -0,0 +1,170 @@
+# salida_discord.py
+
+import asyncio
+import discord
+from limitador import LimitadorTokens
+
+# Límite de caracteres de un mensaje de Discord
+LIMITE_MENSAJE = 2000
+# Discord permite unos 5 mensajes cada 5 segundos por canal
+MENSAJES_POR_SEGUNDO_CANAL = 1.0
+RAFAGA_CANAL = 5
+# Tiempo (segundos) durante el que responden los botones de una vista paginada
+TIMEOUT_PAGINACION = 600
+
+def _partir_linea(linea, limite):
+    """Parte una línea que por sí sola no entra en un mensaje (corte por espacios si se puede)."""
+    trozos = []
+    while len(linea) > limite:
+        corte = linea.rfind(' ', 0, limite)
+        if corte <= 0:
+            corte = limite
+        trozos.append(linea[:corte])
+        linea = linea[corte:].lstrip(' ')
+    trozos.append(linea)
+    return trozos
+
+def empaquetar_lineas(lineas, limite=LIMITE_MENSAJE):
+    """
+    Junta las líneas (o bloques con saltos de línea) en el menor número de mensajes de hasta
+    `limite` caracteres, llenando cada mensaje antes de empezar el siguiente.
+    Un bloque de código (```) que quede cortado se cierra al final del mensaje y se reabre,
+    con el mismo encabezado (ej. ```ansi), al principio del siguiente.
+    Retorna la lista de mensajes.
+    """
+    if isinstance(lineas, str):
+        lineas = [lineas]
+    mensajes = []
+    actual = []
+    largo_actual = 0
+    bloque_abierto = None # Encabezado del bloque de código abierto (ej. '```ansi') o None
+    cierre = "\n```"
+
+    def cerrar_mensaje():
+        nonlocal actual, largo_actual
+        texto = "\n".join(actual)
+        if bloque_abierto:
+            texto += cierre
+        if texto.strip():
+            mensajes.append(texto)
+        actual = [bloque_abierto] if bloque_abierto else []
+        largo_actual = len(bloque_abierto) if bloque_abierto else 0
+
+    for bloque in lineas:
+        for linea in str(bloque).split("\n"):
+            # Reservar sitio para cerrar el bloque de código si hay que cortar dentro de él
+            reserva = len(cierre) if bloque_abierto or linea.strip().startswith("```") else 0
+            for trozo in _partir_linea(linea, limite - reserva - len(bloque_abierto or '') - 1):
+                separador = 1 if actual else 0
+                if largo_actual + separador + len(trozo) + reserva > limite:
+                    cerrar_mensaje()
+                    separador = 1 if actual else 0
+                actual.append(trozo)
+                largo_actual += separador + len(trozo)
+            marca = linea.strip()
+            if marca.startswith("```"):
+                if bloque_abierto:
+                    bloque_abierto = None # Cierre del bloque
+                elif not (len(marca) > 3 and marca.endswith("```")): # ```texto``` en una línea no abre nada
+                    bloque_abierto = marca
+
+    if actual:
+        cerrar_mensaje()
+    return mensajes
+
+class VistaPaginada(discord.ui.View):
+    """Botones ◀ / ▶ que cambian la página editando el mismo mensaje (sin mensajes nuevos)."""
+    def __init__(self, paginas, autor_id=None, timeout=TIMEOUT_PAGINACION):
+        super().__init__(timeout=timeout)
+        self.paginas = paginas
+        self.autor_id = autor_id
+        self.indice = 0
+        self._actualizar_botones()
+
+    def contenido(self):
+        return self.paginas[self.indice]
+
+    def _actualizar_botones(self):
+        self.anterior.disabled = self.indice == 0
+        self.siguiente.disabled = self.indice == len(self.paginas) - 1
+        self.pagina.label = f"{self.indice + 1}/{len(self.paginas)}"
+
+    async def _mover(self, interaction, delta):
+        if self.autor_id is not None and interaction.user.id != self.autor_id:
+            await interaction.response.send_message("Solo quien pidió esta vista puede cambiar de página.", ephemeral=True)
+            return
+        self.indice = max(0, min(len(self.paginas) - 1, self.indice + delta))
+        self._actualizar_botones()
+        await interaction.response.edit_message(content=self.contenido(), view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def anterior(self, interaction, button):
+        await self._mover(interaction, -1)
+
+    @discord.ui.button(label="1/1", style=discord.ButtonStyle.secondary, disabled=True)
+    async def pagina(self, interaction, button):
+        pass
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def siguiente(self, interaction, button):
+        await self._mover(interaction, 1)
+
+class SalidaDiscord:
+    """
+    Cola de salida por canal. Cada canal tiene una tarea que envía los mensajes en orden
+    respetando un límite propio (token bucket), de modo que una respuesta larga no choca con
+    el rate limit de Discord. enviar() espera a que el mensaje se haya mandado, así el orden
+    se mantiene aunque el handler siga usando channel.send para mensajes sueltos.
+    """
+    def __init__(self, mensajes_por_segundo=MENSAJES_POR_SEGUNDO_CANAL, rafaga=RAFAGA_CANAL):
+        self.mensajes_por_segundo = mensajes_por_segundo
+        self.rafaga = rafaga
+        self._colas = {} # canal_id -> asyncio.Queue
+        self._trabajadores = {} # canal_id -> tarea que vacía la cola
+
+    def _cola_canal(self, canal):
+        if canal.id not in self._colas:
+            cola = asyncio.Queue()
+            self._colas[canal.id] = cola
+            self._trabajadores[canal.id] = asyncio.create_task(self._trabajador(canal, cola))
+        return self._colas[canal.id]
+
+    async def _trabajador(self, canal, cola):
+        limitador = LimitadorTokens(self.mensajes_por_segundo, self.rafaga)
+        while True:
+            contenido, view, futuro = await cola.get()
+            try:
+                await limitador.adquirir()
+                if view is not None:
+                    mensaje = await canal.send(contenido, view=view)
+                else:
+                    mensaje = await canal.send(contenido)
+                futuro.set_result(mensaje)
+            except Exception as e: # El error se entrega a quien envió; la tarea del canal sigue viva
+                futuro.set_exception(e)
+            finally:
+                cola.task_done()
+
+    async def _encolar(self, canal, contenido, view=None):
+        futuro = asyncio.get_running_loop().create_future()
+        await self._cola_canal(canal).put((contenido, view, futuro))
+        return await futuro
+
+    async def enviar(self, canal, lineas):
+        """Empaqueta las líneas en mensajes de hasta 2000 caracteres y los envía por la cola."""
+        for texto in empaquetar_lineas(lineas):
+            await self._encolar(canal, texto)
+
+    async def enviar_paginado(self, canal, lineas, autor_id=None):
+        """
+        Envía una vista larga como un único mensaje con botones de paginación.
+        Si todo entra en un mensaje se envía sin botones.
+        """
+        paginas = empaquetar_lineas(lineas)
+        if not paginas:
+            return
+        if len(paginas) == 1:
+            await self._encolar(canal, paginas[0])
+            return
+        vista = VistaPaginada(paginas, autor_id)
+        await self._encolar(canal, vista.contenido(), vista)
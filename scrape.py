@@ -1,25 +1,72 @@
 # scrape_brasileirao.py
 
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+from bs4 import BeautifulSoup, SoupStrainer
 import re
 from datetime import datetime
-import time
-import random
+import json
 import os
+import queue
+import sys
+import threading
+import time
+import database
+import local_data
+import scraper_async
 
-SCRAPED_TEAMS_FILE = 'scraped_teams.txt'
+try:
+    import lxml # noqa: F401 (solo se comprueba que el backend esté instalado)
+    PARSER_HTML = 'lxml'
+except ImportError:
+    PARSER_HTML = 'html.parser'
 
-def calcular_edad(fecha_nacimiento_str):
+SCRAPED_TEAMS_FILE = 'scraped_teams.txt'
+HTTP_CACHE_DIR = 'http_cache'
+# Registro de auditoría: un JSON por jugador scrapeado, tal como llegó (incluye los que el
+# cargador saltó por duplicados o equipos rechazados); se puede reimportar con local_data
+AUDIT_FILE = 'premierleague_players.jsonl'
+# Liga de destino en la base de datos (misma entrada que en local_data.MANIFIESTO_LIGAS)
+LIGA_NOMBRE = "Premier League"
+LIGA_PAIS = "Inglaterra"
+
+BASE_URL = "https://www.transfermarkt.es"
+# Mantener en 2025 si la liga principal de Transfermarkt ya muestra datos de 2025.
+# Si sigue fallando, prueba a volver a 2024 aquí también.
+LIGA_PATH = "/premier-league/startseite/wettbewerb/GB1/plus/?saison_id=2024"
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+}
+
+# Fechas 'DD.MM.YYYY' o 'DD/MM/YYYY'; compilada una sola vez para todas las celdas
+PATRON_FECHA = re.compile(r'(\d{2}[./]\d{2}[./]\d{4})')
+PATRON_FILA_JUGADOR = re.compile(r'odd|even')
+# Solo se construye el árbol de la tabla de jugadores, no la página entera
+SOLO_TABLA_JUGADORES = SoupStrainer('div', class_='responsive-table')
+
+# Límites por defecto del motor de descargas (ver scraper_async.MotorScraping)
+OPCIONES_MOTOR = {
+    'concurrencia': 4,
+    'peticiones_por_segundo': 0.5,
+    'rafaga': 2,
+    'conexiones_por_host': 2,
+    'peticiones_por_segundo_por_host': 0.5,
+    'max_reintentos': 3,
+    'backoff_base': 10,
+}
+
+def parsear_fecha_nacimiento(fecha_nacimiento_str):
     """
-    Calcula la edad a partir de una fecha de nacimiento.
-    Acepta formato 'DD.MM.YYYY (Edad)' o 'DD/MM/YYYY (Edad)' o solo 'DD.MM.YYYY' / 'DD/MM/YYYY'.
+    Convierte 'DD.MM.YYYY (Edad)', 'DD/MM/YYYY (Edad)', 'DD.MM.YYYY' o 'DD/MM/YYYY' en datetime.
+    Retorna None si no es una fecha válida.
     """
     try:
         # Extraer solo la fecha si viene con el formato 'DD.MM.YYYY (Edad)' o 'DD/MM/YYYY (Edad)'
-        # Modificación CRÍTICA: La expresión regular ahora acepta . o / como separador.
-        # r'(\d{2}[./]\d{2}[./]\d{4})'  -> Esto busca XX.XX.XXXX o XX/XX/XXXX
-        fecha_solo_numeros_match = re.search(r'(\d{2}[./]\d{2}[./]\d{4})', fecha_nacimiento_str)
+        # La expresión regular acepta . o / como separador (XX.XX.XXXX o XX/XX/XXXX)
+        fecha_solo_numeros_match = PATRON_FECHA.search(fecha_nacimiento_str)
         if fecha_solo_numeros_match:
             fecha_limpia = fecha_solo_numeros_match.group(0) # group(0) devuelve toda la coincidencia
         else:
@@ -29,13 +76,20 @@ def calcular_edad(fecha_nacimiento_str):
         fecha_limpia = fecha_limpia.replace('/', '.')
 
         dia, mes, ano = map(int, fecha_limpia.split('.'))
-        fecha_nacimiento = datetime(ano, mes, dia)
-        hoy = datetime.now() 
+        return datetime(ano, mes, dia)
+    except (ValueError, AttributeError, TypeError):
+        return None
 
-        edad = hoy.year - fecha_nacimiento.year - ((hoy.month, hoy.day) < (fecha_nacimiento.month, fecha_nacimiento.day))
-        return edad
-    except (ValueError, AttributeError):
+def calcular_edad(fecha_nacimiento_str):
+    """
+    Calcula la edad a partir de una fecha de nacimiento.
+    Acepta los mismos formatos que parsear_fecha_nacimiento.
+    """
+    fecha_nacimiento = parsear_fecha_nacimiento(fecha_nacimiento_str)
+    if fecha_nacimiento is None:
         return None
+    hoy = datetime.now()
+    return hoy.year - fecha_nacimiento.year - ((hoy.month, hoy.day) < (fecha_nacimiento.month, fecha_nacimiento.day))
 
 def limpiar_texto(text):
     """Limpia el texto, eliminando saltos de línea, tabulaciones y espacios extra."""
@@ -56,194 +110,347 @@ def save_scraped_team(team_name):
     with open(SCRAPED_TEAMS_FILE, 'a', encoding='utf-8') as f:
         f.write(team_name + '\n')
 
-def scrape_brasileirao():
-    base_url = "https://www.transfermarkt.es"
-    # Mantener en 2025 si la liga principal de Transfermarkt ya muestra datos de 2025.
-    # Si sigue fallando, prueba a volver a 2024 aquí también.
-    liga_url = f"{base_url}/premier-league/startseite/wettbewerb/GB1/plus/?saison_id=2024"
+def parsear_plantilla_equipo(contenido, team_name, parser=None, mostrar=True):
+    """
+    Extrae los jugadores de la página de un equipo.
+    Solo se parsea el div.responsive-table (SoupStrainer) y cada fila se recorre una única vez.
+    parser: backend de BeautifulSoup; por defecto PARSER_HTML (lxml si está instalado).
+    Retorna la lista de registros {nombre, posicion, edad, nacionalidad, equipo, fecha_nacimiento}
+    (mismo formato que local_data.parsear_archivo_jugadores; fecha en YYYY-MM-DD), o None si no hay tabla.
+    """
+    team_soup = BeautifulSoup(contenido, parser or PARSER_HTML, parse_only=SOLO_TABLA_JUGADORES)
 
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8,en-GB;q=0.7,en-US;q=0.6',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Connection': 'keep-alive',
-    }
+    player_table = team_soup.find('div', class_='responsive-table')
 
-    all_players_data = []
-    scraped_teams_set = load_scraped_teams()
-
-    print(f"Scrapeando equipos de: {liga_url}")
-    response = requests.get(liga_url, headers=headers)
-    
-    if response.status_code != 200:
-        print(f"Error al acceder a la página de la liga: {response.status_code}")
-        print(f"Contenido de la respuesta (primeras 500 chars): {response.text[:500]}")
-        return
+    if not player_table:
+        return None
 
-    soup = BeautifulSoup(response.content, 'html.parser')
+    rows = player_table.find_all('tr', class_=PATRON_FILA_JUGADOR)
+
+    if not rows:
+        print(f"No se encontraron filas de jugadores en la tabla de {team_name}.")
+        return []
+
+    jugadores = []
+    for row in rows:
+        player_name = "N/A"
+        position = "N/A"
+        age = "N/A"
+        nationality = "N/A"
+        name_cell = None
+        pos_cell = None
+        fecha_nacimiento_str = None
+
+        # --- UNA SOLA PASADA POR LAS CELDAS DE LA FILA ---
+        # Se guarda la primera celda de nombre (td.hauptlink) y de posición (td.posrela),
+        # la primera fecha 'DD.MM.YYYY' / 'DD/MM/YYYY' y la primera bandera con título.
+        for cell in row.find_all('td'):
+            clases = cell.get('class') or ()
+            if name_cell is None and 'hauptlink' in clases:
+                name_cell = cell
+            if pos_cell is None and 'posrela' in clases:
+                pos_cell = cell
+            if fecha_nacimiento_str is None:
+                fecha_match = PATRON_FECHA.search(cell.get_text())
+                if fecha_match:
+                    fecha_nacimiento_str = fecha_match.group(0)
+            if nationality == "N/A":
+                flag_img = cell.find('img', class_='flaggenrahmen')
+                if flag_img and 'title' in flag_img.attrs:
+                    nationality = limpiar_texto(flag_img['title'])
+
+        # 1. Nombre del jugador (td.hauptlink -> a)
+        if name_cell:
+            player_name_tag = name_cell.find('a')
+            if player_name_tag:
+                player_name = limpiar_texto(player_name_tag.text)
+
+        # 2. Posición (td.posrela -> table.inline-table -> td.pos O span.spielerposition O texto directo)
+        if pos_cell:
+            pos_tag = pos_cell.select_one('table.inline-table td.pos')
+            if pos_tag:
+                position = limpiar_texto(pos_tag.text)
+            else:
+                pos_span = pos_cell.find('span', class_='spielerposition')
+                if pos_span:
+                    position = limpiar_texto(pos_span.text)
+                else:
+                    position = limpiar_texto(pos_cell.get_text(strip=True))
+
+                    if player_name != "N/A" and position.startswith(player_name):
+                         position = position[len(player_name):].strip()
+                         if not position: position = "N/A"
+
+        # 3. Fecha de nacimiento exacta y edad
+        fecha_nacimiento = None
+        if fecha_nacimiento_str:
+            fecha_nacimiento = parsear_fecha_nacimiento(fecha_nacimiento_str)
+            age = calcular_edad(fecha_nacimiento_str)
+
+        # Filtro final antes de añadir a la lista
+        if player_name != "N/A" and team_name != "Nombre Desconocido" and age is not None and nationality != "N/A" and position != "N/A":
+            jugadores.append({
+                'nombre': player_name,
+                'posicion': position,
+                'edad': age,
+                'nacionalidad': nationality,
+                'equipo': team_name,
+                'fecha_nacimiento': fecha_nacimiento.date().isoformat() if fecha_nacimiento else None,
+            })
+            if mostrar:
+                print(f"  Añadido: {player_name} ({position}, {age}, {nationality}) de {team_name}")
+        elif mostrar:
+            print(f"  Saltando jugador incompleto en {team_name}: Nombre: '{player_name}', Posición: '{position}', Edad: '{age}', Nacionalidad: '{nationality}'")
+
+    return jugadores
+
+def parsear_equipos_liga(contenido):
+    """
+    Extrae los equipos de la página de una liga (div.grid-view -> table.items td.hauptlink a).
+    Retorna un set de (url_sufijo, nombre_equipo), o None si no está el contenedor de la tabla.
+    """
+    soup = BeautifulSoup(contenido, PARSER_HTML, parse_only=SoupStrainer('div', class_='grid-view'))
 
     team_table_container = soup.find('div', class_='grid-view')
     if not team_table_container:
-        print("No se encontró el contenedor principal de la tabla de equipos (div.grid-view).")
-        return
+        return None
 
-    team_links_and_names = []
+    equipos = set()
     for link in team_table_container.select('table.items td.hauptlink a'):
-        if '/startseite/verein/' in link['href']:
-            team_links_and_names.append({'url_suffix': link['href'], 'name': limpiar_texto(link.text)})
+        if '/startseite/verein/' in link.get('href', ''):
+            equipos.add((link['href'], limpiar_texto(link.text)))
+    return equipos
 
-    unique_team_data = { (data['url_suffix'], data['name']) for data in team_links_and_names }
+def linea_jugador(registro):
+    """Línea de texto 'Nombre, Posición, Edad, Nacionalidad, Equipo' (formato de los *_players.txt)."""
+    return f"{registro['nombre']}, {registro['posicion']}, {registro['edad']}, {registro['nacionalidad']}, {registro['equipo']}"
 
-    print(f"Encontrados {len(unique_team_data)} equipos.")
-
-    if not unique_team_data:
-        print("Advertencia: No se encontraron enlaces de equipos únicos. Revisa los selectores.")
+def benchmark_parseo(paginas, repeticiones=5):
+    """
+    Mide el tiempo de parseo por equipo sobre páginas guardadas.
+    paginas: iterable de (nombre, contenido_html). Compara el árbol completo con html.parser
+    (comportamiento anterior) contra PARSER_HTML + SoupStrainer. Retorna {nombre: (ms_completo, ms_filtrado)}.
+    """
+    resultados = {}
+    for nombre, contenido in paginas:
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            BeautifulSoup(contenido, 'html.parser').find('div', class_='responsive-table')
+        ms_completo = (time.perf_counter() - inicio) * 1000 / repeticiones
+
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            jugadores = parsear_plantilla_equipo(contenido, nombre, mostrar=False)
+        ms_filtrado = (time.perf_counter() - inicio) * 1000 / repeticiones
+
+        resultados[nombre] = (ms_completo, ms_filtrado)
+        print(f"{nombre}: {len(jugadores or [])} jugadores | árbol completo (html.parser) {ms_completo:.1f} ms"
+              f" | {PARSER_HTML} + SoupStrainer {ms_filtrado:.1f} ms")
+
+    if resultados:
+        total_completo = sum(r[0] for r in resultados.values())
+        total_filtrado = sum(r[1] for r in resultados.values())
+        print(f"\nTotal {len(resultados)} páginas: {total_completo:.1f} ms -> {total_filtrado:.1f} ms")
+    return resultados
+
+def paginas_guardadas(directorio=None):
+    """
+    Genera (nombre, contenido) de las páginas guardadas: los .html de `directorio`,
+    o si no se indica, todas las respuestas de la caché HTTP.
+    """
+    if directorio is None:
+        yield from scraper_async.CacheHTTP(HTTP_CACHE_DIR).entradas()
         return
+    for raiz, _, archivos in os.walk(directorio):
+        for archivo in sorted(archivos):
+            if archivo.endswith('.html'):
+                ruta = os.path.join(raiz, archivo)
+                with open(ruta, 'rb') as f:
+                    yield os.path.relpath(ruta, directorio), f.read()
+
+async def _scrape_equipo(motor, base_url, team_suffix_url, team_name):
+    team_profile_url = f"{base_url}{team_suffix_url}"
+    # No forzar aquí la saison_id, confiar en el enlace o en la redirección de TM
+    # Si la URL viene con /saison_id/2024 pero el contenido es 2025, eso es cosa de TM.
+    status, contenido, _ = await motor.obtener(team_profile_url)
+
+    if status != 200:
+        print(f"Falló la página del equipo {team_profile_url} (estado {status}). Saltando este equipo.")
+        return team_name, None
+
+    jugadores = parsear_plantilla_equipo(contenido, team_name)
+    if jugadores is None:
+        print(f"No se encontró la tabla de jugadores para {team_name} en {team_profile_url}. Saltando.")
+    return team_name, jugadores
+
+async def _scrape_liga_async(liga_url, base_url, opciones_motor, replay=False, al_parsear_equipo=None):
+    all_players_data = []
+    jugadores_por_equipo = {}
+    # En modo replay se reparsean todos los equipos desde la caché (ej. tras corregir un selector)
+    scraped_teams_set = set() if replay else load_scraped_teams()
+    cache = scraper_async.CacheHTTP(HTTP_CACHE_DIR)
+
+    async with scraper_async.MotorScraping(HEADERS, cache=cache, solo_cache=replay, **opciones_motor) as motor:
+        print(f"Scrapeando equipos de: {liga_url}")
+        status, contenido, _ = await motor.obtener(liga_url)
+
+        if status != 200:
+            print(f"Error al acceder a la página de la liga: {status}")
+            if contenido:
+                print(f"Contenido de la respuesta (primeras 500 chars): {contenido[:500].decode('utf-8', errors='replace')}")
+            return
+
+        unique_team_data = parsear_equipos_liga(contenido)
+        if unique_team_data is None:
+            print("No se encontró el contenedor principal de la tabla de equipos (div.grid-view).")
+            return
+
+        print(f"Encontrados {len(unique_team_data)} equipos.")
+
+        if not unique_team_data:
+            print("Advertencia: No se encontraron enlaces de equipos únicos. Revisa los selectores.")
+            return
+
+        teams_to_scrape = []
+        for url_suffix, team_name in unique_team_data:
+            if team_name not in scraped_teams_set:
+                teams_to_scrape.append((url_suffix, team_name))
+            else:
+                print(f"Saltando equipo '{team_name}': Ya fue scrapeado exitosamente en una ejecución anterior.")
+
+        print(f"Quedan {len(teams_to_scrape)} equipos por scrapear.")
+
+        if not teams_to_scrape:
+            print("No hay equipos nuevos por scrapear. ¡Todos los clubes ya están en el registro!")
+            return all_players_data
+
+        # Todas las páginas de equipos se piden a la vez; el motor regula el ritmo real
+        tareas = [_scrape_equipo(motor, base_url, suffix, name) for suffix, name in teams_to_scrape]
+        for i, tarea in enumerate(asyncio.as_completed(tareas)):
+            team_name, jugadores = await tarea
+            print(f"({i+1}/{len(teams_to_scrape)}) Procesado {team_name}.")
+            if not jugadores:
+                if jugadores is not None:
+                    print(f"  -> Advertencia: No se encontraron jugadores válidos para el equipo '{team_name}'. No se marcará como scrapeado.")
+                continue
+            if al_parsear_equipo:
+                al_parsear_equipo(team_name, jugadores)
+            else:
+                all_players_data.extend(jugadores)
+            jugadores_por_equipo[team_name] = jugadores_por_equipo.get(team_name, 0) + len(jugadores)
+            # Marcar equipo como scrapeado solo si se encontró al menos 1 jugador válido
+            print(f"  -> Equipo '{team_name}' scrapeado con éxito ({jugadores_por_equipo[team_name]} jugadores).")
+            # Con al_parsear_equipo es quien recibe los registros el que marca el equipo, cuando
+            # los haya guardado (ver scrape_a_db)
+            if not replay and not al_parsear_equipo:
+                save_scraped_team(team_name)
+
+    print(f"\nResumen: {sum(jugadores_por_equipo.values())} jugadores en {len(jugadores_por_equipo)} equipos.")
+    return all_players_data
 
-    teams_to_scrape = []
-    for url_suffix, team_name in unique_team_data:
-        if team_name not in scraped_teams_set:
-            teams_to_scrape.append((url_suffix, team_name))
-        else:
-            print(f"Saltando equipo '{team_name}': Ya fue scrapeado exitosamente en una ejecución anterior.")
-            
-    print(f"Quedan {len(teams_to_scrape)} equipos por scrapear.")
-
-    if not teams_to_scrape:
-        print("No hay equipos nuevos por scrapear. ¡Todos los clubes ya están en el registro!")
-        return all_players_data
-
-
-    for i, (team_suffix_url, team_name_from_list) in enumerate(teams_to_scrape):
-        delay = random.uniform(2, 5)
-        print(f"Esperando {delay:.2f} segundos antes de la siguiente solicitud... ({i+1}/{len(teams_to_scrape)})")
-        time.sleep(delay)
-
-        team_profile_url = f"{base_url}{team_suffix_url}"
-        # No forzar aquí la saison_id, confiar en el enlace o en la redirección de TM
-        # Si la URL viene con /saison_id/2024 pero el contenido es 2025, eso es cosa de TM.
-
-        max_retries = 3
-        retries = 0
-        
-        team_response = None
-        while retries < max_retries:
-            print(f"Scrapeando equipo: {team_profile_url} (Intento {retries + 1}/{max_retries})")
-            try:
-                team_response = requests.get(team_profile_url, headers=headers, timeout=10)
-                if team_response.status_code == 200:
-                    break
-                elif team_response.status_code in [500, 502, 503, 504]:
-                    print(f"Error {team_response.status_code}. Reintentando en {10 * (retries + 1)} segundos...")
-                    time.sleep(10 * (retries + 1))
-                else:
-                    print(f"Error HTTP inesperado {team_response.status_code} al acceder a {team_profile_url}. No reintentar.")
-                    break
-            except requests.exceptions.RequestException as e:
-                print(f"Excepción de conexión al acceder a {team_profile_url}: {e}. Reintentando...")
-                time.sleep(10 * (retries + 1))
-            retries += 1
-        
-        if team_response is None or team_response.status_code != 200:
-            print(f"Falló al obtener la página del equipo {team_profile_url} después de {max_retries} intentos. Saltando este equipo.")
-            continue
-
-        team_soup = BeautifulSoup(team_response.content, 'html.parser')
-
-        team_name = team_name_from_list 
-
-        player_table = team_soup.find('div', class_='responsive-table')
-
-        if not player_table:
-            print(f"No se encontró la tabla de jugadores para {team_name} en {team_profile_url}. Saltando.")
-            continue
-        
-        rows = player_table.find_all('tr', class_=re.compile(r'odd|even'))
-
-        if not rows:
-            print(f"No se encontraron filas de jugadores en la tabla de {team_name}.")
-            continue
-
-        for row in rows:
-            player_name = "N/A"
-            position = "N/A"
-            age = "N/A"
-            nationality = "N/A"
-            fecha_nacimiento_str = None
-            
-            # --- EXTRACTORES DE DATOS DENTRO DE LA FILA DEL JUGADOR ---
-
-            # 1. Nombre del jugador (td.hauptlink -> a)
-            name_cell = row.find('td', class_='hauptlink')
-            if name_cell:
-                player_name_tag = name_cell.find('a') 
-                if player_name_tag:
-                    player_name = limpiar_texto(player_name_tag.text)
-            
-            # 2. Posición (td.posrela -> table.inline-table -> td.pos O span.spielerposition O texto directo)
-            pos_cell = row.find('td', class_='posrela')
-            if pos_cell:
-                pos_tag = pos_cell.select_one('table.inline-table td.pos')
-                if pos_tag:
-                    position = limpiar_texto(pos_tag.text)
-                else:
-                    pos_span = pos_cell.find('span', class_='spielerposition')
-                    if pos_span:
-                        position = limpiar_texto(pos_span.text)
-                    else:
-                        position = limpiar_texto(pos_cell.get_text(strip=True))
-
-                        if player_name != "N/A" and position.startswith(player_name):
-                             position = position[len(player_name):].strip()
-                             if not position: position = "N/A"
-
-            # 3. Fecha de Nacimiento y Edad (Búsqueda universal en todas las celdas <td>)
-            # Modificación CRÍTICA en el re.search: Aceptar puntos o barras como separadores.
-            all_tds_in_row = row.find_all('td')
-            for cell in all_tds_in_row:
-                # El patrón ahora acepta . o / como separador de fecha
-                fecha_match = re.search(r'(\d{2}[./]\d{2}[./]\d{4})', cell.text) 
-                if fecha_match:
-                    # limpiar_texto(fecha_match.group(0)) ya hará el strip.
-                    # El calcular_edad se encargará de reemplazar '/' por '.' para el split.
-                    fecha_nacimiento_str = fecha_match.group(0) 
-                    age = calcular_edad(fecha_nacimiento_str)
-                    break 
-
-            # 4. Nacionalidad (Búsqueda universal en todas las celdas <td>)
-            for cell in all_tds_in_row:
-                flag_img = cell.find('img', class_='flaggenrahmen')
-                if flag_img and 'title' in flag_img.attrs:
-                    nationality = limpiar_texto(flag_img['title'])
-                    break
+def scrape_brasileirao(liga_url=None, base_url=BASE_URL, replay=False, al_parsear_equipo=None, **opciones_motor):
+    """
+    Scrapea todos los equipos de la liga de forma concurrente.
+    El tiempo total lo marca el límite de peticiones del motor, no una espera fija por equipo.
+    Las respuestas se guardan en HTTP_CACHE_DIR y se revalidan con peticiones condicionales;
+    con replay=True no se usa la red y se parsea solo lo que haya en la caché.
+    al_parsear_equipo(nombre_equipo, registros): si se indica, recibe los jugadores de cada equipo
+    en cuanto se parsean (y no se acumulan en la lista que se retorna); en ese caso el equipo no se
+    anota en SCRAPED_TEAMS_FILE, lo hace quien los recibe una vez guardados.
+    opciones_motor sobrescribe OPCIONES_MOTOR (concurrencia, peticiones_por_segundo, ...).
+    """
+    liga_url = liga_url or f"{base_url}{LIGA_PATH}"
+    return asyncio.run(_scrape_liga_async(liga_url, base_url, {**OPCIONES_MOTOR, **opciones_motor}, replay, al_parsear_equipo))
+
+def _registros_desde_cola(cola, ruta_auditoria):
+    """Generador que entrega los registros de la cola al cargador y los anota en el JSONL de auditoría."""
+    with open(ruta_auditoria, 'a', encoding='utf-8') as auditoria:
+        while True:
+            registro = cola.get()
+            if registro is None:
+                return
+            auditoria.write(json.dumps(registro, ensure_ascii=False) + '\n')
+            yield registro
+
+def scrape_a_db(liga_nombre=LIGA_NOMBRE, pais_liga=LIGA_PAIS, ruta_auditoria=AUDIT_FILE, perfil=None, **opciones_scrape):
+    """
+    Scrapea la liga y carga los jugadores directamente en la base de datos, sin pasar por el .txt.
+    Los registros de cada equipo se encolan en cuanto se parsean y un hilo los consume con
+    local_data.cargar_registros_en_db (una transacción, executemany); cada registro se
+    anota también, tal como se scrapeó, en `ruta_auditoria` (JSON Lines). Si no se indica perfil se usa el del manifiesto.
+    opciones_scrape se pasa a scrape_brasileirao (liga_url, base_url, replay, límites del motor).
+    Los equipos se anotan en SCRAPED_TEAMS_FILE solo después de que la carga haga commit.
+    Retorna (equipos_cargados, jugadores_añadidos) o None si falló la carga.
+    """
+    if perfil is None:
+        entrada = next((e for e in local_data.MANIFIESTO_LIGAS if e['liga'] == liga_nombre), {})
+        perfil = local_data.perfil_de_entrada(entrada)
+    database.init_db()
+
+    cola = queue.Queue()
+    resultado = {}
+    equipos_encolados = []
+
+    def encolar(nombre_equipo, registros):
+        equipos_encolados.append(nombre_equipo)
+        for registro in registros:
+            cola.put(registro)
+
+    def cargar():
+        resultado['carga'] = local_data.cargar_registros_en_db(
+            _registros_desde_cola(cola, ruta_auditoria), liga_nombre, pais_liga, perfil)
+
+    hilo_carga = threading.Thread(target=cargar)
+    hilo_carga.start()
+    try:
+        scrape_brasileirao(al_parsear_equipo=encolar, **opciones_scrape)
+    finally:
+        cola.put(None) # Fin de los registros: el cargador hace commit
+        hilo_carga.join()
+        # Si la carga falló no se marca nada: esos equipos se vuelven a scrapear la próxima vez
+        if resultado.get('carga') is not None and not opciones_scrape.get('replay'):
+            for nombre_equipo in equipos_encolados:
+                save_scraped_team(nombre_equipo)
+    return resultado.get('carga')
 
-            # --- FIN DE LOS EXTRACTORES ---
+if __name__ == "__main__":
+    # `python scrape.py` scrapea y carga directamente en la base de datos (con el JSONL de auditoría)
+    # `python scrape.py --txt` en cambio agrega las líneas a premierleague_players.txt (formato anterior)
+    # `python scrape.py --offline carpeta_html` scrapea páginas guardadas servidas en local, sin red
+    # `python scrape.py --replay` reparsea solo desde la caché HTTP, sin red
+    # `python scrape.py --benchmark [carpeta_html]` mide el parseo por equipo (por defecto sobre la caché)
+    if '--benchmark' in sys.argv:
+        indice = sys.argv.index('--benchmark') + 1
+        benchmark_parseo(paginas_guardadas(sys.argv[indice] if indice < len(sys.argv) else None))
+        sys.exit(0)
+
+    opciones = {}
+    servidor = None
+    if '--replay' in sys.argv:
+        opciones['replay'] = True
+    elif '--offline' in sys.argv:
+        servidor, base_url_local = scraper_async.servidor_html_local(sys.argv[sys.argv.index('--offline') + 1])
+        opciones = {'base_url': base_url_local, 'peticiones_por_segundo': 50,
+                    'peticiones_por_segundo_por_host': 50, 'rafaga': 10, 'backoff_base': 0.1}
 
-            # Filtro final antes de añadir a la lista
-            if player_name != "N/A" and team_name != "Nombre Desconocido" and age is not None and nationality != "N/A" and position != "N/A":
-                all_players_data.append(f"{player_name}, {position}, {age}, {nationality}, {team_name}")
-                print(f"  Añadido: {player_name} ({position}, {age}, {nationality}) de {team_name}")
+    try:
+        if '--txt' in sys.argv:
+            player_records = scrape_brasileirao(**opciones)
+            if player_records:
+                # Se agrega ('a') al archivo existente
+                with open('premierleague_players.txt', 'a', encoding='utf-8') as f:
+                    for registro in player_records:
+                        f.write(linea_jugador(registro) + '\n')
+                print(f"\nDatos de PremierLeague AGREGADOS a premierleague_players.txt con {len(player_records)} jugadores.")
             else:
-                print(f"  Saltando jugador incompleto en {team_name}: Nombre: '{player_name}', Posición: '{position}', Edad: '{age}', Nacionalidad: '{nationality}'")
-
-        # Marcar equipo como scrapeado solo si se encontró al menos 1 jugador válido
-        players_scraped_for_current_team = len([p for p in all_players_data if p.endswith(team_name)])
-        if players_scraped_for_current_team > 0:
-            print(f"  -> Equipo '{team_name}' scrapeado con éxito ({players_scraped_for_current_team} jugadores).")
-            save_scraped_team(team_name)
+                print("No se encontraron datos de jugadores para AGREGAR.")
         else:
-            print(f"  -> Advertencia: No se encontraron jugadores válidos para el equipo '{team_name}'. No se marcará como scrapeado.")
-
-    return all_players_data
-
-if __name__ == "__main__":
-    player_lines = scrape_brasileirao()
-    
-    if player_lines:
-        # CAMBIO CRÍTICO AQUÍ: Cambiar 'w' (write) a 'a' (append)
-        with open('premierleague_players.txt', 'a', encoding='utf-8') as f: #
-            for line in player_lines:
-                f.write(line + '\n')
-        print(f"\nDatos de PremierLeague AGREGADOS a premierleague_players.txt con {len(player_lines)} jugadores.")
-    else:
-        print("No se encontraron datos de jugadores para AGREGAR.")
\ No newline at end of file
+            resultado = scrape_a_db(**opciones)
+            if resultado:
+                print(f"\nCarga en '{LIGA_NOMBRE}' completada: {resultado[0]} equipos, {resultado[1]} jugadores añadidos "
+                      f"(auditoría en {AUDIT_FILE}).")
+            else:
+                print("No se cargaron jugadores en la base de datos.")
+    finally:
+        if servidor:
+            servidor.shutdown()
@@ -0,0 +1,215 @@
+# scraper_async.py
+
+import asyncio
+import functools
+import gzip
+import hashlib
+import http.server
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from limitador import LimitadorTokens
+
+# Códigos HTTP que se consideran transitorios y se reintentan
+CODIGOS_REINTENTABLES = {500, 502, 503, 504}
+
+def meta_a_cabeceras(meta):
+    cabeceras = {}
+    if meta.get('etag'):
+        cabeceras['ETag'] = meta['etag']
+    if meta.get('last_modified'):
+        cabeceras['Last-Modified'] = meta['last_modified']
+    return cabeceras
+
+class CacheHTTP:
+    """
+    Caché HTTP en disco, direccionada por contenido de la URL (sha256).
+    Por cada URL guarda el cuerpo comprimido con gzip (<clave>.gz) y sus metadatos (<clave>.json):
+    url, status, ETag y Last-Modified, para poder hacer peticiones condicionales.
+    """
+    def __init__(self, directorio):
+        self.directorio = directorio
+
+    def _rutas(self, url):
+        clave = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        carpeta = os.path.join(self.directorio, clave[:2])
+        return carpeta, os.path.join(carpeta, f"{clave}.gz"), os.path.join(carpeta, f"{clave}.json")
+
+    def leer(self, url):
+        """Retorna (metadatos, cuerpo_bytes) o (None, None) si la URL no está en caché."""
+        _, ruta_cuerpo, ruta_meta = self._rutas(url)
+        try:
+            with open(ruta_meta, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            with gzip.open(ruta_cuerpo, 'rb') as f:
+                return meta, f.read()
+        except (OSError, ValueError):
+            return None, None
+
+    def guardar(self, url, status, cuerpo, cabeceras):
+        carpeta, ruta_cuerpo, ruta_meta = self._rutas(url)
+        os.makedirs(carpeta, exist_ok=True)
+        with gzip.open(ruta_cuerpo, 'wb') as f:
+            f.write(cuerpo)
+        self.actualizar_meta(url, status, cabeceras)
+
+    def actualizar_meta(self, url, status, cabeceras):
+        _, _, ruta_meta = self._rutas(url)
+        # Los nombres de cabecera no distinguen mayúsculas ('etag', 'ETag'); si se repiten, vale la última
+        cabeceras = {nombre.lower(): valor for nombre, valor in cabeceras.items()}
+        meta = {
+            'url': url,
+            'status': status,
+            'etag': cabeceras.get('etag'),
+            'last_modified': cabeceras.get('last-modified'),
+            'guardado': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        with open(ruta_meta, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    def entradas(self):
+        """Genera (url, cuerpo_bytes) de todas las respuestas guardadas."""
+        if not os.path.isdir(self.directorio):
+            return
+        for carpeta in sorted(os.listdir(self.directorio)):
+            ruta_carpeta = os.path.join(self.directorio, carpeta)
+            for archivo in sorted(os.listdir(ruta_carpeta)):
+                if archivo.endswith('.json'):
+                    with open(os.path.join(ruta_carpeta, archivo), 'r', encoding='utf-8') as f:
+                        url = json.load(f)['url']
+                    meta, cuerpo = self.leer(url)
+                    if meta is not None:
+                        yield url, cuerpo
+
+    def cabeceras_condicionales(self, url):
+        meta, _ = self.leer(url)
+        cabeceras = {}
+        if meta and meta.get('etag'):
+            cabeceras['If-None-Match'] = meta['etag']
+        if meta and meta.get('last_modified'):
+            cabeceras['If-Modified-Since'] = meta['last_modified']
+        return cabeceras
+
+class MotorScraping:
+    """
+    Motor de descargas asíncrono con una sesión HTTP compartida.
+    - concurrencia: máximo de peticiones en vuelo en total.
+    - peticiones_por_segundo / rafaga: límite global (token bucket).
+    - conexiones_por_host / peticiones_por_segundo_por_host: presupuesto de cortesía por host.
+    - max_reintentos / backoff_base: reintentos con espera exponencial ante 5xx o errores de conexión.
+    - cache: CacheHTTP opcional; se envían peticiones condicionales y un 304 sirve el cuerpo guardado.
+    - solo_cache: modo replay sin red; solo se devuelve lo que haya en la caché.
+    Uso:
+        async with MotorScraping(headers) as motor:
+            status, contenido, cabeceras = await motor.obtener(url)
+    """
+    def __init__(self, headers=None, concurrencia=4, peticiones_por_segundo=1.0, rafaga=2,
+                 conexiones_por_host=2, peticiones_por_segundo_por_host=0.5,
+                 max_reintentos=3, backoff_base=2.0, timeout=10, cache=None, solo_cache=False):
+        self.headers = headers or {}
+        self.cache = cache
+        self.solo_cache = solo_cache
+        self.max_reintentos = max_reintentos
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        self.conexiones_por_host = conexiones_por_host
+        self.peticiones_por_segundo_por_host = peticiones_por_segundo_por_host
+        self._semaforo = asyncio.Semaphore(concurrencia)
+        self._limitador = LimitadorTokens(peticiones_por_segundo, rafaga)
+        self._hosts = {} # host -> (Semaphore, LimitadorTokens)
+        self._sesion = None
+
+    async def __aenter__(self):
+        if self.solo_cache:
+            return self
+        self._sesion = aiohttp.ClientSession(
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._sesion:
+            await self._sesion.close()
+
+    def _presupuesto_host(self, url):
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = (
+                asyncio.Semaphore(self.conexiones_por_host),
+                LimitadorTokens(self.peticiones_por_segundo_por_host, 1)
+            )
+        return self._hosts[host]
+
+    async def _pedir(self, url, headers):
+        async with self._sesion.get(url, headers=headers) as respuesta:
+            # copy(): CIMultiDict, sigue sin distinguir mayúsculas en los nombres
+            return respuesta.status, await respuesta.read(), respuesta.headers.copy()
+
+    async def obtener(self, url, headers=None):
+        """
+        Descarga una URL respetando los límites. Reintenta con backoff exponencial (con jitter)
+        los 5xx y los errores de conexión. Retorna (status, contenido_bytes, cabeceras);
+        status es None si todos los intentos fallaron por conexión.
+        """
+        if self.cache and self.solo_cache:
+            meta, cuerpo = self.cache.leer(url)
+            if meta is None:
+                print(f"Sin copia en caché para {url} (modo replay).")
+                return None, None, {}
+            return meta['status'], cuerpo, meta_a_cabeceras(meta)
+
+        if self.cache:
+            headers = {**self.cache.cabeceras_condicionales(url), **(headers or {})}
+
+        semaforo_host, limitador_host = self._presupuesto_host(url)
+        status = None
+        for intento in range(self.max_reintentos):
+            print(f"Descargando: {url} (Intento {intento + 1}/{self.max_reintentos})")
+            try:
+                async with self._semaforo, semaforo_host:
+                    await self._limitador.adquirir()
+                    await limitador_host.adquirir()
+                    status, contenido, cabeceras = await self._pedir(url, headers)
+                    if status == 304 and self.cache:
+                        meta, guardado = self.cache.leer(url)
+                        if meta is not None:
+                            self.cache.actualizar_meta(url, meta['status'], {**meta_a_cabeceras(meta), **cabeceras})
+                            print(f"Sin cambios (304), usando caché: {url}")
+                            return meta['status'], guardado, cabeceras
+                        # La copia desapareció entre la petición y la respuesta: se pide de nuevo sin
+                        # condición, dentro del mismo intento (no falló nada que haya que reintentar)
+                        headers = {k: v for k, v in headers.items() if not k.lower().startswith('if-')}
+                        await self._limitador.adquirir()
+                        await limitador_host.adquirir()
+                        status, contenido, cabeceras = await self._pedir(url, headers)
+                    if status == 200 and self.cache:
+                        self.cache.guardar(url, status, contenido, cabeceras)
+                    if status not in CODIGOS_REINTENTABLES:
+                        return status, contenido, cabeceras
+                print(f"Error {status} en {url}.")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"Excepción de conexión al acceder a {url}: {e}.")
+            if intento + 1 < self.max_reintentos:
+                espera = self.backoff_base * (2 ** intento) * random.uniform(0.8, 1.2)
+                print(f"Reintentando {url} en {espera:.1f} segundos...")
+                await asyncio.sleep(espera)
+        return status, None, {}
+
+def servidor_html_local(directorio, puerto=0):
+    """
+    Levanta en un hilo un servidor HTTP que sirve páginas guardadas desde `directorio`,
+    para probar el scraper sin red. La ruta de cada archivo debe reproducir la ruta de la URL
+    (las rutas terminadas en '/' sirven el index.html de esa carpeta; la query string se ignora).
+    Retorna (servidor, base_url); llamar a servidor.shutdown() al terminar.
+    """
+    manejador = functools.partial(http.server.SimpleHTTPRequestHandler, directory=directorio)
+    servidor = http.server.ThreadingHTTPServer(('127.0.0.1', puerto), manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}"
@@ -0,0 +1,144 @@
+# trabajos_scrape.py
+
+import asyncio
+import json
+import sys
+import database
+import local_data
+import scrape
+import scraper_async
+
+# Un trabajo por liga: nombre y país en la DB (como en local_data.MANIFIESTO_LIGAS), URL de la liga
+# en Transfermarkt y archivo JSON Lines de auditoría. Opcional: 'perfil' o 'banda' de valoración;
+# si faltan se usa la entrada del manifiesto con el mismo nombre de liga.
+TRABAJOS_SCRAPE = [
+    {'liga': "Premier League", 'pais': "Inglaterra",
+     'url': f"{scrape.BASE_URL}/premier-league/startseite/wettbewerb/GB1/plus/?saison_id=2024",
+     'auditoria': 'premierleague_players.jsonl'},
+    {'liga': "LaLiga", 'pais': "España",
+     'url': f"{scrape.BASE_URL}/laliga/startseite/wettbewerb/ES1/plus/?saison_id=2024",
+     'auditoria': 'laliga_players.jsonl'},
+    {'liga': "Brasileirão Serie A", 'pais': "Brasil",
+     'url': f"{scrape.BASE_URL}/campeonato-brasileiro-serie-a/startseite/wettbewerb/BRA1/plus/?saison_id=2024",
+     'auditoria': 'brasileirao_players.jsonl'},
+    {'liga': "Primera División", 'pais': "Argentina",
+     'url': f"{scrape.BASE_URL}/torneo-apertura/startseite/wettbewerb/AR1N/plus/?saison_id=2024",
+     'auditoria': 'primeradiv_players.jsonl'},
+    {'liga': "Primera Nacional", 'pais': "Argentina",
+     'url': f"{scrape.BASE_URL}/primera-nacional/startseite/wettbewerb/ARG2/plus/?saison_id=2024",
+     'auditoria': 'bnacional_players.jsonl'},
+]
+
+# Intentos por equipo antes de dejarlo en 'error' hasta que se reinicie la liga
+MAX_INTENTOS_EQUIPO = 3
+
+def _perfil_de_trabajo(trabajo):
+    perfil = local_data.perfil_de_entrada(trabajo)
+    if perfil is None:
+        entrada = next((e for e in local_data.MANIFIESTO_LIGAS if e['liga'] == trabajo['liga']), {})
+        perfil = local_data.perfil_de_entrada(entrada)
+    return perfil
+
+async def _scrape_equipo_trabajo(motor, trabajo, checkpoint, perfil):
+    """
+    Descarga y parsea un equipo y, si salió bien, lo carga en la DB.
+    El checkpoint se actualiza siempre: 'ok' solo después de que los jugadores quedaron guardados.
+    """
+    liga = trabajo['liga']
+    url_equipo = checkpoint['url_equipo']
+    nombre_equipo = checkpoint['equipo_nombre']
+    status, contenido, _ = await motor.obtener(url_equipo)
+
+    if status != 200:
+        error = f"estado HTTP {status}"
+    else:
+        registros = scrape.parsear_plantilla_equipo(contenido, nombre_equipo, mostrar=False)
+        if registros is None:
+            error = "no se encontró la tabla de jugadores"
+        elif not registros:
+            error = "ningún jugador válido en la tabla"
+        else:
+            # La carga y el checkpoint se hacen en el hilo del bucle: un único escritor en SQLite
+            resultado = local_data.cargar_registros_en_db(registros, liga, trabajo['pais'], perfil)
+            if resultado is None:
+                error = "falló la carga en la base de datos"
+            elif resultado[0] == 0:
+                error = "no se pudo crear el equipo en la liga (¿nombre ya usado en otra liga?)"
+            else:
+                with open(trabajo['auditoria'], 'a', encoding='utf-8') as auditoria:
+                    for registro in registros:
+                        auditoria.write(json.dumps(registro, ensure_ascii=False) + '\n')
+                database.update_checkpoint_scrape(liga, url_equipo, 'ok')
+                print(f"  [{liga}] {nombre_equipo}: {len(registros)} jugadores ({resultado[1]} nuevos).")
+                return True
+
+    database.update_checkpoint_scrape(liga, url_equipo, 'error', error)
+    print(f"  [{liga}] {nombre_equipo}: {error}.")
+    return False
+
+async def _ejecutar_trabajo(motor, trabajo, max_intentos):
+    """Scrapea una liga retomando sus checkpoints. Retorna {'ok': n, 'error': n, 'pendientes': n}."""
+    liga = trabajo['liga']
+    status, contenido, _ = await motor.obtener(trabajo['url'])
+    if status != 200:
+        print(f"[{liga}] Error al acceder a la página de la liga: {status}")
+    else:
+        equipos = scrape.parsear_equipos_liga(contenido)
+        if not equipos:
+            print(f"[{liga}] No se encontraron equipos en {trabajo['url']}. Revisa los selectores.")
+        else:
+            # Los enlaces son relativos al host de la liga
+            base_url = trabajo['url'].split('/', 3)[:3]
+            database.registrar_equipos_scrape(liga, [("/".join(base_url) + sufijo, nombre) for sufijo, nombre in equipos])
+
+    checkpoints = database.get_checkpoints_scrape(liga)
+    por_hacer = [c for c in checkpoints if c['estado'] != 'ok' and c['intentos'] < max_intentos]
+    print(f"[{liga}] {len(checkpoints)} equipos registrados, {len(por_hacer)} por scrapear.")
+
+    perfil = _perfil_de_trabajo(trabajo)
+    await asyncio.gather(*(_scrape_equipo_trabajo(motor, trabajo, c, perfil) for c in por_hacer))
+
+    resumen = {'ok': 0, 'error': 0, 'pendientes': 0}
+    for c in database.get_checkpoints_scrape(liga):
+        resumen['ok' if c['estado'] == 'ok' else 'error' if c['estado'] == 'error' else 'pendientes'] += 1
+    return resumen
+
+async def _ejecutar_trabajos_async(trabajos, opciones_motor, replay, max_intentos):
+    cache = scraper_async.CacheHTTP(scrape.HTTP_CACHE_DIR)
+    # Un solo motor para todas las ligas: el presupuesto de peticiones es global
+    async with scraper_async.MotorScraping(scrape.HEADERS, cache=cache, solo_cache=replay, **opciones_motor) as motor:
+        resumenes = await asyncio.gather(*(_ejecutar_trabajo(motor, t, max_intentos) for t in trabajos))
+    return {t['liga']: r for t, r in zip(trabajos, resumenes)}
+
+def ejecutar_trabajos(trabajos=None, reiniciar=False, replay=False, max_intentos=MAX_INTENTOS_EQUIPO, **opciones_motor):
+    """
+    Scrapea varias ligas en paralelo bajo un mismo límite de peticiones y las carga en la DB.
+    El progreso se guarda por (liga, URL de equipo) en la tabla scrape_checkpoints: una ejecución
+    interrumpida se retoma saltando los equipos ya cargados y reintentando los fallidos
+    (hasta max_intentos). reiniciar=True borra los checkpoints de esas ligas antes de empezar.
+    opciones_motor sobrescribe scrape.OPCIONES_MOTOR.
+    Retorna {liga: {'ok': n, 'error': n, 'pendientes': n}}.
+    """
+    trabajos = trabajos or TRABAJOS_SCRAPE
+    database.init_db()
+    if reiniciar:
+        for trabajo in trabajos:
+            database.reset_checkpoints_scrape(trabajo['liga'])
+    return asyncio.run(_ejecutar_trabajos_async(trabajos, {**scrape.OPCIONES_MOTOR, **opciones_motor}, replay, max_intentos))
+
+# --- Ejecución principal ---
+# Uso: python trabajos_scrape.py [--ligas "Premier League,LaLiga"] [--reiniciar] [--replay]
+if __name__ == '__main__':
+    trabajos = TRABAJOS_SCRAPE
+    if '--ligas' in sys.argv:
+        nombres = [n.strip() for n in sys.argv[sys.argv.index('--ligas') + 1].split(',')]
+        trabajos = [t for t in TRABAJOS_SCRAPE if t['liga'] in nombres]
+
+    resumen = ejecutar_trabajos(trabajos, reiniciar='--reiniciar' in sys.argv, replay='--replay' in sys.argv)
+
+    print("\n--- Estado de los trabajos ---")
+    for liga, estado in resumen.items():
+        print(f"{liga}: {estado['ok']} equipos cargados, {estado['error']} con error, {estado['pendientes']} pendientes.")
+        for c in database.get_checkpoints_scrape(liga):
+            if c['estado'] == 'error':
+                print(f"  - {c['equipo_nombre']} ({c['intentos']} intentos): {c['ultimo_error']}")